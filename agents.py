@@ -1,12 +1,30 @@
-from crewai import Agent
-from crewai_tools import ScrapeWebsiteTool, SerperDevTool
+from delegation import PolicyAgent
+
+from analysis_tools import (
+    IndexedScrapeWebsiteTool,
+    BatchScrapeTool,
+    IndexedSerperDevTool,
+    DocumentSearchTool,
+    TechnicalIndicatorTool,
+    ExecutionCostTool,
+    PortfolioRiskTool,
+    StoredNewsTool,
+    NewsSentimentTool
+)
 
 # Initialize tools
-search_tool = SerperDevTool()
-scrape_tool = ScrapeWebsiteTool()
+search_tool = IndexedSerperDevTool()
+scrape_tool = IndexedScrapeWebsiteTool()
+batch_scrape_tool = BatchScrapeTool()
+document_search_tool = DocumentSearchTool()
+indicator_tool = TechnicalIndicatorTool()
+execution_cost_tool = ExecutionCostTool()
+portfolio_risk_tool = PortfolioRiskTool()
+news_tool = StoredNewsTool()
+sentiment_tool = NewsSentimentTool()
 
 # Data Analyst Agent
-data_analyst_agent = Agent(
+data_analyst_agent = PolicyAgent(
     role="Data Analyst",
     goal="Monitor and analyze market data in real-time "
          "to identify trends and predict market movements.",
@@ -17,11 +35,11 @@ data_analyst_agent = Agent(
               "informing trading decisions.",
     verbose=True,
     allow_delegation=True,
-    tools=[scrape_tool, search_tool]
+    tools=[document_search_tool, scrape_tool, batch_scrape_tool, search_tool, indicator_tool, news_tool, sentiment_tool]
 )
 
 # Trading Strategy Agent
-trading_strategy_agent = Agent(
+trading_strategy_agent = PolicyAgent(
     role="Trading Strategy Developer",
     goal="Develop and test various trading strategies based "
          "on insights from the Data Analyst Agent.",
@@ -32,11 +50,11 @@ trading_strategy_agent = Agent(
               "the most profitable and risk-averse options.",
     verbose=True,
     allow_delegation=True,
-    tools=[scrape_tool, search_tool]
+    tools=[document_search_tool, scrape_tool, batch_scrape_tool, search_tool, indicator_tool]
 )
 
 # Execution Agent
-execution_agent = Agent(
+execution_agent = PolicyAgent(
     role="Trade Advisor",
     goal="Suggest optimal trade execution strategies "
          "based on approved trading strategies.",
@@ -47,11 +65,11 @@ execution_agent = Agent(
               "efficiency and adherence to strategy.",
     verbose=True,
     allow_delegation=True,
-    tools=[scrape_tool, search_tool]
+    tools=[document_search_tool, scrape_tool, batch_scrape_tool, search_tool, indicator_tool, execution_cost_tool]
 )
 
 # Risk Management Agent
-risk_management_agent = Agent(
+risk_management_agent = PolicyAgent(
     role="Risk Advisor",
     goal="Evaluate and provide insights on the risks "
          "associated with potential trading activities.",
@@ -62,11 +80,11 @@ risk_management_agent = Agent(
               "trading activities align with the firm's risk tolerance.",
     verbose=True,
     allow_delegation=True,
-    tools=[scrape_tool, search_tool]
+    tools=[document_search_tool, scrape_tool, batch_scrape_tool, search_tool, portfolio_risk_tool, news_tool]
 )
 
 # Stock Selection Specialist Agent
-stock_selection_specialist = Agent(
+stock_selection_specialist = PolicyAgent(
     role="Investment Portfolio Curator",
     goal="Identify and recommend the optimal selection of stocks tailored precisely to the investor's unique financial profile, timeline objectives, and risk parameters.",
     backstory="Once the Chief Investment Strategist at a prestigious Wall Street firm, this agent brings 25 years of market wisdom across multiple economic cycles. After earning dual PhDs in Financial Economics and Behavioral Finance from Wharton, they developed a proprietary stock selection methodology that combines quantitative analysis with psychological market dynamics.\n\n"
@@ -74,11 +92,11 @@ stock_selection_specialist = Agent(
              "Now, this seasoned veteran applies their battle-tested expertise to methodically evaluate thousands of potential investments, filtering through complex market noise to curate the perfect selection of securities that align with each investor's unique financial fingerprint. Their recommendations aren't just stocks—they're precisely calibrated vehicles designed to transport investors toward their financial destinations through any market terrain.",
     verbose=True,
     allow_delegation=True,
-    tools=[scrape_tool, search_tool]
+    tools=[document_search_tool, scrape_tool, batch_scrape_tool, search_tool, indicator_tool, portfolio_risk_tool, news_tool, sentiment_tool]
 )
 
 # Market Research Specialist
-market_research_specialist = Agent(
+market_research_specialist = PolicyAgent(
     role="Market Opportunity Scout",
     goal="Uncover hidden opportunities and emerging trends across global markets to identify undervalued assets with exceptional growth potential that match investor parameters.",
     backstory="A legendary market researcher who began as a quantitative analyst at Renaissance Technologies before becoming the global head of research at a sovereign wealth fund. With an eidetic memory for market patterns and corporate developments, they've built an encyclopedic knowledge of industries spanning from traditional sectors to emerging technologies.\n\n"
@@ -86,5 +104,5 @@ market_research_specialist = Agent(
               "Having advised central banks and constructed market intelligence systems for hedge funds, they now apply their rarified expertise to scanning the global investment landscape, detecting the faint but unmistakable signals of exceptional investment opportunities that perfectly align with each investor's specific requirements and time horizons.",
     verbose=True,
     allow_delegation=True,
-    tools=[scrape_tool, search_tool]
+    tools=[document_search_tool, scrape_tool, batch_scrape_tool, search_tool, news_tool, sentiment_tool]
 ) 
\ No newline at end of file
@@ -0,0 +1,289 @@
+from typing import Any, Dict, List, Type
+
+from crewai.tools import BaseTool
+from crewai_tools import ScrapeWebsiteTool, SerperDevTool
+from pydantic import BaseModel, Field
+
+from config import DOC_INDEX_PARAMS, SCRAPE_PARAMS
+from doc_index import document_index, index_search_results
+from execution_sim import market_stats, simulate_schedules
+from html_extract import fetch_and_extract, format_extraction_stats, scrape_batch
+from indicators import indicator_engine
+from news import news_store
+from prefetch import search_cache, search_key
+from serper import serper_request
+from risk_model import get_risk_model
+from sentiment import daily_sentiment, summarize_sentiment
+
+def parse_tickers(value: str) -> List[str]:
+    """Split a comma or space separated ticker string into upper-case symbols"""
+    return [t.strip().upper() for t in value.replace(',', ' ').split() if t.strip()]
+
+def parse_holdings(value: str) -> Dict[str, float]:
+    """Parse 'AAPL:30, MSFT:25' (or 'AAPL 30%') into a ticker -> weight mapping"""
+    holdings = {}
+    for item in value.split(','):
+        parts = item.replace(':', ' ').replace('=', ' ').replace('%', ' ').split()
+        if len(parts) == 2:
+            holdings[parts[0].upper()] = float(parts[1])
+        elif len(parts) == 1:
+            holdings[parts[0].upper()] = 1.0
+    return holdings
+
+# Technical Indicator Tool
+class TechnicalIndicatorInput(BaseModel):
+    tickers: str = Field(..., description="Comma separated ticker symbols, e.g. 'AAPL, MSFT'")
+
+class TechnicalIndicatorTool(BaseTool):
+    name: str = "Technical Indicators"
+    description: str = (
+        "Returns the latest RSI, MACD, Bollinger bands, ATR, VWAP and 50/200-day "
+        "moving averages for one or more tickers, computed from the local price store. "
+        "Use it instead of searching the web for technical levels."
+    )
+    args_schema: Type[BaseModel] = TechnicalIndicatorInput
+
+    def _run(self, tickers: str) -> str:
+        symbols = parse_tickers(tickers)
+        if not symbols:
+            return "No tickers given."
+
+        latest = indicator_engine.refresh().reindex(symbols)
+        lines = []
+        for ticker, row in latest.iterrows():
+            if row.isna().all():
+                lines.append(f"{ticker}: no local price history")
+                continue
+            trend = "above" if row['sma_fast'] > row['sma_slow'] else "below"
+            cross = {1: ", golden cross today", -1: ", death cross today"}.get(row['ma_cross'], "")
+            lines.append(
+                f"{ticker}: close {row['close']:.2f}, RSI {row['rsi']:.1f}, "
+                f"MACD {row['macd']:.2f} (signal {row['macd_signal']:.2f}), "
+                f"Bollinger {row['bb_lower']:.2f}-{row['bb_upper']:.2f}, ATR {row['atr']:.2f}, "
+                f"VWAP {row['vwap']:.2f}, 50d MA {trend} 200d MA{cross}"
+            )
+        return "\n".join(lines)
+
+# Execution Cost Tool
+class ExecutionCostInput(BaseModel):
+    ticker: str = Field(..., description="Ticker symbol to trade, e.g. 'AAPL'")
+    order_value: float = Field(..., description="Order size in dollars (initial capital x allocation)")
+    risk_tolerance: str = Field("Medium", description="Investor risk tolerance: Low, Medium or High")
+
+class ExecutionCostTool(BaseTool):
+    name: str = "Execution Cost Simulator"
+    description: str = (
+        "Simulates TWAP, VWAP and percent-of-volume execution schedules for an order "
+        "using historical volume and volatility, and returns expected slippage, market "
+        "impact and timing risk for each. Use it to choose how and over what period to "
+        "execute a trade."
+    )
+    args_schema: Type[BaseModel] = ExecutionCostInput
+
+    def _run(self, ticker: str, order_value: float, risk_tolerance: str = "Medium") -> str:
+        ticker = ticker.strip().upper()
+        stats = market_stats(ticker)
+        if stats is None:
+            return f"{ticker}: no local price history, cannot estimate execution costs."
+
+        try:
+            results = simulate_schedules(order_value, stats, risk_tolerance).head(5)
+        except ValueError as e:
+            return f"{ticker}: cannot estimate execution costs. {str(e)}"
+        lines = [
+            f"{ticker}: ${order_value:,.0f} order = {order_value / stats['adv'] / stats['price']:.2%} of ADV, "
+            f"daily volatility {stats['daily_vol']:.2%}",
+            "Schedule | Expected cost (bps) | Cost ($) | Timing risk (bps) | Max participation | Days"
+        ]
+        for name, row in results.iterrows():
+            lines.append(
+                f"{name} | {row['expected_cost_bps']:.1f} | {row['expected_cost_usd']:,.0f} | "
+                f"{row['timing_risk_bps']:.1f} | {row['max_participation']:.1%} | {row['duration_days']:.1f}"
+            )
+        lines.append(f"Recommended for {risk_tolerance} risk tolerance: {results.index[0]}")
+        return "\n".join(lines)
+
+# Portfolio Risk Tool
+class PortfolioRiskInput(BaseModel):
+    holdings: str = Field(..., description="Tickers with allocation percentages, e.g. 'AAPL:30, MSFT:25, JNJ:45'")
+    method: str = Field("shrinkage", description="Covariance estimate: 'shrinkage' or 'factor'")
+
+class PortfolioRiskTool(BaseTool):
+    name: str = "Portfolio Risk Model"
+    description: str = (
+        "Computes annualized portfolio volatility, each holding's share of total risk, "
+        "the diversification ratio and the most correlated pairs from a covariance model "
+        "estimated over the local price history. Use it to size positions and check "
+        "concentration before recommending allocations."
+    )
+    args_schema: Type[BaseModel] = PortfolioRiskInput
+
+    def _run(self, holdings: str, method: str = "shrinkage") -> str:
+        weights = parse_holdings(holdings)
+        model = get_risk_model()
+        if model is None or not weights:
+            return "Risk model unavailable: no local price history or no holdings given."
+
+        risk = model.portfolio_risk(weights, method)
+        if not risk['tickers']:
+            return "None of the holdings have local price history."
+
+        lines = [
+            f"Annualized volatility: {risk['volatility']:.1%} "
+            f"(diversification ratio {risk['diversification_ratio']:.2f}, {method} covariance, "
+            f"{len(model.dates)}-day window)",
+            "Ticker | Standalone volatility | Share of portfolio risk"
+        ]
+        for ticker in risk['tickers']:
+            lines.append(f"{ticker} | {risk['standalone_volatility'][ticker]:.1%} | {risk['contributions'][ticker]:.1%}")
+
+        tickers, corr = risk['tickers'], risk['correlation']
+        pairs = sorted(((corr[i, j], tickers[i], tickers[j])
+                        for i in range(len(tickers)) for j in range(i + 1, len(tickers))), reverse=True)
+        for value, a, b in pairs[:3]:
+            lines.append(f"Correlation {a}/{b}: {value:.2f}")
+        if risk['missing']:
+            lines.append(f"No price history for: {', '.join(risk['missing'])}")
+        return "\n".join(lines)
+
+# Stored News Tool
+class StoredNewsInput(BaseModel):
+    topic: str = Field(..., description="Ticker or sector to look up, e.g. 'AAPL' or 'Healthcare'")
+    days: int = Field(7, description="How many days back to look")
+
+class StoredNewsTool(BaseTool):
+    name: str = "Stored News"
+    description: str = (
+        "Returns recent, deduplicated news headlines and summaries for a ticker or sector "
+        "from the local news store that is filled at the start of each analysis. "
+        "Use it instead of running new web searches for news."
+    )
+    args_schema: Type[BaseModel] = StoredNewsInput
+
+    def _run(self, topic: str, days: int = 7) -> str:
+        articles = news_store.query([topic], days=days)
+        if not articles:
+            return f"No stored news for {topic} in the last {days} days."
+        return "\n".join(
+            f"[{a['published_at'][:10]}] {a['title']} ({a['source']}): {a['snippet']}"
+            for a in articles
+        )
+
+# News Sentiment Tool
+class NewsSentimentInput(BaseModel):
+    topics: str = Field(..., description="Comma separated tickers or sectors, e.g. 'AAPL, Healthcare'")
+    days: int = Field(14, description="How many days back to look")
+
+class NewsSentimentTool(BaseTool):
+    name: str = "News Sentiment"
+    description: str = (
+        "Returns per-day news sentiment scores (-1 to +1) and article counts for tickers "
+        "or sectors, computed locally over the stored news. Use it to judge news tone "
+        "without reading the underlying articles."
+    )
+    args_schema: Type[BaseModel] = NewsSentimentInput
+
+    def _run(self, topics: str, days: int = 14) -> str:
+        names = [t.strip() for t in topics.split(',') if t.strip()]
+        series = daily_sentiment(names, days)
+        if series.empty:
+            return f"No stored news to score for {topics} in the last {days} days."
+        return "\n".join(summarize_sentiment(series))
+
+# Scrape and search tools that feed the local document index
+class IndexedScrapeWebsiteTool(ScrapeWebsiteTool):
+    """
+    ScrapeWebsiteTool that streams only a page's main content under size caps,
+    indexes every page and reuses recently scraped ones
+    """
+
+    def _run(self, **kwargs: Any) -> Any:
+        url = kwargs.get('website_url', self.website_url)
+        if not url:
+            return super()._run(**kwargs)
+
+        cached = document_index.get_document(url, DOC_INDEX_PARAMS['page_ttl_hours'])
+        if cached is not None:
+            return cached
+        stats = fetch_and_extract(url)
+        document_index.add_document(url, stats['text'], 'page')
+        return f"{stats['text']}\n\n{format_extraction_stats(stats)}"
+
+# Batch Scrape Tool
+class BatchScrapeInput(BaseModel):
+    urls: str = Field(..., description="Comma or newline separated URLs to read, e.g. 'https://a.com/x, https://b.com/y'")
+
+class BatchScrapeTool(BaseTool):
+    name: str = "Read Multiple Websites"
+    description: str = (
+        "Reads the main content of several web pages at once, in parallel. Slow or "
+        "failing sites are retried and skipped after a time limit, so one slow site "
+        "never blocks the rest. Prefer it over scraping pages one by one."
+    )
+    args_schema: Type[BaseModel] = BatchScrapeInput
+
+    def _run(self, urls: str) -> str:
+        targets = list(dict.fromkeys(u.strip() for u in urls.replace('\n', ',').split(',') if u.strip()))
+        if not targets:
+            return "No URLs given."
+        skipped = targets[SCRAPE_PARAMS['batch_max_urls']:]
+        targets = targets[:SCRAPE_PARAMS['batch_max_urls']]
+
+        pages = {}
+        for url in targets:
+            cached = document_index.get_document(url, DOC_INDEX_PARAMS['page_ttl_hours'])
+            if cached is not None:
+                pages[url] = cached
+        fetched = scrape_batch([u for u in targets if u not in pages],
+                               {'max_output_tokens': SCRAPE_PARAMS['batch_output_tokens']})
+        for url, stats in fetched.items():
+            if 'error' in stats:
+                pages[url] = f"[not available: {stats['error']}]"
+            else:
+                document_index.add_document(url, stats['text'], 'page')
+                pages[url] = f"{stats['text']}\n{format_extraction_stats(stats)}"
+
+        sections = [f"=== {url} ===\n{pages[url]}" for url in targets]
+        if skipped:
+            sections.append(f"Not read (limit of {len(targets)} URLs per call): {', '.join(skipped)}")
+        return "\n\n".join(sections)
+
+class IndexedSerperDevTool(SerperDevTool):
+    """SerperDevTool that caches and indexes every result set"""
+
+    def _run(self, **kwargs: Any) -> Any:
+        query = kwargs.get('search_query') or kwargs.get('query', '')
+        key = search_key(query, kwargs.get('search_type', self.search_type))
+
+        def search():
+            results = super(IndexedSerperDevTool, self)._run(**kwargs)
+            index_search_results(query, results)
+            return results
+
+        return search_cache.get_or_compute(key, search)
+
+    def _make_api_request(self, search_query: str, search_type: str) -> Dict[str, Any]:
+        # Through serper_request, so searches can be cancelled in flight and stubbed
+        params = {'gl': self.country, 'location': self.location, 'hl': self.locale}
+        return serper_request(search_query, search_type, num=self.n_results,
+                              **{k: v for k, v in params.items() if v})
+
+# Document Search Tool
+class DocumentSearchInput(BaseModel):
+    query: str = Field(..., description="What you are looking for, e.g. 'NVDA data center revenue guidance'")
+    top_k: int = Field(5, description="Number of passages to return")
+
+class DocumentSearchTool(BaseTool):
+    name: str = "Search Collected Documents"
+    description: str = (
+        "Searches every page and search result already collected in this and earlier "
+        "analyses and returns only the most relevant passages with their source URLs. "
+        "Try it before scraping a page or searching the web again."
+    )
+    args_schema: Type[BaseModel] = DocumentSearchInput
+
+    def _run(self, query: str, top_k: int = 5) -> str:
+        hits = document_index.search(query, top_k)
+        if not hits:
+            return f"No collected documents match '{query}'."
+        return "\n\n".join(f"[{h['url']}] {h['text']}" for h in hits)
@@ -0,0 +1,341 @@
+import contextvars
+import datetime
+import json
+import threading
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from config import API_PARAMS, DEFAULT_INPUTS
+from cancellation import AnalysisCancelled, CancellationToken
+
+# Job states; the last three are final
+QUEUED, RUNNING, COMPLETED, FAILED, CANCELLED = 'queued', 'running', 'completed', 'failed', 'cancelled'
+FINAL_STATES = (COMPLETED, FAILED, CANCELLED)
+
+# Job whose analysis the current thread is working on. crewai runs event
+# handlers and our executors run workers in copies of the caller's context,
+# so log entries and streamed tokens can be attributed to their job.
+_current_job: contextvars.ContextVar = contextvars.ContextVar('api_job', default=None)
+
+def _now() -> str:
+    return datetime.datetime.now().isoformat(timespec='seconds')
+
+def result_payload(result: Any) -> Dict[str, Any]:
+    """JSON body for a finished analysis' result"""
+    if hasattr(result, 'to_dict'):
+        return result.to_dict()
+    return {'raw': getattr(result, 'raw', str(result)), 'stages': []}
+
+class AnalysisJob:
+    """
+    One submitted analysis: its state, cancellation token and event history
+
+    Events are numbered so an SSE client that reconnects with Last-Event-ID
+    only receives what it missed (as long as it is still in the history).
+    """
+
+    def __init__(self, inputs: Dict[str, Any], max_events: int = API_PARAMS['max_events_per_job']):
+        self.id = uuid.uuid4().hex[:12]
+        self.inputs = inputs
+        self.status = QUEUED
+        self.error = ''
+        self.result: Optional[Dict[str, Any]] = None
+        self.created_at = _now()
+        self.started_at = None
+        self.finished_at = None
+        self.token = CancellationToken()
+        self._events: deque = deque(maxlen=max_events)
+        self._seq = 0
+        self._changed = threading.Condition()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINAL_STATES
+
+    def emit(self, event: str, data: Dict[str, Any]):
+        with self._changed:
+            self._seq += 1
+            self._events.append((self._seq, event, data))
+            self._changed.notify_all()
+
+    def set_status(self, status: str, error: str = ''):
+        with self._changed:
+            self.status = status
+            self.error = error
+            if status == RUNNING:
+                self.started_at = _now()
+            elif status in FINAL_STATES:
+                self.finished_at = _now()
+            # Emitted under the same lock, so an event stream never sees the
+            # final status without its event
+            self.emit('status', self.to_dict())
+
+    def events_after(self, seq: int, timeout: float) -> List[Tuple[int, str, Dict[str, Any]]]:
+        """Events numbered above seq, waiting up to timeout seconds for one if there are none yet"""
+        with self._changed:
+            if self._seq <= seq and not self.finished:
+                self._changed.wait(timeout)
+            return [e for e in self._events if e[0] > seq]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'id': self.id,
+            'status': self.status,
+            'error': self.error,
+            'mode': 'single' if self.inputs.get('stock_selection') else 'portfolio',
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+
+class AnalysisService:
+    """
+    Runs submitted analyses on a pool of worker threads (or worker processes)
+
+    runner is called as runner(inputs, cancel_token=token) and defaults to
+    crew.run_financial_analysis. To exercise the service and the real crews
+    without LLM or search backends, install stub_backends first. With a worker_farm.WorkerFarm (not yet started)
+    the analyses run in its worker processes instead of threads.
+    """
+
+    def __init__(self, runner: Optional[Callable[..., Any]] = None, workers: int = API_PARAMS['workers'],
+                 max_finished_jobs: int = API_PARAMS['max_finished_jobs'], farm: Any = None):
+        self.farm = farm
+        # Analyses that can run at the same time
+        self.capacity = farm.processes if farm is not None else workers
+        self._executor = None
+        self._unregister: List[Callable[[], None]] = []
+        if farm is not None:
+            farm.on_event = self._on_farm_event
+            farm.start()
+        else:
+            if runner is None:
+                from crew import (run_financial_analysis, register_log_callback, register_stream_callback,
+                                  unregister_log_callback, unregister_stream_callback)
+                runner = run_financial_analysis
+                register_log_callback(self._on_log)
+                register_stream_callback(self._on_chunk)
+                self._unregister = [lambda: unregister_log_callback(self._on_log),
+                                    lambda: unregister_stream_callback(self._on_chunk)]
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='analysis')
+        self.runner = runner
+        self.max_finished_jobs = max_finished_jobs
+        self._jobs: Dict[str, AnalysisJob] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, inputs: Dict[str, Any]) -> AnalysisJob:
+        """Queue an analysis of inputs (merged over DEFAULT_INPUTS)"""
+        if not isinstance(inputs, dict):
+            raise ValueError("Analysis inputs must be a JSON object")
+        job = AnalysisJob({**DEFAULT_INPUTS, **inputs})
+        with self._lock:
+            self._jobs[job.id] = job
+            self._evict()
+        job.emit('status', job.to_dict())
+        if self.farm is not None:
+            self.farm.submit(job.inputs, job_id=job.id)
+        else:
+            # A fresh context per job, so nothing leaks between jobs sharing a worker thread
+            self._executor.submit(contextvars.Context().run, self._run, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[AnalysisJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self) -> List[AnalysisJob]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id: str) -> Optional[AnalysisJob]:
+        job = self.get(job_id)
+        if job is not None and not job.finished:
+            job.token.cancel("Analysis cancelled through the API")
+            if self.farm is not None:
+                self.farm.cancel(job.id)
+            job.emit('log', {'agent': "API", 'action': "Cancellation requested", 'details': None,
+                             'time': datetime.datetime.now().strftime("%H:%M:%S")})
+        return job
+
+    def shutdown(self):
+        """Cancel every unfinished analysis and stop the workers"""
+        for job in self.jobs():
+            if not job.finished:
+                job.token.cancel("API server shutting down")
+        if self.farm is not None:
+            self.farm.shutdown()
+        else:
+            self._executor.shutdown(wait=False)
+        for unregister in self._unregister:
+            unregister()
+
+    def _run(self, job: AnalysisJob):
+        _current_job.set(job)
+        if job.token.cancelled:
+            job.set_status(CANCELLED, job.token.reason)
+            return
+        job.set_status(RUNNING)
+        try:
+            result = self.runner(job.inputs, cancel_token=job.token)
+            job.result = result_payload(result)
+            job.set_status(COMPLETED)
+        except AnalysisCancelled as e:
+            job.set_status(CANCELLED, str(e))
+        except Exception as e:
+            job.set_status(FAILED, str(e))
+
+    def _on_farm_event(self, job_id: str, event: str, data: Dict[str, Any]):
+        job = self.get(job_id)
+        if job is None:
+            return
+        if event == 'started':
+            job.set_status(RUNNING)
+        elif event == 'finished':
+            job.result = data.get('result')
+            job.set_status(data['status'], data.get('error', ''))
+        else:
+            job.emit(event, data if event == 'log' else {k: data[k] for k in ('agent_role', 'task_name', 'chunk')})
+
+    def _evict(self):
+        """Forget the longest-finished jobs beyond max_finished_jobs"""
+        finished = sorted((j for j in self._jobs.values() if j.finished), key=lambda j: j.finished_at)
+        for job in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self._jobs[job.id]
+
+    def _on_log(self, entry: Dict[str, Any]):
+        job = _current_job.get()
+        if job is not None:
+            job.emit('log', entry)
+
+    def _on_chunk(self, chunk: Dict[str, Any]):
+        job = _current_job.get()
+        if job is not None:
+            job.emit('token', {k: chunk[k] for k in ('agent_role', 'task_name', 'chunk')})
+
+class AnalysisRequestHandler(BaseHTTPRequestHandler):
+    """
+    JSON endpoints around an AnalysisService (self.server.service)
+
+    POST /analyses                  submit; the body holds the analysis inputs
+    GET  /analyses                  status of every known analysis
+    GET  /analyses/<id>             status of one analysis
+    GET  /analyses/<id>/result      final report and stage outputs once completed
+    POST /analyses/<id>/cancel      cancel a queued or running analysis
+    GET  /analyses/<id>/events      Server-Sent Events: status, log and token events
+    GET  /health                    liveness and job counts
+    """
+
+    server_version = "StockSageAPI/1.0"
+
+    def log_message(self, format, *args):
+        # Keep the terminal for analysis output; errors are still reported
+        pass
+
+    def _send_json(self, status: int, body: Any, headers: Optional[Dict[str, str]] = None):
+        data = json.dumps(body, default=str).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _route(self) -> Tuple[List[str], Optional[AnalysisJob]]:
+        parts = [p for p in urlparse(self.path).path.split('/') if p]
+        job = self.server.service.get(parts[1]) if len(parts) >= 2 and parts[0] == 'analyses' else None
+        return parts, job
+
+    def do_GET(self):
+        parts, job = self._route()
+        service = self.server.service
+        if parts == ['health']:
+            counts: Dict[str, int] = {}
+            for j in service.jobs():
+                counts[j.status] = counts.get(j.status, 0) + 1
+            return self._send_json(200, {'status': 'ok', 'jobs': counts})
+        if parts == ['analyses']:
+            return self._send_json(200, [j.to_dict() for j in service.jobs()])
+        if len(parts) < 2 or parts[0] != 'analyses' or len(parts) > 3:
+            return self._send_json(404, {'error': "Not found"})
+        if job is None:
+            return self._send_json(404, {'error': f"Unknown analysis: {parts[1]}"})
+        if len(parts) == 2:
+            return self._send_json(200, job.to_dict())
+        if parts[2] == 'result':
+            if job.status == COMPLETED:
+                return self._send_json(200, {**job.to_dict(), 'result': job.result})
+            # Still running (202) or ended without a result (409)
+            return self._send_json(409 if job.finished else 202, job.to_dict())
+        if parts[2] == 'events':
+            return self._stream_events(job)
+        return self._send_json(404, {'error': "Not found"})
+
+    def do_POST(self):
+        parts, job = self._route()
+        if parts == ['analyses']:
+            try:
+                length = int(self.headers.get('Content-Length') or 0)
+                inputs = json.loads(self.rfile.read(length) or b'{}')
+                job = self.server.service.submit(inputs)
+            except (ValueError, json.JSONDecodeError) as e:
+                return self._send_json(400, {'error': str(e)})
+            return self._send_json(202, job.to_dict(), {'Location': f"/analyses/{job.id}"})
+        if len(parts) == 3 and parts[0] == 'analyses' and parts[2] == 'cancel':
+            if job is None:
+                return self._send_json(404, {'error': f"Unknown analysis: {parts[1]}"})
+            self.server.service.cancel(job.id)
+            return self._send_json(202, job.to_dict())
+        return self._send_json(404, {'error': "Not found"})
+
+    def _stream_events(self, job: AnalysisJob):
+        """Send the job's events as they happen, ending after its final status"""
+        try:
+            seq = int(self.headers.get('Last-Event-ID') or 0)
+        except ValueError:
+            seq = 0
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        try:
+            while True:
+                events = job.events_after(seq, timeout=API_PARAMS['heartbeat_seconds'])
+                if not events:
+                    # Comment line keeping proxies from closing an idle stream
+                    self.wfile.write(b": keep-alive\n\n")
+                for seq, event, data in events:
+                    self.wfile.write(f"id: {seq}\nevent: {event}\ndata: {json.dumps(data, default=str)}\n\n".encode())
+                self.wfile.flush()
+                if job.finished and not job.events_after(seq, timeout=0):
+                    return
+        except (BrokenPipeError, ConnectionResetError):
+            # Client went away; the analysis keeps running
+            return
+
+class AnalysisServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], service: AnalysisService):
+        super().__init__(address, AnalysisRequestHandler)
+        self.service = service
+
+def serve(host: str = API_PARAMS['host'], port: int = API_PARAMS['port'],
+          service: Optional[AnalysisService] = None):
+    """Serve the analysis API until interrupted"""
+    service = service or AnalysisService()
+    server = AnalysisServer((host, port), service)
+    print(f"StockSage API listening on http://{host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down API server...")
+    finally:
+        server.server_close()
+        service.shutdown()
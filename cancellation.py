@@ -0,0 +1,158 @@
+import contextvars
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+class AnalysisCancelled(Exception):
+    """Raised at the next checkpoint once an analysis has been cancelled"""
+
+class CancellationToken:
+    """
+    Cooperative cancellation flag shared by everything working on one analysis
+
+    Work checks it between steps (raise_if_cancelled); resources that block,
+    such as HTTP sessions, register a callback that closes them on cancel.
+    """
+
+    def __init__(self):
+        self.reason = ''
+        self._event = threading.Event()
+        self._callbacks: List[Callable[[], Any]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "Analysis cancelled"):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Warning: cancellation callback failed: {str(e)}")
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise AnalysisCancelled(self.reason)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Sleep up to timeout seconds, returning early (True) if cancelled"""
+        return self._event.wait(timeout)
+
+    def on_cancel(self, callback: Callable[[], Any]) -> Callable[[], None]:
+        """
+        Call callback on cancellation (immediately if already cancelled)
+
+        Returns:
+            Function that unregisters the callback
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._remove(callback)
+        callback()
+        return lambda: None
+
+    def _remove(self, callback: Callable[[], Any]):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+# Token of the analysis the current thread is working on. Threads started by
+# our own executors inherit it through submit_in_context.
+_current: contextvars.ContextVar = contextvars.ContextVar('cancellation_token', default=None)
+
+def current_token() -> Optional[CancellationToken]:
+    return _current.get()
+
+def check_cancelled():
+    """Raise AnalysisCancelled if the current analysis has been cancelled"""
+    token = _current.get()
+    if token is not None:
+        token.raise_if_cancelled()
+
+@contextmanager
+def cancellation_scope(token: CancellationToken):
+    """Make token the current thread's cancellation token"""
+    reset = _current.set(token)
+    try:
+        yield token
+    finally:
+        _current.reset(reset)
+
+def submit_in_context(executor, fn: Callable, *args, **kwargs):
+    """executor.submit that carries the caller's context (and so its token) into the worker"""
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+def call_cancellable(fn: Callable, *args, poll_interval: float = 0.1, **kwargs):
+    """
+    Run a blocking call (e.g. one HTTP request) so that cancellation returns at once
+
+    The call runs on a daemon thread while this thread watches the token; a
+    call abandoned by cancellation finishes in the background and its result
+    is discarded.
+    """
+    token = _current.get()
+    if token is None:
+        return fn(*args, **kwargs)
+    token.raise_if_cancelled()
+    outcome: Dict[str, Any] = {}
+    done = threading.Event()
+
+    def run():
+        try:
+            outcome['value'] = fn(*args, **kwargs)
+        except BaseException as e:
+            outcome['error'] = e
+        finally:
+            done.set()
+
+    threading.Thread(target=run, daemon=True).start()
+    while not done.wait(poll_interval):
+        token.raise_if_cancelled()
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome['value']
+
+@contextmanager
+def closing_on_cancel(resource):
+    """Close resource (e.g. a requests session) if the current analysis is cancelled while it is in use"""
+    token = _current.get()
+    unregister = token.on_cancel(resource.close) if token is not None else (lambda: None)
+    try:
+        yield resource
+    finally:
+        unregister()
+
+class CancellableLLMMixin:
+    """Checks the current cancellation token before and after every LLM call"""
+
+    def call(self, *args, **kwargs):
+        check_cancelled()
+        response = super().call(*args, **kwargs)
+        check_cancelled()
+        return response
+
+_cancellable_classes: Dict[type, type] = {}
+
+def cancellable(llm):
+    """
+    Make an LLM stop an analysis between calls once it is cancelled
+
+    Like llm_cache.with_response_cache, this switches the instance to a
+    subclass of its provider class with the mixin.
+    """
+    base = type(llm)
+    if issubclass(base, CancellableLLMMixin):
+        return llm
+    if base not in _cancellable_classes:
+        _cancellable_classes[base] = type(f"Cancellable{base.__name__}", (CancellableLLMMixin, base),
+                                          {'__module__': __name__})
+    object.__setattr__(llm, '__class__', _cancellable_classes[base])
+    return llm
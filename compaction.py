@@ -0,0 +1,78 @@
+import re
+import threading
+from typing import Dict, List, Optional
+
+from config import COMPACTION_PARAMS
+from html_extract import count_tokens, truncate_to_tokens
+from run_stats import count_for_run
+
+# Markdown/numbered headings and short label lines such as "Key Risks:"
+_HEADING_RE = re.compile(r"^(#{1,6}\s+|\*\*[^*]+\*\*:?$|[A-Z][\w ,/&()-]{0,60}:$)")
+_ITEM_RE = re.compile(r"^([-*•]\s+|\d{1,2}[.)]\s+)")
+# Figures, prices, percentages and tickers carry most of a finding's substance
+_FACT_RE = re.compile(r"(\d|\$|%|\b[A-Z]{2,5}\b)")
+
+# Running totals of the prompt tokens removed by compaction
+compaction_totals = {'digests': 0, 'tokens_in': 0, 'tokens_out': 0}
+_totals_lock = threading.Lock()
+
+def _line_priority(line: str) -> int:
+    """0 for headings, 1 for list items stating facts, 2 for other facts, 3 for the rest"""
+    if _HEADING_RE.match(line):
+        return 0
+    has_fact = bool(_FACT_RE.search(line))
+    if _ITEM_RE.match(line):
+        return 1 if has_fact else 2
+    return 2 if has_fact else 3
+
+def _shorten(line: str, max_chars: int) -> str:
+    if len(line) <= max_chars:
+        return line
+    # Keep whole leading sentences where possible
+    cut = line[:max_chars]
+    end = cut.rfind('. ')
+    return cut[:end + 1] if end > max_chars // 2 else cut.rstrip() + "…"
+
+def digest(text: str, max_tokens: int = COMPACTION_PARAMS['max_tokens_per_stage'],
+           max_line_chars: int = COMPACTION_PARAMS['max_line_chars']) -> str:
+    """
+    Size-bounded digest of a stage output for later stages
+
+    Extractive, so it costs no LLM call and is deterministic (stage cache keys
+    built from it stay stable). Lines are kept by priority - headings, then
+    list items with figures or tickers, then other factual lines - and
+    emitted in their original order, so the output keeps its structure.
+    """
+    lines = [re.sub(r"\s+", " ", line).strip() for line in text.splitlines()]
+    lines = [_shorten(line, max_line_chars) for line in lines if line]
+    tokens_in = count_tokens(text)
+    if tokens_in <= max_tokens:
+        result = "\n".join(lines)
+    else:
+        ranked = sorted(range(len(lines)), key=lambda i: (_line_priority(lines[i]), i))
+        kept: List[int] = []
+        used = 0
+        for i in ranked:
+            cost = count_tokens(lines[i]) + 1
+            if used + cost > max_tokens:
+                continue
+            kept.append(i)
+            used += cost
+        result = "\n".join(lines[i] for i in sorted(kept))
+        # A single oversized line must still respect the budget
+        result = truncate_to_tokens(result, max_tokens)
+
+    tokens_out = count_tokens(result)
+    with _totals_lock:
+        compaction_totals['digests'] += 1
+        compaction_totals['tokens_in'] += tokens_in
+        compaction_totals['tokens_out'] += tokens_out
+    count_for_run('compaction', digests=1, tokens_in=tokens_in, tokens_out=tokens_out)
+    return result
+
+def compaction_summary(counts: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+    """Totals (default: compaction_totals; e.g. one run's counts)"""
+    if counts is None:
+        with _totals_lock:
+            counts = dict(compaction_totals)
+    return {k: counts.get(k, 0) for k in compaction_totals}
@@ -26,26 +26,68 @@ def load_environment():
     
     # Set environment variables for the libraries to use
     os.environ["OPENAI_API_KEY"] = openai_api_key
-    
-    # Check for model override in environment
-    openai_model = os.getenv("OPENAI_MODEL_NAME", 'gpt-4o-mini')
-    os.environ["OPENAI_MODEL_NAME"] = openai_model
-    
     os.environ["SERPER_API_KEY"] = serper_api_key
     
+    # Models are chosen per task by the model router (MODEL_ROUTES below)
     return {
         "OPENAI_API_KEY": openai_api_key,
-        "SERPER_API_KEY": serper_api_key,
-        "OPENAI_MODEL_NAME": openai_model
+        "SERPER_API_KEY": serper_api_key
     }
 
+# Model registry: tier, typical latency to first token (ms), output throughput
+# (tokens/s), price per million input/output tokens (USD) and a relative quality
+# score. Measured latency/throughput from real calls replaces the defaults.
+MODEL_REGISTRY = {
+    "gpt-4o-mini": {'tier': 'fast', 'latency_ms': 500, 'tokens_per_second': 85,
+                    'input_cost': 0.15, 'output_cost': 0.60, 'quality': 2},
+    "gpt-4o": {'tier': 'strong', 'latency_ms': 700, 'tokens_per_second': 70,
+               'input_cost': 2.50, 'output_cost': 10.00, 'quality': 4},
+    "gpt-4-turbo": {'tier': 'strong', 'latency_ms': 1200, 'tokens_per_second': 35,
+                    'input_cost': 10.00, 'output_cost': 30.00, 'quality': 3},
+    "gpt-3.5-turbo": {'tier': 'fast', 'latency_ms': 400, 'tokens_per_second': 90,
+                      'input_cost': 0.50, 'output_cost': 1.50, 'quality': 1}
+}
+
 # Get currently available OpenAI models for reference
-AVAILABLE_OPENAI_MODELS = [
-    "gpt-4o-mini",
-    "gpt-4o",
-    "gpt-4-turbo",
-    "gpt-3.5-turbo"
-]
+AVAILABLE_OPENAI_MODELS = list(MODEL_REGISTRY)
+
+# Model used per task (by task name) and for the hierarchical manager. Values are
+# a tier ('fast', 'strong') or a model name; 'delegate' covers the agents a
+# manager delegates to within a stage.
+MODEL_ROUTES = {
+    'manager': 'fast',
+    'delegate': 'fast',
+    'market_research': 'fast',
+    'market_snapshot': 'fast',
+    'data_analysis': 'fast',
+    'candidate_analysis': 'fast',
+    'execution_planning': 'fast',
+    'stock_selection': 'strong',
+    'strategy_development': 'strong',
+    'risk_assessment': 'strong'
+}
+
+# Maximum completion tokens per task (by task name), the manager and delegated
+# helpers; None leaves the provider default. Tasks with a structured output
+# need room for a complete JSON document, since truncated JSON fails validation.
+TASK_MAX_OUTPUT_TOKENS = {
+    'manager': 1000,
+    'delegate': 800,
+    'market_research': 3500,
+    'market_snapshot': 3500,
+    'data_analysis': 1200,
+    'candidate_analysis': 400,
+    'execution_planning': 3000,
+    'stock_selection': 4000,
+    'strategy_development': 1200,
+    'risk_assessment': 3000
+}
+
+# Within a tier, pick the model that minimizes 'cost', 'latency' or maximizes 'quality'
+MODEL_ROUTING_OBJECTIVE = 'cost'
+
+# Optional JSON file overriding MODEL_REGISTRY entries, MODEL_ROUTES and the objective
+MODEL_CONFIG_FILE = os.getenv("STOCKSAGE_MODEL_CONFIG", "model_config.json")
 
 # Default user input parameters
 DEFAULT_INPUTS = {
@@ -57,4 +99,224 @@ DEFAULT_INPUTS = {
     'sector_preferences': 'Technology, Healthcare, Renewable Energy',
     'exclude_sectors': 'Tobacco, Gambling',
     'stock_selection': ''  # Empty default for portfolio mode
-} 
\ No newline at end of file
+} 
+
+# Local market data location (universe table, price store, caches)
+DATA_DIR = os.getenv("STOCKSAGE_DATA_DIR", "data")
+
+# Universe table used by the screener (CSV or Parquet, one row per ticker)
+UNIVERSE_FILE = os.getenv("STOCKSAGE_UNIVERSE_FILE", os.path.join(DATA_DIR, "universe.csv"))
+
+# Price store with one daily OHLCV file per ticker
+PRICE_STORE_DIR = os.getenv("STOCKSAGE_PRICE_DIR", os.path.join(DATA_DIR, "prices"))
+
+# Cached covariance/risk models
+RISK_MODEL_DIR = os.path.join(DATA_DIR, "risk_models")
+
+# Local store of ingested news articles
+NEWS_DB_PATH = os.path.join(DATA_DIR, "news.db")
+
+# Local retrieval index over scraped pages and search results
+DOC_INDEX_PATH = os.path.join(DATA_DIR, "documents.db")
+
+# Latency/throughput measured per model from real calls
+MODEL_PROFILE_FILE = os.path.join(DATA_DIR, "model_profiles.json")
+
+# Cached outputs of individual analysis stages (tasks)
+STAGE_CACHE_DIR = os.path.join(DATA_DIR, "stages")
+
+# Shared daily market-research snapshots per sector set
+SNAPSHOT_DIR = os.path.join(DATA_DIR, "snapshots")
+
+# Delegation edges recorded during analyses (one JSON object per line)
+DELEGATION_TRACE_FILE = os.path.join(DATA_DIR, "delegation_trace.jsonl")
+
+# On-disk tier of the LLM response cache
+LLM_CACHE_PATH = os.path.join(DATA_DIR, "llm_cache.db")
+
+# Screener thresholds per risk tolerance
+SCREENER_THRESHOLDS = {
+    'Low': {'max_pe': 25.0, 'min_momentum': -0.05, 'max_volatility': 0.30},
+    'Medium': {'max_pe': 40.0, 'min_momentum': -0.10, 'max_volatility': 0.45},
+    'High': {'max_pe': 80.0, 'min_momentum': -0.25, 'max_volatility': 0.90},
+}
+
+# Minimum average daily dollar volume as a multiple of initial capital
+SCREENER_MIN_LIQUIDITY_MULTIPLE = 20.0
+
+# Minimum share price accepted by the screener
+SCREENER_MIN_PRICE = 5.0
+
+# Number of candidates handed to the agents
+SCREENER_SHORTLIST_SIZE = 25
+
+# Indicator parameters shared by the indicator engine and its agent tool
+INDICATOR_PARAMS = {
+    'rsi_window': 14,
+    'macd_fast': 12,
+    'macd_slow': 26,
+    'macd_signal': 9,
+    'bollinger_window': 20,
+    'bollinger_std': 2.0,
+    'atr_window': 14,
+    'vwap_window': 20,
+    'ma_fast': 50,
+    'ma_slow': 200
+}
+
+# Execution cost model parameters (square-root impact model on daily bars)
+EXECUTION_COST_PARAMS = {
+    'half_spread_bps': 2.0,
+    'temporary_impact': 0.7,
+    'permanent_impact': 0.1,
+    'buckets_per_day': 13,
+    'horizons_days': [1, 2, 3, 5, 10],
+    'participation_rates': [0.02, 0.05, 0.10, 0.20],
+    'history_days': 60
+}
+
+# Weight on timing risk when ranking execution schedules, per risk tolerance
+EXECUTION_RISK_AVERSION = {
+    'Low': 1.0,
+    'Medium': 0.5,
+    'High': 0.1
+}
+
+# Risk model parameters
+RISK_MODEL_PARAMS = {
+    'window': 252,
+    'n_factors': 5,
+    'chunk_size': 500,
+    'min_coverage': 0.8,
+    'memory_cache_size': 4
+}
+
+# News ingestion parameters
+NEWS_PARAMS = {
+    'refresh_hours': 6,
+    'lookback_days': 7,
+    'results_per_query': 20,
+    'max_tickers': 10,
+    'max_workers': 4,
+    'simhash_distance': 3,
+    'request_timeout': 10
+}
+
+# Retrieval index parameters
+DOC_INDEX_PARAMS = {
+    'chunk_words': 200,
+    'overlap_words': 40,
+    'top_k': 5,
+    'page_ttl_hours': 24
+}
+
+# Scrape extraction limits
+SCRAPE_PARAMS = {
+    'max_download_bytes': 2000000,
+    'max_output_bytes': 40000,
+    'max_output_tokens': 4000,
+    'timeout': 15,
+    # Batch scraping
+    'max_concurrency': 6,
+    'hedge_after': 5,
+    'retries': 1,
+    'batch_deadline': 30,
+    'batch_max_urls': 8,
+    'batch_output_tokens': 1500
+}
+
+# Speculative search prefetch at job start
+PREFETCH_PARAMS = {
+    'enabled': True,
+    'max_workers': 6,
+    'max_tickers': 5,
+    'cache_ttl_minutes': 60,
+    'max_entries': 256
+}
+
+# Stage output reuse between runs
+STAGE_CACHE_PARAMS = {
+    'enabled': True,
+    'ttl_hours': 12
+}
+
+# Scenario sweeps
+SWEEP_PARAMS = {
+    'max_workers': 3,
+    'max_scenarios': 12
+}
+
+# Per-candidate fan-out in portfolio stock selection
+FANOUT_PARAMS = {
+    'enabled': True,
+    'max_candidates': 15,
+    'max_workers': 5,
+    'notes_chars': 1500
+}
+
+# Digest of each stage output handed to later stages
+COMPACTION_PARAMS = {
+    'enabled': True,
+    'max_tokens_per_stage': 600,
+    'max_line_chars': 320
+}
+
+# LLM response cache; only the calls of the agent roles listed here opt in
+LLM_CACHE_PARAMS = {
+    'enabled': True,
+    'max_entries': 512,
+    'ttl_hours': 24,
+    'agents': ['Crew Manager', 'Market Opportunity Scout', 'Data Analyst', 'Investment Portfolio Curator']
+}
+
+# Delegation policy per agent role ('default' applies to roles not listed).
+# max_depth: deepest delegation chain this agent may extend (the stage's lead
+# agent is depth 0); max_delegations: delegations and questions per task;
+# allowed_targets: coworker roles it may delegate to (None for any).
+DELEGATION_POLICIES = {
+    'default': {'max_depth': 1, 'max_delegations': 1, 'allowed_targets': None},
+    'Crew Manager': {'max_depth': 1, 'max_delegations': 3, 'allowed_targets': None},
+    'Data Analyst': {'max_delegations': 0},
+    'Market Opportunity Scout': {'max_delegations': 0},
+    'Trading Strategy Developer': {'allowed_targets': ['Data Analyst']},
+    'Trade Advisor': {'allowed_targets': ['Data Analyst']},
+    'Risk Advisor': {'allowed_targets': ['Data Analyst', 'Trade Advisor']},
+    'Investment Portfolio Curator': {'allowed_targets': ['Market Opportunity Scout', 'Data Analyst']}
+}
+
+# Token streaming of LLM output to the CLI and web interface
+STREAM_PARAMS = {
+    'enabled': True
+}
+
+# Local HTTP API server (python main.py --serve)
+API_PARAMS = {
+    'host': os.getenv("STOCKSAGE_API_HOST", "127.0.0.1"),
+    'port': int(os.getenv("STOCKSAGE_API_PORT", "8000")),
+    'workers': 2,
+    'max_finished_jobs': 100,
+    'max_events_per_job': 5000,
+    'heartbeat_seconds': 15
+}
+
+# Multi-process worker farm (python main.py --serve --processes N). Each worker
+# process has its own agents and tools; workers are replaced after
+# max_jobs_per_worker analyses or when they crash.
+WORKER_FARM_PARAMS = {
+    'processes': os.cpu_count() or 1,
+    'max_jobs_per_worker': 25,
+    'restart_delay_seconds': 1.0
+}
+
+# Job broker for batches spread over worker nodes (main.py --enqueue / --worker).
+# A leased job returns to the queue when its lease is not renewed by a
+# heartbeat within lease_seconds; failed jobs are retried up to max_attempts
+# with exponential backoff from retry_delay_seconds.
+BROKER_PATH = os.getenv("STOCKSAGE_BROKER_PATH", os.path.join(DATA_DIR, "jobs.db"))
+BROKER_PARAMS = {
+    'lease_seconds': 300,
+    'heartbeat_seconds': 60,
+    'max_attempts': 3,
+    'retry_delay_seconds': 30,
+    'poll_seconds': 2
+}
@@ -1,12 +1,11 @@
-from crewai import Crew, Process
-from langchain_openai import ChatOpenAI
+from crewai import Crew, LLM, Process, Task
 import time
-import os
 import random
 import datetime
 from typing import List, Dict, Any, Optional, Callable
 
 from agents import (
+    search_tool,
     data_analyst_agent,
     trading_strategy_agent,
     execution_agent,
@@ -21,10 +20,53 @@ from tasks import (
     execution_planning_task,
     risk_assessment_task,
     market_research_task,
-    stock_selection_task
+    stock_selection_task,
+    market_snapshot_task,
+    candidate_analysis_task
 )
 
-from config import AVAILABLE_OPENAI_MODELS
+from config import (
+    PREFETCH_PARAMS,
+    STAGE_CACHE_PARAMS,
+    FANOUT_PARAMS,
+    COMPACTION_PARAMS,
+    TASK_MAX_OUTPUT_TOKENS,
+    LLM_CACHE_PARAMS,
+    STREAM_PARAMS
+)
+from model_router import model_router, register_latency_listeners
+from llm_metrics import (
+    cache_summary,
+    format_call,
+    register_usage_callback,
+    register_usage_listeners
+)
+from screener import screen_universe, format_shortlist
+from news import news_enabled, news_topics, ingest_news
+from sentiment import score_unscored
+from prefetch import predict_queries, start_prefetch
+from cancellation import (
+    CancellationToken,
+    cancellable,
+    cancellation_scope,
+    check_cancelled,
+    current_token
+)
+from streaming import register_stream_listeners, token_stream
+from llm_cache import response_cache, with_response_cache
+from delegation import (
+    MANAGER_ROLE,
+    delegation_scope,
+    delegation_trace,
+    format_edge_summary,
+    may_delegate,
+    summarize_edges
+)
+from compaction import compaction_summary, digest
+from stages import StageOutput, run_stages, stage_cache, task_templates
+from snapshot import snapshot_store
+from fanout import candidate_notes, extract_candidates, fan_out, universe_tickers
+from run_stats import RunStats, current_run_stats, run_stats_scope
 
 # Define types for agent logs
 AgentLogEntry = Dict[str, Any]
@@ -44,7 +86,12 @@ def handle_rate_limits(func):
                     retry_count += 1
                     wait_time = (2 ** retry_count) + random.uniform(0, 1)  # Exponential backoff with jitter
                     print(f"Rate limit hit. Retrying in {wait_time:.2f} seconds...")
-                    time.sleep(wait_time)
+                    token = kwargs.get('cancel_token') or current_token()
+                    if token is not None:
+                        token.wait(wait_time)
+                        token.raise_if_cancelled()
+                    else:
+                        time.sleep(wait_time)
                 else:
                     raise  # Re-raise if it's not a rate limit error
         
@@ -77,6 +124,11 @@ class AgentLogger:
         """Register a callback to be notified on new log entries"""
         self.callbacks.append(callback)
     
+    def unregister_callback(self, callback: Callable[[AgentLogEntry], None]):
+        """Stop notifying a registered callback"""
+        if callback in self.callbacks:
+            self.callbacks.remove(callback)
+    
     def get_logs(self) -> List[AgentLogEntry]:
         """Get all logs"""
         return self.logs
@@ -104,22 +156,13 @@ def register_crew_callbacks(crew):
         "on_agent_end": on_agent_end
     }
 
-# Define the crew with agents and tasks
-def create_financial_trading_crew(mode='portfolio'):
+def crew_members(mode='portfolio'):
     """
-    Create and return the financial trading crew with all agents and tasks
+    Agents and tasks (in execution order) for an analysis mode
     
     Args:
         mode (str): 'portfolio' for multi-stock recommendations or 'single' for single stock analysis
     """
-    
-    # Select appropriate model
-    model_name = os.environ.get("OPENAI_MODEL_NAME", 'gpt-4o-mini')
-    if model_name not in AVAILABLE_OPENAI_MODELS:
-        print(f"Warning: {model_name} not in known model list. Defaulting to gpt-4o-mini.")
-        model_name = 'gpt-4o-mini'
-    
-    # Create the right agent/task combination based on mode
     if mode == 'portfolio':
         agents = [
             market_research_specialist,
@@ -148,21 +191,97 @@ def create_financial_trading_crew(mode='portfolio'):
             execution_planning_task, 
             risk_assessment_task
         ]
+    return agents, tasks
+
+def task_model(task):
+    """Model routed to a task by its name (see MODEL_ROUTES)"""
+    return model_router.choose(getattr(task, 'name', None) or 'delegate')
+
+# Builds the LLM of every route; stub mode and tests swap it with set_llm_factory
+_llm_factory = LLM
+
+def set_llm_factory(factory=None):
+    """Build route LLMs with factory(model=..., **kwargs) instead of crewai's LLM; None restores it"""
+    global _llm_factory
+    _llm_factory = factory or LLM
+
+def route_llm(route, **kwargs):
+    """
+    crewai LLM for a route, capped at the route's maximum output tokens,
+    streaming its output when enabled, answering repeated calls of the
+    agents that opt in from the response cache and checking for
+    cancellation around every call
+    """
+    llm = _llm_factory(model=model_router.choose(route), max_tokens=TASK_MAX_OUTPUT_TOKENS.get(route),
+              stream=STREAM_PARAMS['enabled'], **kwargs)
+    if LLM_CACHE_PARAMS['enabled']:
+        llm = with_response_cache(llm)
+    return cancellable(llm)
+
+def isolated_stage_members(agents, tasks):
+    """
+    Fresh copies of agents and tasks built from the task templates
     
-    # Log agent setup
-    for agent in agents:
-        agent_logger.add_log(agent.role, "Agent initialized")
+    The module-level agents and tasks hold per-run state (interpolated
+    descriptions, agent executors), so stages that may run concurrently,
+    e.g. in a sweep, each get their own copies.
+    """
+    agent_copies = [agent.copy() for agent in agents]
+    by_role = {agent.role: agent for agent in agent_copies}
+    
+    # Agents only reached through delegation run on the delegate route's model
+    delegate_llm = route_llm('delegate')
+    for agent in agent_copies:
+        agent.llm = delegate_llm
+        # Agents whose policy allows no delegation get no delegation tools
+        agent.allow_delegation = may_delegate(agent.role)
+    
+    task_copies = []
+    for task in tasks:
+        description, expected_output = task_templates(task)
+        agent = by_role.get(task.agent.role)
+        if agent is None:
+            agent = task.agent.copy()
+            agent.allow_delegation = may_delegate(agent.role)
+        agent.llm = route_llm(getattr(task, 'name', None) or 'delegate')
+        task_copies.append(Task(
+            name=task.name,
+            description=description,
+            expected_output=expected_output,
+            agent=agent,
+            output_pydantic=task.output_pydantic
+        ))
+    return agent_copies, task_copies
+
+# Define the crew with agents and tasks
+def create_financial_trading_crew(mode='portfolio', tasks=None):
+    """
+    Create and return the financial trading crew with all agents and tasks
+    
+    Args:
+        mode (str): 'portfolio' for multi-stock recommendations or 'single' for single stock analysis
+        tasks (list): Run only these tasks (e.g. a single stage) instead of the full mode pipeline
+    """
+    
+    # Create the right agent/task combination based on mode
+    agents, mode_tasks = crew_members(mode)
+    if tasks is None:
+        tasks = mode_tasks
+        
+        # Log agent setup
+        for agent in agents:
+            agent_logger.add_log(agent.role, "Agent initialized")
+    else:
+        agents, tasks = isolated_stage_members(agents, tasks)
         
     # Create and return crew
     crew = Crew(
         agents=agents,
         tasks=tasks,
-        manager_llm=ChatOpenAI(
-            model=model_name, 
-            temperature=0.7
-        ),
+        manager_llm=route_llm('manager', temperature=0.7),
         process=Process.hierarchical,
-        verbose=True
+        verbose=True,
+        step_callback=check_step
     )
     
     # Register callbacks (would be implemented with CrewAI's official callback API)
@@ -170,17 +289,33 @@ def create_financial_trading_crew(mode='portfolio'):
     
     return crew
 
+def check_step(step_output):
+    """Crew step callback stopping the run between agent steps once it is cancelled"""
+    check_cancelled()
+
 @handle_rate_limits
-def run_financial_analysis(inputs):
+def run_financial_analysis(inputs, cancel_token=None):
     """
     Run the financial analysis with the given inputs
     
     Args:
         inputs (dict): Dictionary containing user inputs
+        cancel_token (CancellationToken): Cancelling it stops the run at the next
+            agent step, LLM call, tool request or stage; defaults to the
+            caller's current token
     
     Returns:
-        CrewOutput: Result from the crew execution
+        StagedResult: Per-stage outputs; raw holds the final report
+    
+    Raises:
+        AnalysisCancelled: If the token was cancelled before the run finished
     """
+    # Summaries report this run's own counts, also when runs share the process
+    with cancellation_scope(cancel_token or current_token() or CancellationToken()), run_stats_scope():
+        return analyze(inputs)
+
+def analyze(inputs):
+    """Body of run_financial_analysis, run under the analysis' cancellation token"""
     
     # Determine analysis mode
     mode = 'single' if inputs.get('stock_selection') else 'portfolio'
@@ -210,8 +345,57 @@ def run_financial_analysis(inputs):
     # Log analysis start
     agent_logger.add_log("Crew Manager", f"Starting financial analysis in {mode} mode")
     
-    # Create the crew for the appropriate mode
-    financial_trading_crew = create_financial_trading_crew(mode)
+    # Feed measured latency and throughput back into the model registry
+    register_latency_listeners()
+    
+    # Report cached vs uncached prompt tokens per call; static prompt prefixes
+    # (instructions before the per-run parameters) are what providers can cache
+    register_usage_listeners()
+    register_usage_callback(log_llm_call)
+    
+    # Relay streamed tokens to whichever interface registered a stream callback
+    register_stream_listeners()
+    stats = current_run_stats() or RunStats()
+    delegation_trace.register_callback(log_delegation)
+    
+    # Pre-filter the local universe so market research starts from a shortlist
+    candidate_tickers = []
+    if mode == 'portfolio':
+        candidates = screen_universe(processed_inputs)
+        processed_inputs['candidate_shortlist'] = format_shortlist(candidates)
+        if not candidates.empty:
+            candidate_tickers = list(candidates['ticker'])
+        agent_logger.add_log("Universe Screener", "Candidate shortlist prepared",
+                           details=f"{len(candidates)} candidates passed the local screen")
+    
+    # Start the predictable searches and the news ingestion in the background
+    # so the agents' first tool calls hit the cache
+    topics = news_topics(processed_inputs, candidate_tickers) if news_enabled(processed_inputs) else None
+    queries = predict_queries(processed_inputs, candidate_tickers) if PREFETCH_PARAMS['enabled'] else []
+    prefetch = start_prefetch(queries, lambda q: search_tool._run(search_query=q), topics)
+    if queries:
+        agent_logger.add_log("Prefetcher", "Speculative searches started",
+                           details=f"{len(queries)} searches" + (f", news for {len(topics)} topics" if topics else ""))
+    
+    # Ingest news up front so agents read the local store instead of re-searching
+    if topics is not None:
+        added = prefetch.news_result()
+        scored = score_unscored()
+        processed_inputs['news_instructions'] = news_instructions(topics)
+        # Market research is shared across investor profiles, so it only reads sector news
+        processed_inputs['research_news_instructions'] = news_instructions(news_topics(processed_inputs))
+        agent_logger.add_log("News Ingestion", "News store updated",
+                           details=f"{sum(n for n in added.values() if n > 0)} new articles across "
+                                   f"{len(topics)} topics, {scored} scored for sentiment")
+    else:
+        processed_inputs['news_instructions'] = news_instructions(None)
+        processed_inputs['research_news_instructions'] = news_instructions(None)
+    processed_inputs['research_date'] = datetime.date.today().isoformat()
+    
+    # Log agent setup for the appropriate mode
+    agents, tasks = crew_members(mode)
+    for agent in agents:
+        agent_logger.add_log(agent.role, "Agent initialized")
     
     # Execute the crew with the processed inputs
     print(f"Starting financial analysis in {mode} mode...")
@@ -220,20 +404,239 @@ def run_financial_analysis(inputs):
     agent_logger.add_log("Crew Manager", "Analysis parameters", 
                        details=f"Capital: {processed_inputs['initial_capital']}, Risk: {processed_inputs['risk_tolerance']}")
     
-    # Execute the crew
-    result = financial_trading_crew.kickoff(inputs=processed_inputs)
+    # Run one hierarchical crew per stage so each stage's output can be cached
+    # under only the inputs it uses; unchanged upstream stages are reused
+    def run_stage(task, stage_inputs):
+        check_cancelled()
+        stage_crew = create_financial_trading_crew(mode, tasks=[task])
+        with delegation_scope(getattr(task, 'name', None) or task.agent.role, MANAGER_ROLE):
+            return stage_crew.kickoff(inputs=stage_inputs)
+    
+    def on_stage(stage):
+        if stage.cached:
+            agent_logger.add_log(stage.name, "Reused cached stage output", details=f"Stage key {stage.key}")
+        else:
+            agent_logger.add_log(stage.name, "Completed stage", details=stage.raw[:100] + "...")
+    
+    # Start from today's shared market-research snapshot when one matches the sector preferences
+    prior = []
+    if mode == 'portfolio' and processed_inputs.get('use_market_snapshot', True):
+        snapshot = snapshot_store.latest(processed_inputs)
+        if snapshot:
+            tasks = [t for t in tasks if t is not market_research_task]
+            prior = [StageOutput(market_research_task.agent.role, snapshot['briefing'],
+                                 f"snapshot:{snapshot['key']}.v{snapshot['version']}", cached=True)]
+            agent_logger.add_log("Crew Manager", "Using shared market snapshot",
+                               details=f"Snapshot {snapshot['date']} v{snapshot['version']} "
+                                       f"created at {snapshot['created_at'][11:16]}")
+    
+    reuse = STAGE_CACHE_PARAMS['enabled'] and processed_inputs.get('reuse_stage_outputs', True)
+    cache = stage_cache if reuse else None
+    
+    # Later stages receive a bounded digest of each earlier output rather than all of it
+    compact = digest if COMPACTION_PARAMS['enabled'] else None
+    if mode == 'portfolio' and stock_selection_task in tasks:
+        # Research first; it only depends on the sectors and the date, so runs
+        # for other profiles reuse it. The profile-specific screen enters after
+        # it, then (with fan-out) one small concurrent evaluation per candidate,
+        # and stock selection reduces them to the final picks
+        split = tasks.index(stock_selection_task)
+        research = run_stages(tasks[:split], processed_inputs, run_stage, cache=cache,
+                              model_for=task_model, on_stage=on_stage, prior=prior, compact=compact)
+        # Screened for this run, so not counted as a reused stage
+        findings = research.tasks_output + [
+            StageOutput("Universe Screener", processed_inputs['candidate_shortlist'], "screen", cached=False)
+        ]
+        if FANOUT_PARAMS['enabled']:
+            findings += evaluate_candidates(research.tasks_output, processed_inputs, candidate_tickers, cache)
+        result = run_stages(tasks[split:], processed_inputs, run_stage, cache=cache,
+                            model_for=task_model, on_stage=on_stage, prior=findings, compact=compact)
+    else:
+        result = run_stages(tasks, processed_inputs, run_stage, cache=cache,
+                            model_for=task_model, on_stage=on_stage, prior=prior, compact=compact)
+    if result.reused:
+        agent_logger.add_log("Crew Manager", "Stage cache summary",
+                           details=f"{result.reused} of {len(result.tasks_output)} stage outputs reused "
+                                   f"from snapshots or earlier runs")
+    
+    # Report where delegation time went, most expensive edges first
+    delegations = summarize_edges(stats.records('delegation'))
+    if delegations:
+        agent_logger.add_log("Crew Manager", "Delegation summary", details=format_edge_summary(delegations))
+    
+    # Report how many LLM calls were answered from the response cache
+    responses = response_cache.summary(stats.counts('response_cache'))
+    if responses['memory_hits'] + responses['disk_hits'] + responses['misses']:
+        agent_logger.add_log("Crew Manager", "LLM response cache summary",
+                           details=f"{responses['memory_hits']} memory hits, {responses['disk_hits']} disk hits, "
+                                   f"{responses['misses']} misses ({responses['hit_rate']:.0%} hit rate)")
+    
+    # Report how much compaction shrank the findings passed between stages
+    compaction = compaction_summary(stats.counts('compaction'))
+    if compaction['digests']:
+        removed = compaction['tokens_in'] - compaction['tokens_out']
+        agent_logger.add_log("Crew Manager", "Context compaction summary",
+                           details=f"{compaction['digests']} stage outputs digested, "
+                                   f"{compaction['tokens_in']:,} -> {compaction['tokens_out']:,} tokens "
+                                   f"({removed:,} fewer prompt tokens, "
+                                   f"{removed / max(compaction['tokens_in'], 1):.0%})")
+    
+    # Report how many agent searches were answered by the prefetch
+    if queries:
+        searches = stats.counts('search_cache')
+        agent_logger.add_log("Prefetcher", "Search cache summary",
+                           details=f"{prefetch.completed_searches()}/{len(queries)} prefetched searches completed; "
+                                   f"{searches.get('hits', 0)} searches served from cache and "
+                                   f"{searches.get('misses', 0)} sent to the web this run "
+                                   f"(prefetches included)")
+    
+    # Report how much the scrape extractor kept out of the prompts
+    extraction = stats.counts('extraction')
+    pages = extraction.get('calls', 0)
+    if pages:
+        saved = extraction['tokens_saved']
+        downloaded = extraction['bytes_downloaded']
+        returned = extraction['bytes_returned']
+        agent_logger.add_log("Scrape Extractor", "Page extraction summary",
+                           details=f"{pages} pages, {downloaded / 1024:.0f} KB downloaded, "
+                                   f"{returned / 1024:.0f} KB passed to agents, ~{saved:,} tokens saved")
+    
+    # Report how much of the prompt volume the provider served from its cache
+    usage = cache_summary(stats.counts('prompt_cache'))
+    if usage['calls']:
+        agent_logger.add_log("Crew Manager", "Prompt cache summary",
+                           details=f"{usage['calls']} LLM calls, {usage['prompt_tokens']:,} prompt tokens, "
+                                   f"{usage['cached_tokens']:,} cached ({usage['cached_share']:.0%}), "
+                                   f"{usage['completion_tokens']:,} completion tokens")
     
     # Log completion
     agent_logger.add_log("Crew Manager", "Analysis complete")
     
     return result
 
+def log_llm_call(call):
+    """Log one LLM call's prompt-cache usage under the agent that made it"""
+    agent_logger.add_log(call['agent_role'] or "LLM", "LLM call", details=format_call(call))
+
+def log_delegation(edge):
+    """Log one delegation edge under the delegating agent"""
+    if edge['status'] == 'blocked':
+        agent_logger.add_log(edge['from'], f"Delegation to {edge['to']} blocked", details=edge['reason'])
+    else:
+        agent_logger.add_log(edge['from'], f"Delegated to {edge['to']}",
+                           details=f"{edge['kind']} at depth {edge['depth']}, {edge['seconds']:.1f}s ({edge['status']})")
+
+def run_single_agent_stage(task, stage_inputs):
+    """Run a task with only its own agent in a sequential crew (no manager)"""
+    check_cancelled()
+    agents, tasks = isolated_stage_members([task.agent], [task])
+    stage_crew = Crew(agents=agents, tasks=tasks, process=Process.sequential, verbose=True,
+                      step_callback=check_step)
+    with delegation_scope(getattr(task, 'name', None) or task.agent.role, task.agent.role):
+        return stage_crew.kickoff(inputs=stage_inputs).raw
+
+def evaluate_candidates(research_outputs, inputs, screened_tickers, cache):
+    """
+    Fan out one bounded sub-analysis per research candidate
+    
+    Candidates are the shortlisted tickers named in the research, then other
+    universe tickers it explicitly marks (falling back to the shortlist). Each gets its own small crew call that only sees
+    the research lines about that ticker; verdicts are cached like stages.
+    
+    Returns:
+        list: One StageOutput per successfully evaluated candidate
+    """
+    research = "\n\n".join(output.raw for output in research_outputs)
+    candidates = extract_candidates(research, screened_tickers, universe_tickers())
+    if not candidates:
+        candidates = list(screened_tickers)[:FANOUT_PARAMS['max_candidates']]
+    if not candidates:
+        return []
+    
+    agent_logger.add_log("Candidate Fan-out", "Evaluating candidates in parallel",
+                       details=", ".join(candidates))
+    
+    def analyze(ticker):
+        candidate_inputs = {**inputs, 'candidate': ticker, 'candidate_notes': candidate_notes(research, ticker)}
+        stage = run_stages([candidate_analysis_task], candidate_inputs, run_single_agent_stage,
+                           cache=cache, model_for=task_model).tasks_output[0]
+        return StageOutput(f"Candidate evaluation: {ticker}", stage.raw, stage.key, stage.cached)
+    
+    verdicts = fan_out(candidates, analyze)
+    agent_logger.add_log("Candidate Fan-out", "Candidate evaluations complete",
+                       details=f"{len(verdicts)} of {len(candidates)} candidates evaluated")
+    return list(verdicts.values())
+
+def news_instructions(topics):
+    """Instruction text telling agents how to use the locally ingested news"""
+    if topics is None:
+        return "Do not factor recent news headlines into this analysis."
+    return (
+        "Recent news for " + ", ".join(topics) + " has been collected locally. "
+        "Check its tone with the News Sentiment tool and read specific headlines with the "
+        "Stored News tool instead of running new web searches for news."
+    )
+
+@handle_rate_limits
+def warm_market_snapshot(inputs):
+    """
+    Produce today's shared market-research snapshot for the inputs' sector set
+    
+    Run it once per sector set (e.g. from a scheduled job) before client
+    analyses; every portfolio analysis with the same sector preferences
+    that day then starts from the snapshot instead of its own market research.
+    
+    Args:
+        inputs (dict): Dictionary with sector_preferences, exclude_sectors and
+            news_impact_consideration; profile fields are ignored
+    
+    Returns:
+        dict: The stored snapshot, including its date and version
+    """
+    processed_inputs = {k: v for k, v in inputs.items()}
+    processed_inputs['snapshot_date'] = datetime.date.today().isoformat()
+    processed_inputs['exclude_sectors'] = processed_inputs.get('exclude_sectors') or "none"
+    
+    agent_logger.add_log("Crew Manager", "Building shared market snapshot",
+                       details=processed_inputs.get('sector_preferences'))
+    
+    if news_enabled(processed_inputs):
+        topics = news_topics(processed_inputs)
+        ingest_news(topics)
+        score_unscored()
+        processed_inputs['news_instructions'] = news_instructions(topics)
+    else:
+        processed_inputs['news_instructions'] = news_instructions(None)
+    
+    snapshot_crew = create_financial_trading_crew('portfolio', tasks=[market_snapshot_task])
+    with delegation_scope(market_snapshot_task.name, MANAGER_ROLE):
+        briefing = snapshot_crew.kickoff(inputs=processed_inputs).raw
+    snapshot = snapshot_store.save(inputs, briefing, task_model(market_snapshot_task))
+    
+    agent_logger.add_log("Crew Manager", "Market snapshot stored",
+                       details=f"{snapshot['date']} v{snapshot['version']} ({snapshot['key']})")
+    return snapshot
+
 # Function to get the current agent logs
 def get_agent_logs():
     """Get the current agent logs"""
     return agent_logger.get_logs()
 
+# Function to register a callback for streamed LLM output
+def register_stream_callback(callback):
+    """Register a function called with each streamed chunk of LLM output"""
+    register_stream_listeners()
+    token_stream.register_callback(callback)
+
+def unregister_stream_callback(callback):
+    """Stop calling a function registered with register_stream_callback"""
+    token_stream.unregister_callback(callback)
+
 # Function to register a callback for new log entries
 def register_log_callback(callback):
     """Register a callback function to be called when new logs are added"""
-    agent_logger.register_callback(callback) 
\ No newline at end of file
+    agent_logger.register_callback(callback)
+
+def unregister_log_callback(callback):
+    """Stop calling a function registered with register_log_callback"""
+    agent_logger.unregister_callback(callback) 
\ No newline at end of file
@@ -0,0 +1,176 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from collections.abc import Sequence
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from crewai import Agent
+from crewai.tools.agent_tools.ask_question_tool import AskQuestionTool
+from crewai.tools.agent_tools.delegate_work_tool import DelegateWorkTool
+
+from config import DELEGATION_POLICIES, DELEGATION_TRACE_FILE
+from run_stats import record_for_run
+
+# Role crewai gives the manager of a hierarchical crew
+MANAGER_ROLE = "Crew Manager"
+
+# Roles of the agents currently executing, from the stage's lead agent down to
+# the latest delegate, and the stage they belong to
+_chain: contextvars.ContextVar = contextvars.ContextVar('delegation_chain', default=())
+_stage: contextvars.ContextVar = contextvars.ContextVar('delegation_stage', default='')
+
+def _normalize(role: str) -> str:
+    return " ".join(str(role or '').replace('"', '').split()).casefold()
+
+def policy_for(role: str) -> Dict[str, Any]:
+    """Delegation policy of a role: its DELEGATION_POLICIES entry over the default"""
+    policies = {_normalize(r): p for r, p in DELEGATION_POLICIES.items()}
+    return {**DELEGATION_POLICIES.get('default', {}), **policies.get(_normalize(role), {})}
+
+def may_delegate(role: str) -> bool:
+    return policy_for(role).get('max_delegations', 0) > 0 and policy_for(role).get('max_depth', 0) > 0
+
+@contextmanager
+def delegation_scope(stage: str, lead_role: str):
+    """Mark the agent leading a stage (the manager in a hierarchical crew) as the root of its delegation chain"""
+    chain_token = _chain.set((lead_role,))
+    stage_token = _stage.set(stage)
+    try:
+        yield
+    finally:
+        _chain.reset(chain_token)
+        _stage.reset(stage_token)
+
+class DelegationTrace:
+    """
+    Every delegation edge with its duration and outcome
+
+    Edges are added to the stats of the run they belong to, for its summary,
+    and appended to a JSONL file so expensive delegation loops can be found
+    across runs. Nothing is kept here, so a long-lived server does not
+    accumulate edges or mix those of concurrent jobs.
+    """
+
+    def __init__(self, path: Optional[str] = DELEGATION_TRACE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[Dict[str, Any]], None]] = []
+
+    def register_callback(self, callback: Callable[[Dict[str, Any]], None]):
+        if callback not in self._callbacks:
+            self._callbacks.append(callback)
+
+    def record(self, edge: Dict[str, Any]):
+        record_for_run('delegation', edge)
+        with self._lock:
+            if self.path:
+                try:
+                    os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                    with open(self.path, 'a') as f:
+                        f.write(json.dumps(edge) + "\n")
+                except OSError as e:
+                    print(f"Warning: could not write delegation trace: {str(e)}")
+        for callback in list(self._callbacks):
+            try:
+                callback(edge)
+            except Exception as e:
+                print(f"Warning: delegation trace callback failed: {str(e)}")
+
+# Shared delegation trace instance
+delegation_trace = DelegationTrace()
+
+def summarize_edges(edges: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Edges grouped by delegator and target, most time-consuming first"""
+    groups: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for edge in edges:
+        group = groups.setdefault((edge['from'], edge['to']), {
+            'from': edge['from'], 'to': edge['to'], 'count': 0, 'blocked': 0, 'seconds': 0.0, 'max_depth': 0
+        })
+        group['count'] += 1
+        group['blocked'] += edge['status'] == 'blocked'
+        group['seconds'] += edge['seconds']
+        group['max_depth'] = max(group['max_depth'], edge['depth'])
+    return sorted(groups.values(), key=lambda g: g['seconds'], reverse=True)
+
+def format_edge_summary(groups: List[Dict[str, Any]]) -> str:
+    return "; ".join(f"{g['from']} -> {g['to']}: {g['count']}x, {g['seconds']:.1f}s"
+                     + (f", {g['blocked']} blocked" if g['blocked'] else "") for g in groups)
+
+class DelegationGuardMixin:
+    """
+    Enforces the delegator's policy before a delegation or question runs and
+    records the edge
+
+    The chain and stage are captured when crewai creates the tools for a task,
+    since tool calls may run outside the context that created them.
+    """
+
+    def _execute(self, agent_name: Optional[str], task: str, context: Optional[str] = None) -> str:
+        chain = _chain.get() or self.captured_chain or (MANAGER_ROLE,)
+        stage = _stage.get() or self.captured_stage
+        delegator = chain[-1]
+        policy = policy_for(delegator)
+        target = " ".join(str(agent_name or '').replace('"', '').split())
+        allowed = policy.get('allowed_targets')
+        edge = {'stage': stage, 'from': delegator, 'to': target, 'kind': self.delegation_kind,
+                'depth': len(chain), 'seconds': 0.0, 'status': 'ok', 'reason': '',
+                'at': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+        if len(chain) > policy.get('max_depth', 0):
+            edge['reason'] = f"delegation depth limit {policy.get('max_depth', 0)} reached"
+        elif self.budget['used'] >= policy.get('max_delegations', 0):
+            edge['reason'] = f"limit of {policy.get('max_delegations', 0)} delegations per task reached"
+        elif allowed is not None and _normalize(target) not in {_normalize(r) for r in allowed}:
+            edge['reason'] = f"{delegator} may only delegate to: {', '.join(allowed) or 'nobody'}"
+        if edge['reason']:
+            edge['status'] = 'blocked'
+            delegation_trace.record(edge)
+            return (f"Delegation not allowed: {edge['reason']}. "
+                    "Complete this work yourself with your own tools and the information you already have.")
+
+        self.budget['used'] += 1
+        token = _chain.set(chain + (target,))
+        started = time.monotonic()
+        try:
+            result = super()._execute(agent_name, task, context)
+        except Exception as e:
+            edge['status'] = 'error'
+            edge['reason'] = str(e)
+            raise
+        finally:
+            _chain.reset(token)
+            edge['seconds'] = round(time.monotonic() - started, 3)
+            delegation_trace.record(edge)
+        return result
+
+class GuardedDelegateWorkTool(DelegationGuardMixin, DelegateWorkTool):
+    delegation_kind: str = 'delegate'
+    captured_chain: Tuple[str, ...] = ()
+    captured_stage: str = ''
+    budget: Any = None
+
+class GuardedAskQuestionTool(DelegationGuardMixin, AskQuestionTool):
+    delegation_kind: str = 'question'
+    captured_chain: Tuple[str, ...] = ()
+    captured_stage: str = ''
+    budget: Any = None
+
+class PolicyAgent(Agent):
+    """Agent whose delegation tools enforce DELEGATION_POLICIES and record every edge"""
+
+    def get_delegation_tools(self, agents: Sequence[Any]) -> list:
+        tools = super().get_delegation_tools(agents)
+        # One budget per task: crewai builds delegation tools for each task it runs
+        # (typed Any in the tools so pydantic shares the dict instead of copying it)
+        shared = {'captured_chain': _chain.get(), 'captured_stage': _stage.get(), 'budget': {'used': 0}}
+        guarded = []
+        for tool in tools:
+            if isinstance(tool, DelegateWorkTool):
+                tool = GuardedDelegateWorkTool(agents=tool.agents, description=tool.description, **shared)
+            elif isinstance(tool, AskQuestionTool):
+                tool = GuardedAskQuestionTool(agents=tool.agents, description=tool.description, **shared)
+            guarded.append(tool)
+        return guarded
@@ -0,0 +1,132 @@
+import datetime
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from config import DOC_INDEX_PATH, DOC_INDEX_PARAMS
+
+_WORD_RE = re.compile(r"\w+")
+
+def chunk_text(text: str, chunk_words: int = DOC_INDEX_PARAMS['chunk_words'],
+               overlap_words: int = DOC_INDEX_PARAMS['overlap_words']) -> List[str]:
+    """Split text into overlapping word windows"""
+    words = text.split()
+    if not words:
+        return []
+    step = max(chunk_words - overlap_words, 1)
+    return [" ".join(words[i:i + chunk_words]) for i in range(0, max(len(words) - overlap_words, 1), step)]
+
+class DocumentIndex:
+    """
+    Local document store with a BM25-ranked inverted index
+
+    Pages and search results are split into overlapping chunks and indexed
+    with SQLite FTS5, so retrieval returns only the few chunks relevant to a
+    query instead of whole pages.
+    """
+
+    def __init__(self, path: str = DOC_INDEX_PATH):
+        self.path = path
+        self._initialized = False
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS documents (
+                    id INTEGER PRIMARY KEY,
+                    url TEXT UNIQUE NOT NULL,
+                    kind TEXT NOT NULL,
+                    title TEXT,
+                    content TEXT NOT NULL,
+                    fetched_at TEXT NOT NULL
+                );
+                CREATE VIRTUAL TABLE IF NOT EXISTS chunks USING fts5(
+                    text, doc_id UNINDEXED, position UNINDEXED, tokenize='porter unicode61'
+                );
+            """)
+            self._initialized = True
+        return conn
+
+    @contextmanager
+    def session(self):
+        """Connection that commits on success and is always closed"""
+        conn = self._connect()
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def add_document(self, url: str, content: str, kind: str = 'page', title: str = '') -> int:
+        """Store a document and (re)index its chunks, returning the number of chunks"""
+        if not content or not content.strip():
+            return 0
+        chunks = chunk_text(content)
+        now = datetime.datetime.now().isoformat()
+        with self._lock, self.session() as conn:
+            row = conn.execute("SELECT id FROM documents WHERE url = ?", (url,)).fetchone()
+            if row:
+                doc_id = row['id']
+                conn.execute("UPDATE documents SET kind = ?, title = ?, content = ?, fetched_at = ? WHERE id = ?",
+                             (kind, title, content, now, doc_id))
+                conn.execute("DELETE FROM chunks WHERE doc_id = ?", (doc_id,))
+            else:
+                doc_id = conn.execute(
+                    "INSERT INTO documents (url, kind, title, content, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                    (url, kind, title, content, now)
+                ).lastrowid
+            conn.executemany("INSERT INTO chunks (text, doc_id, position) VALUES (?, ?, ?)",
+                             [(chunk, doc_id, i) for i, chunk in enumerate(chunks)])
+        return len(chunks)
+
+    def get_document(self, url: str, max_age_hours: Optional[float] = None) -> Optional[str]:
+        """Stored content for a URL, if present and fresh enough"""
+        with self.session() as conn:
+            row = conn.execute("SELECT content, fetched_at FROM documents WHERE url = ?", (url,)).fetchone()
+        if not row:
+            return None
+        if max_age_hours is not None:
+            age = datetime.datetime.now() - datetime.datetime.fromisoformat(row['fetched_at'])
+            if age > datetime.timedelta(hours=max_age_hours):
+                return None
+        return row['content']
+
+    def search(self, query: str, top_k: int = DOC_INDEX_PARAMS['top_k']) -> List[Dict[str, Any]]:
+        """Top-k chunks ranked by BM25 for a free-text query"""
+        terms = _WORD_RE.findall(query.lower())
+        if not terms:
+            return []
+        match = " OR ".join(f'"{t}"' for t in dict.fromkeys(terms))
+        with self.session() as conn:
+            rows = conn.execute(
+                "SELECT c.text, c.position, d.url, d.title, d.kind, d.fetched_at, bm25(chunks) AS score "
+                "FROM chunks c JOIN documents d ON d.id = c.doc_id "
+                "WHERE chunks MATCH ? ORDER BY score LIMIT ?",
+                (match, top_k)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+# Shared document index instance
+document_index = DocumentIndex()
+
+def index_search_results(query: str, results: Any, index: DocumentIndex = document_index) -> int:
+    """Index Serper results (structured dict or plain text) as small documents"""
+    if isinstance(results, dict):
+        entries = list(results.get('organic', [])) + list(results.get('news', []))
+        indexed = 0
+        for entry in entries:
+            link = entry.get('link')
+            if link:
+                text = f"{entry.get('title', '')}\n{entry.get('snippet', '')}"
+                indexed += index.add_document(f"search:{link}", text, 'search', entry.get('title', ''))
+        return indexed
+    return index.add_document(f"search:{query}", str(results), 'search', query)
@@ -0,0 +1,142 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import EXECUTION_COST_PARAMS, EXECUTION_RISK_AVERSION
+from market_data import PriceStore, price_store
+
+# Typical U-shaped intraday volume profile over half-hour buckets
+INTRADAY_PROFILE = np.array([0.12, 0.09, 0.08, 0.07, 0.065, 0.06, 0.06, 0.06, 0.065, 0.07, 0.075, 0.085, 0.11])
+
+def market_stats(ticker: str, store: PriceStore = price_store,
+                 history_days: int = EXECUTION_COST_PARAMS['history_days']) -> Optional[Dict[str, float]]:
+    """Average daily volume, daily volatility and last price from the price store"""
+    bars = store.load_bars(ticker).iloc[-history_days:]
+    if len(bars) < 2:
+        return None
+    returns = np.log(bars['close']).diff().dropna()
+    return {
+        'price': float(bars['close'].iloc[-1]),
+        'adv': float(bars['volume'].mean()),
+        'daily_vol': float(returns.std())
+    }
+
+def intraday_profile(buckets_per_day: int) -> np.ndarray:
+    """Volume fraction traded in each intraday bucket"""
+    if buckets_per_day == len(INTRADAY_PROFILE):
+        profile = INTRADAY_PROFILE
+    else:
+        profile = np.interp(np.linspace(0, 1, buckets_per_day),
+                            np.linspace(0, 1, len(INTRADAY_PROFILE)), INTRADAY_PROFILE)
+    return profile / profile.sum()
+
+def candidate_schedules(order_shares: float, adv: float,
+                        params: Optional[Dict] = None) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """
+    Build TWAP, VWAP and participation schedules on a common bucket grid
+
+    Returns:
+        Tuple of (schedule names, trade fractions [schedules x buckets],
+        expected market volume per bucket [buckets])
+    """
+    p = {**EXECUTION_COST_PARAMS, **(params or {})}
+    per_day = p['buckets_per_day']
+    max_days = max(max(p['horizons_days']), 1)
+    profile = intraday_profile(per_day)
+    bucket_volume = np.tile(profile, max_days) * adv
+    n_buckets = len(bucket_volume)
+
+    names = []
+    rows = []
+    for days in p['horizons_days']:
+        active = np.arange(n_buckets) < days * per_day
+
+        twap = active.astype(float)
+        names.append(f"TWAP {days}d")
+        rows.append(twap / twap.sum())
+
+        vwap = np.where(active, bucket_volume, 0.0)
+        names.append(f"VWAP {days}d")
+        rows.append(vwap / vwap.sum())
+
+    for rate in p['participation_rates']:
+        # Trade a fixed share of market volume until the order is filled
+        capacity = np.cumsum(rate * bucket_volume)
+        filled = np.minimum(capacity, order_shares)
+        traded = np.diff(np.concatenate([[0.0], filled]))
+        names.append(f"POV {rate:.0%}")
+        rows.append(traded / order_shares)
+
+    # Small orders fill identically under several schedules, keep one of each
+    fractions = np.vstack(rows)
+    _, first = np.unique(fractions.round(12), axis=0, return_index=True)
+    keep = np.sort(first)
+    return [names[i] for i in keep], fractions[keep], bucket_volume
+
+def simulate_schedules(order_value: float, stats: Dict[str, float],
+                       risk_tolerance: str = 'Medium',
+                       params: Optional[Dict] = None) -> pd.DataFrame:
+    """
+    Estimate execution cost and timing risk for every candidate schedule
+
+    Costs follow a square-root impact model: each bucket pays a temporary
+    impact proportional to volatility times the square root of its
+    participation rate, plus half the spread and a permanent impact that
+    scales with order size relative to ADV. Timing risk is the volatility of
+    the unexecuted position over the schedule. All schedules are evaluated as
+    one matrix operation.
+
+    Args:
+        order_value (float): Order size in dollars
+        stats (dict): price, adv and daily_vol as returned by market_stats
+        risk_tolerance (str): Low, Medium or High, sets the weight on timing risk
+        params (dict): Overrides for EXECUTION_COST_PARAMS
+
+    Returns:
+        DataFrame indexed by schedule name, ordered by risk-adjusted cost (bps)
+    
+    Raises:
+        ValueError: If the order value, price or ADV is not positive, or the
+            volatility is missing (e.g. an illiquid ticker without volume history)
+    """
+    if not order_value > 0:
+        raise ValueError(f"Order value must be positive, got {order_value}")
+    for field in ('price', 'adv'):
+        if not np.isfinite(stats.get(field, np.nan)) or stats[field] <= 0:
+            raise ValueError(f"Insufficient liquidity data: {field} is {stats.get(field)}")
+    if not np.isfinite(stats.get('daily_vol', np.nan)) or stats['daily_vol'] < 0:
+        raise ValueError(f"Insufficient liquidity data: daily volatility is {stats.get('daily_vol')}")
+    p = {**EXECUTION_COST_PARAMS, **(params or {})}
+    order_shares = order_value / stats['price']
+    names, fractions, bucket_volume = candidate_schedules(order_shares, stats['adv'], p)
+
+    sigma = stats['daily_vol']
+    participation = fractions * order_shares / bucket_volume
+    temporary = p['temporary_impact'] * sigma * (fractions * np.sqrt(participation)).sum(axis=1)
+    permanent = 0.5 * p['permanent_impact'] * sigma * np.sqrt(order_shares / stats['adv'])
+    spread = p['half_spread_bps'] / 1e4
+
+    remaining = 1.0 - np.cumsum(fractions, axis=1)
+    bucket_sigma = sigma / np.sqrt(p['buckets_per_day'])
+    timing_risk = bucket_sigma * np.sqrt((remaining ** 2).sum(axis=1))
+
+    unfilled = np.clip(remaining[:, -1], 0.0, None)
+    used = (fractions > 1e-12)
+    duration_days = (used * np.arange(1, fractions.shape[1] + 1)).max(axis=1) / p['buckets_per_day']
+
+    results = pd.DataFrame({
+        'expected_cost_bps': (spread + temporary + permanent) * 1e4,
+        'impact_bps': (temporary + permanent) * 1e4,
+        'timing_risk_bps': timing_risk * 1e4,
+        'max_participation': participation.max(axis=1),
+        'duration_days': duration_days,
+        'unfilled_pct': unfilled
+    }, index=pd.Index(names, name='schedule'))
+    results['expected_cost_usd'] = results['expected_cost_bps'] * order_value / 1e4
+
+    aversion = EXECUTION_RISK_AVERSION.get(risk_tolerance, EXECUTION_RISK_AVERSION['Medium'])
+    results['score_bps'] = results['expected_cost_bps'] + aversion * results['timing_risk_bps']
+    # Schedules that cannot fill inside the grid are ranked last
+    results.loc[results['unfilled_pct'] > 1e-6, 'score_bps'] = np.inf
+    return results.sort_values('score_bps')
@@ -0,0 +1,71 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from cancellation import AnalysisCancelled, submit_in_context
+from config import FANOUT_PARAMS
+from market_data import load_universe
+
+_TICKER_RE = re.compile(r"\b[A-Z]{1,5}(?:\.[A-Z])?\b")
+# Tickers written as '(AAPL)' (group 1), or as 'NASDAQ: AAPL' or '$AAPL' (group 2)
+_EXPLICIT_TICKER_RE = re.compile(r"(?:\(([A-Z]{1,5}(?:\.[A-Z])?)|(?:\b(?:NYSE|NASDAQ|Nasdaq|AMEX):\s*|\$)"
+                                 r"([A-Z]{1,5}(?:\.[A-Z])?))\b")
+
+def universe_tickers() -> set:
+    """Tickers of the local universe; empty when there is none"""
+    universe = load_universe()
+    return set(universe['ticker']) if universe is not None and not universe.empty else set()
+
+def extract_candidates(text: str, shortlist: Iterable[str] = (), universe: Optional[set] = None,
+                       limit: int = FANOUT_PARAMS['max_candidates']) -> List[str]:
+    """
+    Tickers named in a research briefing, screened shortlist first
+
+    Any upper-case word on the shortlist counts. Other tickers only count
+    when explicitly marked ('(AAPL)', 'NASDAQ: AAPL', '$AAPL') and, given a
+    universe, listed in it: a full US universe contains words and acronyms
+    such as A, ALL, ON, IT and KEY, and each candidate is a paid sub-analysis.
+    Without a universe, '(CEO)' or '(GDP)' cannot be told from a ticker, so
+    only '$' and exchange-prefixed tickers count.
+    """
+    shortlist = {t.upper() for t in shortlist}
+    found = [t for t in _TICKER_RE.findall(text) if t in shortlist]
+    for parenthesized, prefixed in _EXPLICIT_TICKER_RE.findall(text):
+        if universe:
+            found += [t for t in (parenthesized, prefixed) if t in universe]
+        elif prefixed:
+            found.append(prefixed)
+    return list(dict.fromkeys(found))[:limit]
+
+def candidate_notes(text: str, ticker: str, max_chars: int = FANOUT_PARAMS['notes_chars']) -> str:
+    """The lines of a briefing that mention a ticker, so each sub-analysis gets a small context"""
+    pattern = re.compile(rf"\b{re.escape(ticker)}\b")
+    lines = [line.strip() for line in text.splitlines() if pattern.search(line)]
+    notes = "\n".join(lines)[:max_chars]
+    return notes or "The market research briefing only lists this ticker without further notes."
+
+def fan_out(candidates: List[str], analyze: Callable[[str], Any],
+            max_workers: int = FANOUT_PARAMS['max_workers']) -> Dict[str, Any]:
+    """
+    Run one sub-analysis per candidate concurrently
+
+    At most max_workers sub-analyses run at once, so total time tracks the
+    slowest candidate in each wave rather than the sum over all candidates.
+
+    Returns:
+        Mapping of candidate to analyze()'s result, in candidate order,
+        leaving out candidates whose sub-analysis failed
+    """
+    def run(candidate):
+        try:
+            return analyze(candidate)
+        except AnalysisCancelled:
+            raise
+        except Exception as e:
+            print(f"Candidate analysis failed for {candidate}: {str(e)}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(max_workers, 1)) as executor:
+        futures = [submit_in_context(executor, run, c) for c in candidates]
+        results = dict(zip(candidates, (f.result() for f in futures)))
+    return {c: r for c, r in results.items() if r is not None}
@@ -0,0 +1,332 @@
+import codecs
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from html.parser import HTMLParser
+from typing import Callable, Dict, Iterable, List, Optional
+
+import requests
+
+from cancellation import check_cancelled, closing_on_cancel, submit_in_context
+from config import SCRAPE_PARAMS
+from run_stats import count_for_run
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _ENCODING = None
+
+# Tags whose content is never main content
+SKIP_TAGS = {'script', 'style', 'noscript', 'nav', 'header', 'footer', 'aside', 'form',
+             'svg', 'iframe', 'button', 'select', 'template', 'canvas'}
+
+# Tags that start a new line of text
+BLOCK_TAGS = {'p', 'div', 'section', 'article', 'main', 'br', 'li', 'ul', 'ol', 'h1', 'h2', 'h3',
+              'h4', 'h5', 'h6', 'blockquote', 'pre', 'table', 'tr', 'dd', 'dt'}
+
+# Void elements never get an end tag
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'}
+
+# Whole class/id tokens that mark navigation and other boilerplate containers
+BOILERPLATE_WORDS = {'nav', 'navbar', 'menu', 'footer', 'header', 'sidebar', 'cookie', 'cookies', 'consent',
+                     'banner', 'advert', 'ad', 'ads', 'promo', 'share', 'social', 'subscribe', 'newsletter',
+                     'related', 'breadcrumb', 'breadcrumbs', 'comment', 'comments', 'popup', 'modal'}
+
+# ARIA landmark roles of boilerplate regions
+BOILERPLATE_ROLES = {'navigation', 'banner', 'contentinfo', 'complementary', 'search'}
+
+# Containers that may be dropped as boilerplate by their class, id or role.
+# Page wrappers (html, body, main, article) never are, however they are
+# labelled: a class like "page no-sidebar" on <body> would drop the whole page.
+BOILERPLATE_CONTAINERS = {'div', 'section', 'nav', 'aside', 'header', 'footer'}
+PAGE_WRAPPER_TAGS = {'html', 'body', 'main', 'article'}
+
+# Charset declared in the first bytes of a page (<meta charset> or http-equiv)
+META_CHARSET_RE = re.compile(rb"<meta[^>]+charset\s*=\s*[\"']?\s*([a-zA-Z0-9_.:-]+)", re.IGNORECASE)
+
+REQUEST_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                  "(KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+}
+
+def is_boilerplate(tag: str, attributes: Dict[str, Optional[str]]) -> bool:
+    """Whether an element is hidden, or a container labelled as navigation, ads or similar"""
+    if attributes.get('aria-hidden') == 'true':
+        return True
+    if tag not in BOILERPLATE_CONTAINERS:
+        return False
+    tokens = f"{attributes.get('class') or ''} {attributes.get('id') or ''}".lower().split()
+    return (any(token in BOILERPLATE_WORDS for token in tokens)
+            or (attributes.get('role') or '').lower() in BOILERPLATE_ROLES)
+
+def response_encoding(response, head: bytes) -> str:
+    """
+    Encoding of a streamed response: the Content-Type charset, else the page's
+    <meta charset>, else detected from its first bytes
+
+    requests reports ISO-8859-1 for any text/* response without a charset,
+    and its apparent_encoding would read the whole body, so neither is used.
+    """
+    candidates = []
+    if 'charset' in response.headers.get('Content-Type', '').lower() and response.encoding:
+        candidates.append(response.encoding)
+    match = META_CHARSET_RE.search(head[:4096])
+    if match:
+        candidates.append(match.group(1).decode('ascii'))
+    if head:
+        candidates.append(requests.compat.chardet.detect(head).get('encoding'))
+    for name in candidates:
+        try:
+            return codecs.lookup(name).name
+        except (LookupError, TypeError):
+            continue
+    return 'utf-8'
+
+def count_tokens(text: str) -> int:
+    """Token count with tiktoken when available, otherwise a 4-characters-per-token estimate"""
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    return len(text) // 4
+
+class MainContentParser(HTMLParser):
+    """
+    Incremental HTML-to-text parser that drops boilerplate
+
+    Feed it chunks as they arrive. Text inside skipped tags or boilerplate
+    containers only counts toward the page total, tables are kept as
+    pipe-separated rows, and everything else is collected as main content.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self.kept_chars = 0
+        self.total_chars = 0
+        self._stack: List[tuple] = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_TAGS:
+            if tag == 'br':
+                self._emit("\n")
+            return
+        skip = tag in SKIP_TAGS or (tag not in PAGE_WRAPPER_TAGS and is_boilerplate(tag, dict(attrs)))
+        self._stack.append((tag, skip))
+        if skip:
+            self._skip_depth += 1
+        elif tag in ('td', 'th'):
+            self._emit(" | ")
+        elif tag in BLOCK_TAGS:
+            self._emit("\n")
+
+    def handle_endtag(self, tag):
+        if tag in VOID_TAGS or all(open_tag != tag for open_tag, _ in self._stack):
+            return
+        # Close any elements left open inside this one (e.g. unclosed <li> or <p>)
+        while self._stack:
+            open_tag, skip = self._stack.pop()
+            if skip:
+                self._skip_depth -= 1
+            if open_tag == tag:
+                break
+        if tag in BLOCK_TAGS:
+            self._emit("\n")
+
+    def handle_data(self, data):
+        self.total_chars += len(data)
+        if self._skip_depth == 0:
+            self._emit(data)
+
+    def _emit(self, text):
+        if self._skip_depth == 0:
+            self.parts.append(text)
+            self.kept_chars += len(text.strip())
+
+    def text(self) -> str:
+        lines = []
+        seen = set()
+        for line in "".join(self.parts).split("\n"):
+            line = re.sub(r"\s+", " ", line).strip(" |")
+            # Repeated short lines are almost always menus or labels
+            if not line or (line in seen and len(line) < 80):
+                continue
+            seen.add(line)
+            lines.append(line)
+        return "\n".join(lines)
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    if _ENCODING is not None:
+        tokens = _ENCODING.encode(text, disallowed_special=())
+        return text if len(tokens) <= max_tokens else _ENCODING.decode(tokens[:max_tokens])
+    return text[:max_tokens * 4]
+
+# Running totals across all extractions in this process
+extraction_totals = {'calls': 0, 'bytes_downloaded': 0, 'bytes_returned': 0, 'tokens_returned': 0, 'tokens_saved': 0}
+_totals_lock = threading.Lock()
+
+def fetch_and_extract(url: str, params: Optional[Dict] = None,
+                      session: Optional[requests.Session] = None) -> Dict:
+    """
+    Stream a page, extract its main content and enforce size caps
+
+    The response is parsed chunk by chunk and reading stops as soon as the
+    download cap is hit or the extracted text is comfortably past the output
+    cap, so large pages are never fully downloaded or held in memory.
+
+    Args:
+        url (str): Page to fetch
+        params (dict): Overrides for SCRAPE_PARAMS
+        session (Session): Optional requests session to reuse connections
+
+    Returns:
+        Dict with text, bytes_downloaded, bytes_returned, tokens_returned,
+        tokens_saved and truncated
+    """
+    p = {**SCRAPE_PARAMS, **(params or {})}
+    http = session or requests
+    parser = MainContentParser()
+    downloaded = 0
+    stopped_early = False
+
+    check_cancelled()
+    with http.get(url, headers=REQUEST_HEADERS, timeout=p['timeout'], stream=True) as response, \
+            closing_on_cancel(response):
+        response.raise_for_status()
+        content_length = int(response.headers.get('Content-Length') or 0)
+        decoder = None
+        try:
+            for chunk in response.iter_content(chunk_size=16384):
+                # Stop reading as soon as the analysis is cancelled
+                check_cancelled()
+                if decoder is None:
+                    decoder = codecs.getincrementaldecoder(response_encoding(response, chunk))(errors='replace')
+                downloaded += len(chunk)
+                parser.feed(decoder.decode(chunk))
+                # Stop once there is about twice the text the output cap can hold
+                if downloaded >= p['max_download_bytes'] or parser.kept_chars >= 8 * p['max_output_tokens']:
+                    stopped_early = True
+                    break
+        except Exception:
+            # A response closed by cancellation fails mid-read
+            check_cancelled()
+            raise
+        if decoder is not None:
+            parser.feed(decoder.decode(b'', final=True))
+    parser.close()
+
+    text = parser.text()
+    full_tokens = count_tokens(text)
+    text = truncate_to_tokens(text, p['max_output_tokens'])
+    text = text.encode('utf-8')[:p['max_output_bytes']].decode('utf-8', errors='ignore')
+    returned_tokens = count_tokens(text)
+
+    # Tokens the raw page text would have cost, scaled up if reading stopped early
+    page_tokens = max(parser.total_chars // 4, full_tokens)
+    if stopped_early and content_length > downloaded:
+        page_tokens = int(page_tokens * content_length / downloaded)
+
+    stats = {
+        'text': text,
+        'bytes_downloaded': downloaded,
+        'bytes_returned': len(text.encode('utf-8')),
+        'tokens_returned': returned_tokens,
+        'tokens_saved': max(page_tokens - returned_tokens, 0),
+        'truncated': stopped_early or returned_tokens < full_tokens
+    }
+    with _totals_lock:
+        extraction_totals['calls'] += 1
+        for key in ('bytes_downloaded', 'bytes_returned', 'tokens_returned', 'tokens_saved'):
+            extraction_totals[key] += stats[key]
+    count_for_run('extraction', calls=1, **{key: stats[key] for key in
+                                            ('bytes_downloaded', 'bytes_returned', 'tokens_returned', 'tokens_saved')})
+    return stats
+
+def format_extraction_stats(stats: Dict) -> str:
+    """One-line summary of the savings of a single extraction"""
+    return (f"[extracted {stats['bytes_returned'] / 1024:.1f} KB of {stats['bytes_downloaded'] / 1024:.1f} KB "
+            f"downloaded, ~{stats['tokens_returned']:,} tokens, ~{stats['tokens_saved']:,} tokens saved"
+            f"{', truncated' if stats['truncated'] else ''}]")
+
+def scrape_batch(urls: Iterable[str], params: Optional[Dict] = None,
+                 fetch: Callable[[str, Dict], Dict] = fetch_and_extract) -> Dict[str, Dict]:
+    """
+    Fetch and extract several pages concurrently with hedging and a deadline
+
+    At most max_concurrency requests run at once. A failed request is retried
+    and a request still running after hedge_after seconds gets a duplicate
+    (hedged) request, whichever finishes first wins. When batch_deadline
+    passes, the pages that finished are returned and the rest are reported
+    as timed out; stragglers are abandoned rather than waited for.
+
+    Args:
+        urls (Iterable[str]): Pages to fetch
+        params (dict): Overrides for SCRAPE_PARAMS
+        fetch (Callable): Single-page fetcher, fetch_and_extract by default
+
+    Returns:
+        Mapping of URL (in input order) to extraction stats, or to a dict
+        with an 'error' key if the page failed or missed the deadline
+    """
+    p = {**SCRAPE_PARAMS, **(params or {})}
+    urls = list(dict.fromkeys(u.strip() for u in urls if u and u.strip()))
+    deadline = time.monotonic() + p['batch_deadline']
+    results: Dict[str, Dict] = {}
+    errors: Dict[str, str] = {}
+    attempts = {url: 0 for url in urls}
+    pending = {}
+    started = {}
+
+    def attempt(url, key):
+        started[key] = time.monotonic()
+        return fetch(url, p)
+
+    def submit(url):
+        attempts[url] += 1
+        key = (url, attempts[url])
+        pending[submit_in_context(executor, attempt, url, key)] = key
+
+    executor = ThreadPoolExecutor(max_workers=max(p['max_concurrency'], 1))
+    try:
+        for url in urls:
+            submit(url)
+        while pending:
+            check_cancelled()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, _ = wait(list(pending), timeout=min(remaining, 0.25), return_when=FIRST_COMPLETED)
+            for future in done:
+                url, _ = pending.pop(future)
+                if url in results:
+                    continue
+                try:
+                    results[url] = future.result()
+                except Exception as e:
+                    errors[url] = str(e)
+
+            in_flight = {}
+            for future, (url, n) in list(pending.items()):
+                if url in results:
+                    future.cancel()
+                    del pending[future]
+                else:
+                    in_flight.setdefault(url, []).append((url, n))
+
+            now = time.monotonic()
+            for url in urls:
+                if url in results or attempts[url] > p['retries']:
+                    continue
+                keys = in_flight.get(url, [])
+                if not keys and url in errors:
+                    # Every attempt so far failed, so retry
+                    submit(url)
+                elif len(keys) == 1 and now - started.get(keys[0], now) > p['hedge_after']:
+                    # Only one attempt, and it is slow, so hedge
+                    submit(url)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return {url: results.get(url) or {'error': errors.get(url, f"no response within {p['batch_deadline']}s")}
+            for url in urls}
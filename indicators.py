@@ -0,0 +1,253 @@
+import threading
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import INDICATOR_PARAMS
+from market_data import PRICE_FIELDS, PriceStore, price_store
+
+# Every function below takes wide frames (date x ticker) and works down the
+# date axis, so a single call computes an indicator for all tickers at once.
+
+def sma(close: pd.DataFrame, window: int) -> pd.DataFrame:
+    """Simple moving average"""
+    return close.rolling(window, min_periods=window).mean()
+
+def ema(close: pd.DataFrame, span: int) -> pd.DataFrame:
+    """Exponential moving average"""
+    return close.ewm(span=span, adjust=False).mean()
+
+def rsi(close: pd.DataFrame, window: int = 14) -> pd.DataFrame:
+    """Relative Strength Index with Wilder smoothing"""
+    delta = close.diff()
+    alpha = 1.0 / window
+    gain = delta.clip(lower=0).ewm(alpha=alpha, adjust=False).mean()
+    loss = (-delta.clip(upper=0)).ewm(alpha=alpha, adjust=False).mean()
+    return _rsi_from_averages(gain, loss)
+
+def macd(close: pd.DataFrame, fast: int = 12, slow: int = 26, signal: int = 9) -> Dict[str, pd.DataFrame]:
+    """MACD line, signal line and histogram"""
+    line = ema(close, fast) - ema(close, slow)
+    signal_line = line.ewm(span=signal, adjust=False).mean()
+    return {'macd': line, 'macd_signal': signal_line, 'macd_hist': line - signal_line}
+
+def bollinger(close: pd.DataFrame, window: int = 20, num_std: float = 2.0) -> Dict[str, pd.DataFrame]:
+    """Bollinger middle, upper and lower bands"""
+    mid = sma(close, window)
+    std = close.rolling(window, min_periods=window).std()
+    return {'bb_mid': mid, 'bb_upper': mid + num_std * std, 'bb_lower': mid - num_std * std}
+
+def true_range(high: pd.DataFrame, low: pd.DataFrame, close: pd.DataFrame) -> pd.DataFrame:
+    """True range of each bar"""
+    prev_close = close.shift(1)
+    ranges = np.stack([
+        (high - low).to_numpy(),
+        (high - prev_close).abs().to_numpy(),
+        (low - prev_close).abs().to_numpy()
+    ])
+    return pd.DataFrame(np.nanmax(ranges, axis=0), index=close.index, columns=close.columns)
+
+def atr(high: pd.DataFrame, low: pd.DataFrame, close: pd.DataFrame, window: int = 14) -> pd.DataFrame:
+    """Average True Range with Wilder smoothing"""
+    return true_range(high, low, close).ewm(alpha=1.0 / window, adjust=False).mean()
+
+def vwap(high: pd.DataFrame, low: pd.DataFrame, close: pd.DataFrame,
+         volume: pd.DataFrame, window: int = 20) -> pd.DataFrame:
+    """Rolling volume-weighted average price over the last N bars"""
+    typical = (high + low + close) / 3
+    traded = (typical * volume).rolling(window, min_periods=window).sum()
+    return traded / volume.rolling(window, min_periods=window).sum()
+
+def ma_crossover(close: pd.DataFrame, fast: int = 50, slow: int = 200) -> pd.DataFrame:
+    """+1 on a golden cross, -1 on a death cross, 0 otherwise"""
+    side = np.sign(sma(close, fast) - sma(close, slow))
+    return _cross_signal(side, side.shift(1))
+
+def _cross_signal(side, prev_side):
+    return ((side > 0) & (prev_side <= 0)).astype(int) - ((side < 0) & (prev_side >= 0)).astype(int)
+
+def _rsi_from_averages(gain, loss):
+    rs = gain / loss.replace(0, np.nan)
+    value = 100 - 100 / (1 + rs)
+    # No losses in the window means maximum strength
+    return value.where(loss != 0, 100.0).where(gain.notna())
+
+def _ewm_step(state: pd.Series, value: pd.Series, alpha: float) -> pd.Series:
+    """Advance an adjust=False EWM state by one bar, tolerating missing values"""
+    stepped = alpha * value + (1 - alpha) * state
+    return stepped.fillna(state).fillna(value)
+
+def compute_indicators(panel: Dict[str, pd.DataFrame],
+                       params: Optional[Dict] = None) -> Dict[str, pd.DataFrame]:
+    """
+    Compute the full indicator set over a price panel
+
+    Args:
+        panel (dict): Wide OHLCV frames as returned by PriceStore.load_panel
+        params (dict): Overrides for INDICATOR_PARAMS
+
+    Returns:
+        Dict mapping indicator name to a wide DataFrame (date x ticker)
+    """
+    p = {**INDICATOR_PARAMS, **(params or {})}
+    high, low, close, volume = panel['high'], panel['low'], panel['close'], panel['volume']
+
+    result = {
+        'close': close,
+        'rsi': rsi(close, p['rsi_window']),
+        'atr': atr(high, low, close, p['atr_window']),
+        'vwap': vwap(high, low, close, volume, p['vwap_window']),
+        'sma_fast': sma(close, p['ma_fast']),
+        'sma_slow': sma(close, p['ma_slow'])
+    }
+    result.update(macd(close, p['macd_fast'], p['macd_slow'], p['macd_signal']))
+    result.update(bollinger(close, p['bollinger_window'], p['bollinger_std']))
+    side = np.sign(result['sma_fast'] - result['sma_slow'])
+    result['ma_cross'] = _cross_signal(side, side.shift(1))
+    return result
+
+class IndicatorEngine:
+    """
+    Maintains the latest indicator values for a universe of tickers
+
+    The engine is seeded from history with fit() and then advanced one bar at a
+    time with update(). Exponential indicators carry their smoothing state and
+    windowed indicators keep only the trailing bars they need, so each new bar
+    costs O(tickers) regardless of the length of history.
+    """
+
+    def __init__(self, params: Optional[Dict] = None):
+        self.params = {**INDICATOR_PARAMS, **(params or {})}
+        self.last_date: Optional[pd.Timestamp] = None
+        self._state: Dict[str, pd.Series] = {}
+        self._tail: Dict[str, pd.DataFrame] = {}
+        self._latest = pd.DataFrame()
+        # Serializes refresh(); the shared engine is used by concurrent tools and jobs
+        self._lock = threading.Lock()
+
+    @property
+    def window(self) -> int:
+        """Number of trailing bars needed by the windowed indicators"""
+        p = self.params
+        return max(p['bollinger_window'], p['vwap_window'], p['ma_slow'])
+
+    def fit(self, panel: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+        """Compute indicators over full history and seed the incremental state"""
+        if panel['close'].empty:
+            self._latest = pd.DataFrame()
+            return self._latest
+
+        p = self.params
+        full = compute_indicators(panel, p)
+        close = panel['close']
+        delta = close.diff()
+
+        self._state = {
+            'ema_fast': ema(close, p['macd_fast']).iloc[-1],
+            'ema_slow': ema(close, p['macd_slow']).iloc[-1],
+            'macd_signal': full['macd_signal'].iloc[-1],
+            'rsi_gain': delta.clip(lower=0).ewm(alpha=1.0 / p['rsi_window'], adjust=False).mean().iloc[-1],
+            'rsi_loss': (-delta.clip(upper=0)).ewm(alpha=1.0 / p['rsi_window'], adjust=False).mean().iloc[-1],
+            'atr': full['atr'].iloc[-1],
+            'sma_fast': full['sma_fast'].iloc[-1],
+            'sma_slow': full['sma_slow'].iloc[-1]
+        }
+        self._tail = {field: frame.iloc[-self.window:] for field, frame in panel.items()}
+        self.last_date = close.index[-1]
+        self._latest = pd.DataFrame({name: frame.iloc[-1] for name, frame in full.items()})
+        return self._latest
+
+    def update(self, bars: pd.DataFrame, date=None) -> pd.DataFrame:
+        """
+        Advance every ticker by one bar
+
+        Args:
+            bars (DataFrame): One row per ticker with open/high/low/close/volume
+            date: Date of the bar. Defaults to the day after the last bar.
+
+        Returns:
+            DataFrame with one row of latest indicator values per ticker
+        """
+        p = self.params
+        date = pd.Timestamp(date) if date is not None else (
+            self.last_date + pd.Timedelta(days=1) if self.last_date is not None else pd.Timestamp.now().normalize()
+        )
+        bars = bars.rename(index=str.upper)
+
+        # Append the bar to the trailing windows, aligning any new tickers
+        for field in PRICE_FIELDS:
+            row = bars[field].rename(date).to_frame().T
+            tail = self._tail.get(field)
+            tail = row if tail is None or tail.empty else pd.concat([tail, row])
+            self._tail[field] = tail.iloc[-self.window:]
+
+        tail = self._tail
+        tickers = tail['close'].columns
+        close, high, low = tail['close'].iloc[-1], tail['high'].iloc[-1], tail['low'].iloc[-1]
+        prev_close = tail['close'].iloc[-2] if len(tail['close']) > 1 else pd.Series(np.nan, index=tickers)
+        prev = {k: v.reindex(tickers) for k, v in self._state.items()}
+        missing = pd.Series(np.nan, index=tickers)
+        state = {}
+
+        # Exponential indicators: one smoothing step each
+        state['ema_fast'] = _ewm_step(prev.get('ema_fast', missing), close, 2.0 / (p['macd_fast'] + 1))
+        state['ema_slow'] = _ewm_step(prev.get('ema_slow', missing), close, 2.0 / (p['macd_slow'] + 1))
+        line = state['ema_fast'] - state['ema_slow']
+        state['macd_signal'] = _ewm_step(prev.get('macd_signal', missing), line, 2.0 / (p['macd_signal'] + 1))
+
+        delta = close - prev_close
+        rsi_alpha = 1.0 / p['rsi_window']
+        state['rsi_gain'] = _ewm_step(prev.get('rsi_gain', missing), delta.clip(lower=0), rsi_alpha)
+        state['rsi_loss'] = _ewm_step(prev.get('rsi_loss', missing), (-delta).clip(lower=0), rsi_alpha)
+
+        ranges = pd.concat([high - low, (high - prev_close).abs(), (low - prev_close).abs()], axis=1)
+        state['atr'] = _ewm_step(prev.get('atr', missing), ranges.max(axis=1), 1.0 / p['atr_window'])
+
+        # Windowed indicators: only the last row of the trailing frames is needed
+        state['sma_fast'] = sma(tail['close'], p['ma_fast']).iloc[-1]
+        state['sma_slow'] = sma(tail['close'], p['ma_slow']).iloc[-1]
+        bands = bollinger(tail['close'], p['bollinger_window'], p['bollinger_std'])
+        side = np.sign(state['sma_fast'] - state['sma_slow'])
+        prev_side = np.sign(prev.get('sma_fast', missing) - prev.get('sma_slow', missing))
+
+        self._state = state
+        self.last_date = date
+        self._latest = pd.DataFrame({
+            'close': close,
+            'rsi': _rsi_from_averages(state['rsi_gain'], state['rsi_loss']),
+            'atr': state['atr'],
+            'vwap': vwap(tail['high'], tail['low'], tail['close'], tail['volume'], p['vwap_window']).iloc[-1],
+            'sma_fast': state['sma_fast'],
+            'sma_slow': state['sma_slow'],
+            'macd': line,
+            'macd_signal': state['macd_signal'],
+            'macd_hist': line - state['macd_signal'],
+            'bb_mid': bands['bb_mid'].iloc[-1],
+            'bb_upper': bands['bb_upper'].iloc[-1],
+            'bb_lower': bands['bb_lower'].iloc[-1],
+            'ma_cross': _cross_signal(side, prev_side)
+        })
+        return self._latest
+
+    def refresh(self, store: PriceStore = price_store, tickers: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """Bring the engine up to date with the store, fitting on first use"""
+        tickers = list(tickers) if tickers is not None else None
+        with self._lock:
+            if self.last_date is None:
+                return self.fit(store.load_panel(tickers))
+
+            new_bars = store.load_panel(tickers, since=self.last_date)
+            for date in new_bars['close'].index:
+                bars = pd.DataFrame({field: frame.loc[date] for field, frame in new_bars.items()})
+                self.update(bars, date)
+            return self._latest
+
+    def latest(self, tickers: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """Latest indicator values, optionally restricted to some tickers"""
+        if tickers is None:
+            return self._latest
+        return self._latest.reindex([t.upper() for t in tickers])
+
+# Shared engine over the local price store
+indicator_engine = IndicatorEngine()
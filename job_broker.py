@@ -0,0 +1,369 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+from config import BROKER_PATH, BROKER_PARAMS
+from api_server import CANCELLED, COMPLETED, FAILED, QUEUED
+
+# Job state while a worker holds its lease
+LEASED = 'leased'
+
+class JobBroker(ABC):
+    """
+    Queue of analysis jobs shared by worker nodes
+
+    Workers lease a job for a limited time and keep the lease alive with
+    heartbeats; a job whose lease lapses (its worker died or lost contact)
+    becomes available again. Every lease has its own lease_id, so a worker
+    whose lease lapsed cannot report on a job another worker now holds.
+    Subclasses implement the abstract methods to back the queue with another
+    store; a broker missing one of them cannot be created.
+    """
+
+    @abstractmethod
+    def enqueue(self, inputs: Dict[str, Any], batch: Optional[str] = None,
+                max_attempts: Optional[int] = None) -> str:
+        """Add a job; returns its id"""
+        ...
+
+    @abstractmethod
+    def lease(self, worker: str, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        """Take the next available job (with id, inputs, attempts and lease_id), or None"""
+        ...
+
+    @abstractmethod
+    def heartbeat(self, job_id: str, lease_id: str, lease_seconds: float) -> bool:
+        """Extend a lease; False when it is no longer held (lapsed or job cancelled)"""
+        ...
+
+    @abstractmethod
+    def complete(self, job_id: str, lease_id: str, result: Dict[str, Any]) -> bool:
+        ...
+
+    @abstractmethod
+    def fail(self, job_id: str, lease_id: str, error: str) -> Optional[str]:
+        """Record a failed attempt; returns the job's new status (queued again while attempts remain)"""
+        ...
+
+    @abstractmethod
+    def release(self, job_id: str, lease_id: str) -> bool:
+        """Return a leased job to the queue without using up an attempt (e.g. worker shutting down)"""
+        ...
+
+    @abstractmethod
+    def cancel(self, job_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def jobs(self, batch: Optional[str] = None) -> List[Dict[str, Any]]:
+        ...
+
+    def counts(self, batch: Optional[str] = None) -> Dict[str, int]:
+        """Number of jobs per status"""
+        counts: Dict[str, int] = {}
+        for job in self.jobs(batch):
+            counts[job['status']] = counts.get(job['status'], 0) + 1
+        return counts
+
+    def enqueue_batch(self, inputs_list: List[Dict[str, Any]], batch: Optional[str] = None) -> str:
+        """Add one job per inputs under a shared batch id; returns the batch id"""
+        batch = batch or time.strftime('%Y%m%d-%H%M%S-') + uuid.uuid4().hex[:6]
+        for inputs in inputs_list:
+            self.enqueue(inputs, batch=batch)
+        return batch
+
+class SQLiteBroker(JobBroker):
+    """
+    Reference broker in one SQLite database (WAL mode)
+
+    Leases are taken inside an immediate transaction, so concurrent workers
+    never lease the same job. SQLite's WAL locking needs all processes on one
+    host (not a network filesystem), which makes this broker suited to tests
+    and single-machine runs; nodes on separate machines need a JobBroker
+    backed by a networked store.
+    """
+
+    def __init__(self, path: str = BROKER_PATH, max_attempts: int = BROKER_PARAMS['max_attempts'],
+                 retry_delay: float = BROKER_PARAMS['retry_delay_seconds']):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        # Autocommit mode: transactions are opened explicitly where needed
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    batch TEXT,
+                    inputs TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL,
+                    available_at REAL NOT NULL,
+                    lease_id TEXT,
+                    worker TEXT,
+                    lease_expires REAL,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, available_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_batch ON jobs(batch)")
+            self._initialized = True
+        return conn
+
+    @staticmethod
+    def _row(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job['inputs'] = json.loads(job['inputs'])
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    def enqueue(self, inputs: Dict[str, Any], batch: Optional[str] = None,
+                max_attempts: Optional[int] = None) -> str:
+        if not isinstance(inputs, dict):
+            raise ValueError("Job inputs must be a dictionary")
+        job_id = uuid.uuid4().hex[:12]
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT INTO jobs (id, batch, inputs, status, max_attempts, available_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, batch, json.dumps(inputs), QUEUED, max_attempts or self.max_attempts, now, now, now))
+        finally:
+            conn.close()
+        return job_id
+
+    def lease(self, worker: str, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            # Lapsed leases on their last attempt fail instead of running again
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = 'Lease of ' || worker || ' expired on the final attempt', "
+                "lease_id = NULL, updated_at = ? "
+                "WHERE status = ? AND lease_expires < ? AND attempts >= max_attempts",
+                (FAILED, now, LEASED, now))
+            row = conn.execute(
+                "SELECT id, status FROM jobs WHERE (status = ? AND available_at <= ?) OR (status = ? AND lease_expires < ?) "
+                "ORDER BY available_at LIMIT 1",
+                (QUEUED, now, LEASED, now)).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            lease_id = uuid.uuid4().hex
+            conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, lease_id = ?, worker = ?, lease_expires = ?, "
+                "error = CASE WHEN status = ? THEN 'Lease of ' || worker || ' expired' ELSE error END, updated_at = ? "
+                "WHERE id = ?",
+                (LEASED, lease_id, worker, now + lease_seconds, LEASED, now, row['id']))
+            job = conn.execute("SELECT * FROM jobs WHERE id = ?", (row['id'],)).fetchone()
+            conn.execute("COMMIT")
+            return self._row(job)
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _update_leased(self, job_id: str, lease_id: str, assignments: str, params: tuple) -> bool:
+        """Apply an update to a job only while lease_id still holds it"""
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                f"UPDATE jobs SET {assignments}, updated_at = ? WHERE id = ? AND lease_id = ? AND status = ?",
+                params + (time.time(), job_id, lease_id, LEASED))
+            return cursor.rowcount == 1
+        finally:
+            conn.close()
+
+    def heartbeat(self, job_id: str, lease_id: str, lease_seconds: float) -> bool:
+        return self._update_leased(job_id, lease_id, "lease_expires = ?", (time.time() + lease_seconds,))
+
+    def complete(self, job_id: str, lease_id: str, result: Dict[str, Any]) -> bool:
+        return self._update_leased(job_id, lease_id, "status = ?, result = ?, error = NULL, lease_id = NULL",
+                                   (COMPLETED, json.dumps(result, default=str)))
+
+    def fail(self, job_id: str, lease_id: str, error: str) -> Optional[str]:
+        job = self.get(job_id)
+        if job is None or job['lease_id'] != lease_id:
+            return None
+        if job['attempts'] < job['max_attempts']:
+            # Exponential backoff before the next attempt
+            delay = self.retry_delay * 2 ** (job['attempts'] - 1)
+            updated = self._update_leased(job_id, lease_id, "status = ?, error = ?, lease_id = NULL, available_at = ?",
+                                          (QUEUED, error, time.time() + delay))
+            return QUEUED if updated else None
+        updated = self._update_leased(job_id, lease_id, "status = ?, error = ?, lease_id = NULL", (FAILED, error))
+        return FAILED if updated else None
+
+    def release(self, job_id: str, lease_id: str) -> bool:
+        return self._update_leased(job_id, lease_id,
+                                   "status = ?, attempts = attempts - 1, lease_id = NULL, available_at = ?",
+                                   (QUEUED, time.time()))
+
+    def cancel(self, job_id: str) -> bool:
+        conn = self._connect()
+        try:
+            cursor = conn.execute("UPDATE jobs SET status = ?, lease_id = NULL, updated_at = ? "
+                                  "WHERE id = ? AND status IN (?, ?)",
+                                  (CANCELLED, time.time(), job_id, QUEUED, LEASED))
+            return cursor.rowcount == 1
+        finally:
+            conn.close()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        finally:
+            conn.close()
+        return self._row(row) if row else None
+
+    def jobs(self, batch: Optional[str] = None) -> List[Dict[str, Any]]:
+        conn = self._connect()
+        try:
+            if batch is None:
+                rows = conn.execute("SELECT * FROM jobs ORDER BY created_at").fetchall()
+            else:
+                rows = conn.execute("SELECT * FROM jobs WHERE batch = ? ORDER BY created_at", (batch,)).fetchall()
+        finally:
+            conn.close()
+        return [self._row(row) for row in rows]
+
+    def counts(self, batch: Optional[str] = None) -> Dict[str, int]:
+        conn = self._connect()
+        try:
+            if batch is None:
+                rows = conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+            else:
+                rows = conn.execute("SELECT status, COUNT(*) FROM jobs WHERE batch = ? GROUP BY status",
+                                    (batch,)).fetchall()
+        finally:
+            conn.close()
+        return {status: count for status, count in rows}
+
+class NodeWorker:
+    """
+    Runs a node's share of the broker's jobs on an api_server.AnalysisService
+
+    Leases as many jobs as the service can run at once (its threads, or the
+    processes of its worker farm), heartbeats them while they run and
+    reports each outcome. A job cancelled in the broker, or whose lease was
+    lost, is cancelled locally; on shutdown unfinished jobs are released
+    back to the queue.
+    """
+
+    def __init__(self, broker: JobBroker, service: Any, worker_id: Optional[str] = None,
+                 lease_seconds: float = BROKER_PARAMS['lease_seconds'],
+                 heartbeat_seconds: float = BROKER_PARAMS['heartbeat_seconds'],
+                 poll_seconds: float = BROKER_PARAMS['poll_seconds']):
+        if heartbeat_seconds >= lease_seconds:
+            raise ValueError("heartbeat_seconds must be shorter than lease_seconds")
+        self.broker = broker
+        self.service = service
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease_seconds = lease_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.poll_seconds = poll_seconds
+        self.stats = {'leased': 0, 'completed': 0, 'retried': 0, 'failed': 0, 'lost': 0}
+        self._active: Dict[str, Dict[str, Any]] = {}
+
+    def run(self, stop: Optional[threading.Event] = None, drain: bool = False):
+        """
+        Lease and run jobs until stop is set
+
+        Args:
+            stop (threading.Event): Set it to stop (e.g. from a signal handler)
+            drain (bool): Also stop once the broker has no queued or leased jobs left
+        """
+        stop = stop or threading.Event()
+        try:
+            while not stop.is_set():
+                self._collect()
+                self._heartbeat()
+                self._fill()
+                if drain and not self._active:
+                    counts = self.broker.counts()
+                    if not counts.get(QUEUED) and not counts.get(LEASED):
+                        break
+                stop.wait(self.poll_seconds)
+        finally:
+            self._collect()
+            self._release_all()
+
+    def _fill(self):
+        while len(self._active) < self.service.capacity:
+            job = self.broker.lease(self.worker_id, self.lease_seconds)
+            if job is None:
+                return
+            self.stats['leased'] += 1
+            local = self.service.submit(job['inputs'])
+            self._active[job['id']] = {'lease_id': job['lease_id'], 'local': local,
+                                       'heartbeat_at': time.monotonic() + self.heartbeat_seconds}
+            print(f"Leased job {job['id']} (attempt {job['attempts']} of {job['max_attempts']})")
+
+    def _heartbeat(self):
+        now = time.monotonic()
+        for job_id, entry in list(self._active.items()):
+            if now < entry['heartbeat_at'] or entry['local'].finished:
+                continue
+            if self.broker.heartbeat(job_id, entry['lease_id'], self.lease_seconds):
+                entry['heartbeat_at'] = now + self.heartbeat_seconds
+            else:
+                # Cancelled in the broker, or the lease lapsed and may be held elsewhere
+                self.stats['lost'] += 1
+                print(f"Lost lease on job {job_id}; cancelling it here")
+                self.service.cancel(entry['local'].id)
+                del self._active[job_id]
+
+    def _collect(self):
+        for job_id, entry in list(self._active.items()):
+            local = entry['local']
+            if not local.finished:
+                continue
+            del self._active[job_id]
+            if local.status == COMPLETED:
+                if self.broker.complete(job_id, entry['lease_id'], local.result):
+                    self.stats['completed'] += 1
+                    print(f"Job {job_id} completed")
+            elif local.status == FAILED:
+                status = self.broker.fail(job_id, entry['lease_id'], local.error)
+                if status == QUEUED:
+                    self.stats['retried'] += 1
+                    print(f"Job {job_id} failed ({local.error}); queued for retry")
+                elif status == FAILED:
+                    self.stats['failed'] += 1
+                    print(f"Job {job_id} failed ({local.error}); no attempts left")
+            else:
+                # Cancelled locally (e.g. service shutting down): let another worker run it
+                self.broker.release(job_id, entry['lease_id'])
+
+    def _release_all(self):
+        for job_id, entry in list(self._active.items()):
+            self.service.cancel(entry['local'].id)
+            self.broker.release(job_id, entry['lease_id'])
+            print(f"Released job {job_id}")
+        self._active.clear()
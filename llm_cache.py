@@ -0,0 +1,190 @@
+import datetime
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from config import LLM_CACHE_PATH, LLM_CACHE_PARAMS
+from run_stats import count_for_run
+
+# Sampling and output parameters that change a response and so belong in the key
+KEY_PARAMS = ('temperature', 'top_p', 'max_tokens', 'max_completion_tokens', 'stop', 'seed',
+              'presence_penalty', 'frequency_penalty', 'response_format', 'reasoning_effort')
+
+def normalize_messages(messages: Any) -> list:
+    """Messages as role/content pairs with whitespace collapsed, so cosmetic differences share a key"""
+    if isinstance(messages, str):
+        messages = [{'role': 'user', 'content': messages}]
+    normalized = []
+    for message in messages or []:
+        content = message.get('content', '') if isinstance(message, dict) else str(message)
+        if not isinstance(content, str):
+            content = json.dumps(content, sort_keys=True, default=str)
+        role = message.get('role', 'user') if isinstance(message, dict) else 'user'
+        normalized.append([role, " ".join(content.split())])
+    return normalized
+
+def response_key(model: str, params: Dict[str, Any], messages: Any, tools: Any = None) -> str:
+    """Cache key over the model, the response-shaping parameters, the normalized messages and tool names"""
+    tool_names = sorted(str(t.get('name', t) if isinstance(t, dict) else getattr(t, 'name', t)) for t in tools or [])
+    payload = {
+        'model': model,
+        'params': {k: params.get(k) for k in KEY_PARAMS if params.get(k) not in (None, [], '')},
+        'messages': normalize_messages(messages),
+        'tools': tool_names
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+class ResponseCache:
+    """
+    Two-tier cache of LLM responses: an in-memory LRU in front of SQLite
+
+    Memory hits are free; disk hits survive restarts and are shared between
+    processes using the same data directory.
+    """
+
+    def __init__(self, path: Optional[str] = LLM_CACHE_PATH, max_entries: int = LLM_CACHE_PARAMS['max_entries'],
+                 ttl_hours: float = LLM_CACHE_PARAMS['ttl_hours']):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_hours = ttl_hours
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0}
+        # key -> (response, created_at); created_at travels with the entry so
+        # the TTL also holds for entries served from memory
+        self._memory: "OrderedDict[str, Tuple[str, datetime.datetime]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    model TEXT,
+                    response TEXT NOT NULL,
+                    created_at TEXT NOT NULL
+                )
+            """)
+            conn.commit()
+            self._initialized = True
+        return conn
+
+    def _remember(self, key: str, response: str, created_at: datetime.datetime):
+        self._memory[key] = (response, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        cutoff = datetime.datetime.now() - datetime.timedelta(hours=self.ttl_hours)
+        with self._lock:
+            if key in self._memory:
+                response, created_at = self._memory[key]
+                if created_at >= cutoff:
+                    self._memory.move_to_end(key)
+                    self.stats['memory_hits'] += 1
+                    count_for_run('response_cache', memory_hits=1)
+                    return response
+                del self._memory[key]
+
+        row = None
+        if self.path:
+            try:
+                conn = self._connect()
+                try:
+                    row = conn.execute("SELECT response, created_at FROM responses WHERE key = ? AND created_at >= ?",
+                                       (key, cutoff.isoformat())).fetchone()
+                finally:
+                    conn.close()
+            except sqlite3.Error as e:
+                print(f"Warning: LLM cache read failed: {str(e)}")
+
+        with self._lock:
+            if row is None:
+                self.stats['misses'] += 1
+                count_for_run('response_cache', misses=1)
+                return None
+            self.stats['disk_hits'] += 1
+            count_for_run('response_cache', disk_hits=1)
+            self._remember(key, row[0], datetime.datetime.fromisoformat(row[1]))
+        return row[0]
+
+    def put(self, key: str, model: str, response: str):
+        created_at = datetime.datetime.now()
+        with self._lock:
+            self._remember(key, response, created_at)
+        if not self.path:
+            return
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute("INSERT OR REPLACE INTO responses (key, model, response, created_at) "
+                                 "VALUES (?, ?, ?, ?)", (key, model, response, created_at.isoformat()))
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"Warning: LLM cache write failed: {str(e)}")
+
+    def summary(self, counts: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+        """Hit counts (default: stats; e.g. one run's counts) with the overall hit rate"""
+        if counts is None:
+            with self._lock:
+                counts = dict(self.stats)
+        counts = {k: counts.get(k, 0) for k in ('memory_hits', 'disk_hits', 'misses')}
+        lookups = sum(counts.values())
+        counts['hit_rate'] = (counts['memory_hits'] + counts['disk_hits']) / lookups if lookups else 0.0
+        return counts
+
+# Shared response cache instance
+response_cache = ResponseCache()
+
+class ResponseCacheMixin:
+    """
+    Serves repeated LLM calls from response_cache
+
+    Only plain text completions of the agents that opt in (LLM_CACHE_PARAMS
+    agents) are cached: calls of other agents, calls that may execute tools
+    (available_functions) and calls parsing into a response model go to the
+    provider.
+    """
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None):
+        if (available_functions or response_model is not None
+                or getattr(from_agent, 'role', None) not in LLM_CACHE_PARAMS['agents']):
+            return super().call(messages, tools, callbacks, available_functions,
+                                from_task, from_agent, response_model)
+        key = response_key(self.model, {k: getattr(self, k, None) for k in KEY_PARAMS}, messages, tools)
+        cached = response_cache.get(key)
+        if cached is not None:
+            return cached
+        response = super().call(messages, tools, callbacks, available_functions,
+                                from_task, from_agent, response_model)
+        if isinstance(response, str) and response.strip():
+            response_cache.put(key, self.model, response)
+        return response
+
+_cached_classes: Dict[type, type] = {}
+
+def with_response_cache(llm):
+    """
+    Make an LLM serve repeated calls from the response cache
+
+    crewai's LLM() returns a provider-specific class, so the caching is added
+    by switching the instance to a subclass of that class with the mixin.
+    """
+    base = type(llm)
+    if issubclass(base, ResponseCacheMixin):
+        return llm
+    if base not in _cached_classes:
+        _cached_classes[base] = type(f"Cached{base.__name__}", (ResponseCacheMixin, base), {'__module__': __name__})
+    object.__setattr__(llm, '__class__', _cached_classes[base])
+    return llm
@@ -0,0 +1,97 @@
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from run_stats import count_for_run
+
+# Running prompt-cache totals across all LLM calls in this process
+prompt_cache_totals = {'calls': 0, 'prompt_tokens': 0, 'cached_tokens': 0, 'completion_tokens': 0}
+_totals_lock = threading.Lock()
+_callbacks: List[Callable[[Dict[str, Any]], None]] = []
+
+def _field(usage: Any, name: str) -> Any:
+    if isinstance(usage, dict):
+        return usage.get(name)
+    return getattr(usage, name, None)
+
+def parse_usage(usage: Any) -> Dict[str, int]:
+    """
+    Prompt, cached-prompt and completion token counts from a provider usage
+    record (a dict or object, with cached tokens reported either flat or
+    under prompt_tokens_details as OpenAI does)
+    """
+    if not usage:
+        return {'prompt_tokens': 0, 'cached_tokens': 0, 'completion_tokens': 0}
+    cached = _field(usage, 'cached_prompt_tokens') or _field(usage, 'cached_tokens')
+    if not cached:
+        details = _field(usage, 'prompt_tokens_details')
+        cached = _field(details, 'cached_tokens') if details else 0
+    return {
+        'prompt_tokens': int(_field(usage, 'prompt_tokens') or 0),
+        'cached_tokens': int(cached or 0),
+        'completion_tokens': int(_field(usage, 'completion_tokens') or 0)
+    }
+
+def record_call(model: str, usage: Any, agent_role: str = '', task_name: str = '') -> Dict[str, Any]:
+    """Add one call's token usage to the totals and notify the callbacks"""
+    call = {'model': (model or '').split('/')[-1], 'agent_role': agent_role or '',
+            'task_name': task_name or '', **parse_usage(usage)}
+    with _totals_lock:
+        prompt_cache_totals['calls'] += 1
+        for key in ('prompt_tokens', 'cached_tokens', 'completion_tokens'):
+            prompt_cache_totals[key] += call[key]
+    count_for_run('prompt_cache', calls=1, prompt_tokens=call['prompt_tokens'],
+                  cached_tokens=call['cached_tokens'], completion_tokens=call['completion_tokens'])
+    for callback in list(_callbacks):
+        try:
+            callback(call)
+        except Exception as e:
+            print(f"Warning: LLM usage callback failed: {str(e)}")
+    return call
+
+def register_usage_callback(callback: Callable[[Dict[str, Any]], None]):
+    """Register a function called with each LLM call's token usage"""
+    if callback not in _callbacks:
+        _callbacks.append(callback)
+
+def format_call(call: Dict[str, Any]) -> str:
+    uncached = call['prompt_tokens'] - call['cached_tokens']
+    return (f"{call['model']}: {call['prompt_tokens']:,} prompt tokens "
+            f"({call['cached_tokens']:,} cached, {uncached:,} uncached), "
+            f"{call['completion_tokens']:,} completion")
+
+def cache_summary(counts: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    """Totals (default: prompt_cache_totals; e.g. one run's counts) with the cached share of prompt tokens"""
+    if counts is None:
+        with _totals_lock:
+            counts = dict(prompt_cache_totals)
+    summary = {k: counts.get(k, 0) for k in prompt_cache_totals}
+    prompt = summary['prompt_tokens']
+    summary['cached_share'] = summary['cached_tokens'] / prompt if prompt else 0.0
+    return summary
+
+_listeners_registered = False
+
+def register_usage_listeners() -> bool:
+    """
+    Record the token usage of every LLM call through the crewai event bus
+
+    Returns False when the installed crewai has no event bus.
+    """
+    global _listeners_registered
+    if _listeners_registered:
+        return True
+    try:
+        from crewai.events import crewai_event_bus, LLMCallCompletedEvent
+    except ImportError:
+        try:
+            from crewai.utilities.events import crewai_event_bus, LLMCallCompletedEvent
+        except ImportError:
+            return False
+
+    @crewai_event_bus.on(LLMCallCompletedEvent)
+    def on_completed(source, event):
+        record_call(event.model or '', getattr(event, 'usage', None),
+                    getattr(event, 'agent_role', None) or '', getattr(event, 'task_name', None) or '')
+
+    _listeners_registered = True
+    return True
@@ -9,15 +9,22 @@ It orchestrates the execution of the financial analysis crew with user inputs.
 import warnings
 import argparse
 import json
+import os
+import signal
 import sys
+import threading
 from pprint import pprint
 
 # Suppress warnings
 warnings.filterwarnings('ignore')
 
 # Import modules
-from config import load_environment, DEFAULT_INPUTS
-from crew import run_financial_analysis
+from config import load_environment, DEFAULT_INPUTS, STREAM_PARAMS, API_PARAMS, WORKER_FARM_PARAMS
+from crew import run_financial_analysis, warm_market_snapshot, register_stream_callback
+from streaming import StreamPrinter
+from cancellation import AnalysisCancelled, CancellationToken, cancellation_scope
+from sweep import parse_sweep_spec, run_sweep, format_sweep_report
+from model_router import model_router
 
 def parse_arguments():
     """Parse command line arguments for customizing the analysis"""
@@ -32,6 +39,26 @@ def parse_arguments():
     parser.add_argument('--exclude', type=str, help='Sectors to exclude (comma separated)')
     parser.add_argument('--stock', type=str, help='Specific stock to analyze (for single stock analysis)')
     parser.add_argument('--output', type=str, help='Output file for analysis results (default: analysis_result.txt)')
+    parser.add_argument('--no-news', action='store_true', help='Do not ingest or consider recent news')
+    parser.add_argument('--fresh', action='store_true', help='Recompute every stage instead of reusing cached stage outputs')
+    parser.add_argument('--warm-snapshot', action='store_true',
+                        help="Build today's shared market-research snapshot for --sectors/--exclude and exit")
+    parser.add_argument('--models', action='store_true', help='Show the model registry and per-task routing and exit')
+    parser.add_argument('--sweep', nargs='+', metavar='AXIS=VALUES',
+                        help='Run a scenario grid, e.g. --sweep risk=Low,Medium,High "timeframe=1-2 years,3-5 years"')
+    parser.add_argument('--no-stream', action='store_true', help='Do not print LLM output as it is generated')
+    parser.add_argument('--serve', action='store_true', help='Run the HTTP API server instead of a single analysis')
+    parser.add_argument('--port', type=int, help='Port for --serve (default: 8000)')
+    parser.add_argument('--stub', action='store_true',
+                        help='Answer LLM calls and web searches with canned data, for local testing without API keys')
+    parser.add_argument('--processes', type=int, nargs='?', const=0, metavar='N',
+                        help='With --serve or --worker, run analyses in N worker processes (default: one per CPU core)')
+    parser.add_argument('--enqueue', type=str, metavar='FILE',
+                        help='Queue one analysis per client profile in a JSON list for --worker nodes and exit')
+    parser.add_argument('--worker', action='store_true', help='Run queued analyses from the job broker')
+    parser.add_argument('--drain', action='store_true', help='With --worker, exit once no queued or running jobs remain')
+    parser.add_argument('--batch-status', type=str, metavar='BATCH',
+                        help='Show the jobs of a queued batch (with --output, save their results as JSON) and exit')
     
     return parser.parse_args()
 
@@ -61,22 +88,154 @@ def prepare_inputs(args):
     if args.stock:
         inputs['stock_selection'] = args.stock
     
+    if args.no_news:
+        inputs['news_impact_consideration'] = False
+    
+    if args.fresh:
+        inputs['reuse_stage_outputs'] = False
+        inputs['use_market_snapshot'] = False
+    
     return inputs
 
+def install_interrupt_handler(token):
+    """First Ctrl+C cancels the analysis cooperatively; a second one exits immediately"""
+    def handle(signum, frame):
+        if token.cancelled:
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+            raise KeyboardInterrupt
+        print("\nCancelling analysis... (press Ctrl+C again to exit immediately)")
+        token.cancel("Analysis cancelled with Ctrl+C")
+    signal.signal(signal.SIGINT, handle)
+
+def enqueue_profiles(path):
+    """Queue one analysis per client profile (a JSON list of input overrides) as one batch"""
+    from job_broker import SQLiteBroker
+    with open(path) as f:
+        profiles = json.load(f)
+    if not isinstance(profiles, list) or not all(isinstance(p, dict) for p in profiles):
+        raise ValueError(f"{path} must contain a JSON list of client profiles")
+    broker = SQLiteBroker()
+    batch = broker.enqueue_batch([{**DEFAULT_INPUTS, **profile} for profile in profiles])
+    print(f"Queued {len(profiles)} analyses as batch {batch} in {broker.path}")
+    return batch
+
+def show_batch(batch, output_file=None):
+    """Print a batch's progress and optionally save its jobs, with results, as JSON"""
+    from job_broker import SQLiteBroker
+    jobs = SQLiteBroker().jobs(batch)
+    if not jobs:
+        raise ValueError(f"No jobs found for batch {batch}")
+    counts = {}
+    for job in jobs:
+        counts[job['status']] = counts.get(job['status'], 0) + 1
+        target = job['inputs'].get('stock_selection') or job['inputs'].get('sector_preferences')
+        print(f"{job['id']}  {job['status']:<10} attempts {job['attempts']}/{job['max_attempts']}  {target}"
+              + (f"  ({job['error']})" if job['error'] else ""))
+    print(f"\nBatch {batch}: " + ", ".join(f"{n} {status}" for status, n in sorted(counts.items())))
+    if output_file:
+        with open(output_file, 'w') as f:
+            json.dump(jobs, f, indent=2, default=str)
+        print(f"Jobs saved to '{output_file}'")
+    return jobs
+
+def run_worker(args):
+    """Lease and run analyses from the job broker until Ctrl+C (or, with --drain, until the queue is empty)"""
+    from api_server import AnalysisService
+    from job_broker import NodeWorker, SQLiteBroker
+    if args.processes is not None:
+        from worker_farm import WorkerFarm
+        service = AnalysisService(farm=WorkerFarm(args.processes or WORKER_FARM_PARAMS['processes']))
+    else:
+        service = AnalysisService()
+    worker = NodeWorker(SQLiteBroker(), service)
+    stop = threading.Event()
+    signal.signal(signal.SIGINT, lambda signum, frame: stop.set())
+    print(f"Worker {worker.worker_id} running up to {service.capacity} analyses at a time (Ctrl+C to stop)")
+    try:
+        worker.run(stop, drain=args.drain)
+    finally:
+        service.shutdown()
+    print(f"Worker stopped: {worker.stats}")
+    return worker.stats
+
 def main():
     """Main function to run the financial analysis"""
     
     # Parse command line arguments
     args = parse_arguments()
     
+    if args.models:
+        print(model_router.format_table())
+        return None
+    
     try:
+        # Local testing: canned LLM and search responses, no API keys needed
+        if args.stub:
+            from stub_backends import install_stub_backends
+            os.environ.setdefault("OPENAI_API_KEY", "stub")
+            os.environ.setdefault("SERPER_API_KEY", "stub")
+            install_stub_backends()
+            print("Stub mode: LLM calls and web searches return canned data.")
+        
         # Load environment variables
-        env_vars = load_environment()
-        print(f"Environment loaded. Using {env_vars['OPENAI_MODEL_NAME']} model.")
+        load_environment()
+        print("Environment loaded. Models are routed per task (see --models).")
+        
+        # HTTP API: analyses are submitted, followed and cancelled over HTTP
+        if args.serve:
+            from api_server import AnalysisService, serve
+            service = None
+            if args.processes is not None:
+                from worker_farm import WorkerFarm
+                service = AnalysisService(farm=WorkerFarm(args.processes or WORKER_FARM_PARAMS['processes']))
+            serve(port=args.port or API_PARAMS['port'], service=service)
+            return None
+        
+        # Distributed batches: queue client profiles, run them on any node, check progress
+        if args.enqueue:
+            return enqueue_profiles(args.enqueue)
+        if args.batch_status:
+            return show_batch(args.batch_status, args.output)
+        if args.worker:
+            return run_worker(args)
         
         # Prepare inputs
         inputs = prepare_inputs(args)
         
+        # Print LLM output token by token; concurrent sweep scenarios would interleave
+        if args.no_stream:
+            STREAM_PARAMS['enabled'] = False
+        elif not args.sweep:
+            register_stream_callback(StreamPrinter())
+        
+        # Ctrl+C stops every agent, tool request and worker thread of the run
+        cancel_token = CancellationToken()
+        install_interrupt_handler(cancel_token)
+        
+        # Scheduled warm-up: build the shared market snapshot and stop
+        if args.warm_snapshot:
+            print(f"\nBuilding market snapshot for: {inputs['sector_preferences']}")
+            with cancellation_scope(cancel_token):
+                snapshot = warm_market_snapshot(inputs)
+            print(f"Snapshot {snapshot['date']} v{snapshot['version']} stored ({snapshot['key']})")
+            return snapshot
+        
+        # Scenario sweep: run the grid and write one combined report
+        if args.sweep:
+            grid = parse_sweep_spec(args.sweep)
+            print(f"\n=== Starting Scenario Sweep ({len(grid)} axes) ===")
+            pprint(grid)
+            with cancellation_scope(cancel_token):
+                entries = run_sweep(inputs, grid)
+            report = format_sweep_report(entries, grid)
+            print("\n=== SWEEP RESULT ===\n")
+            print(report)
+            output_file = args.output if args.output else 'sweep_result.md'
+            with open(output_file, 'w') as f:
+                f.write(report)
+            print(f"\nSweep report saved to '{output_file}'")
+            return entries
+        
         print("\n=== Starting Financial Analysis ===")
         print("Input Parameters:")
         pprint(inputs)
@@ -87,7 +246,7 @@ def main():
         print(f"Analysis Mode: {analysis_mode}")
         
         # Run the financial analysis
-        result = run_financial_analysis(inputs)
+        result = run_financial_analysis(inputs, cancel_token=cancel_token)
         
         if not result or not hasattr(result, 'raw'):
             print("\nError: Analysis returned invalid results.")
@@ -107,6 +266,9 @@ def main():
         
         return result
     
+    except AnalysisCancelled as e:
+        print(f"\n{str(e)}. No results were saved.")
+        sys.exit(130)
     except ValueError as e:
         print(f"\nInput Error: {str(e)}")
         print("\nPlease check your parameters and try again.")
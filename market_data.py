@@ -0,0 +1,137 @@
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from config import UNIVERSE_FILE, PRICE_STORE_DIR
+
+# Columns every universe table must provide
+UNIVERSE_COLUMNS = [
+    'ticker',
+    'sector',
+    'price',
+    'avg_dollar_volume',
+    'pe_ratio',
+    'momentum_3m',
+    'volatility'
+]
+
+# Fields stored for every daily bar
+PRICE_FIELDS = ['open', 'high', 'low', 'close', 'volume']
+
+# Loaded tables keyed by path, invalidated when the file changes on disk
+_universe_cache: Dict[str, Tuple[float, pd.DataFrame]] = {}
+
+def _read_table(path: str) -> pd.DataFrame:
+    """Read a CSV or Parquet table based on its file extension"""
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+def load_universe(path: Optional[str] = None) -> Optional[pd.DataFrame]:
+    """
+    Load the local fundamentals/price table used for screening
+
+    Args:
+        path (str): Path to a CSV or Parquet file. Defaults to UNIVERSE_FILE.
+
+    Returns:
+        DataFrame with one row per ticker, or None if no table is available
+    """
+    path = path or UNIVERSE_FILE
+    if not os.path.exists(path):
+        return None
+
+    mtime = os.path.getmtime(path)
+    cached = _universe_cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    universe = _read_table(path)
+    universe.columns = [str(c).strip().lower() for c in universe.columns]
+
+    missing = [c for c in UNIVERSE_COLUMNS if c not in universe.columns]
+    if missing:
+        raise ValueError(f"Universe table {path} is missing columns: {', '.join(missing)}")
+
+    # Normalize once so every screen can use plain vectorized comparisons
+    universe['ticker'] = universe['ticker'].astype(str).str.upper()
+    universe['sector_key'] = universe['sector'].astype(str).str.strip().str.lower()
+    for column in UNIVERSE_COLUMNS[2:]:
+        universe[column] = pd.to_numeric(universe[column], errors='coerce')
+
+    _universe_cache[path] = (mtime, universe)
+    return universe
+
+class PriceStore:
+    """Local store of daily OHLCV bars kept as one CSV file per ticker"""
+    
+    def __init__(self, root: str = PRICE_STORE_DIR):
+        self.root = root
+        self._cache: Dict[str, Tuple[float, pd.DataFrame]] = {}
+    
+    def _path(self, ticker: str) -> str:
+        return os.path.join(self.root, f"{ticker.upper()}.csv")
+    
+    def tickers(self) -> List[str]:
+        """List all tickers with stored bars"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name[:-4].upper() for name in os.listdir(self.root) if name.endswith('.csv'))
+    
+    def load_bars(self, ticker: str) -> pd.DataFrame:
+        """Load all bars for one ticker indexed by date (empty if unknown)"""
+        path = self._path(ticker)
+        if not os.path.exists(path):
+            return pd.DataFrame(columns=PRICE_FIELDS, dtype=float)
+        
+        mtime = os.path.getmtime(path)
+        cached = self._cache.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        
+        bars = pd.read_csv(path, parse_dates=['date'], index_col='date')
+        bars.columns = [str(c).strip().lower() for c in bars.columns]
+        bars = bars[PRICE_FIELDS].astype(float).sort_index()
+        bars = bars[~bars.index.duplicated(keep='last')]
+        self._cache[path] = (mtime, bars)
+        return bars
+    
+    def load_panel(self, tickers: Optional[Iterable[str]] = None,
+                   lookback: Optional[int] = None,
+                   since: Optional[pd.Timestamp] = None) -> Dict[str, pd.DataFrame]:
+        """
+        Load bars for many tickers as wide frames (date x ticker), one per field
+        
+        Args:
+            tickers (list): Tickers to load. Defaults to every stored ticker.
+            lookback (int): Keep only the most recent N dates
+            since (Timestamp): Keep only dates strictly after this one
+        
+        Returns:
+            Dict mapping each of PRICE_FIELDS to a wide DataFrame
+        """
+        tickers = [t.upper() for t in (tickers if tickers is not None else self.tickers())]
+        frames = {t: self.load_bars(t) for t in tickers}
+        frames = {t: f for t, f in frames.items() if not f.empty}
+        if not frames:
+            return {field: pd.DataFrame() for field in PRICE_FIELDS}
+        
+        stacked = pd.concat(frames, axis=1)
+        if since is not None:
+            stacked = stacked[stacked.index > since]
+        if lookback:
+            stacked = stacked.iloc[-lookback:]
+        
+        return {field: stacked.xs(field, axis=1, level=1) for field in PRICE_FIELDS}
+    
+    def append_bar(self, ticker: str, date, bar: Dict[str, float]):
+        """Append a new daily bar for a ticker"""
+        os.makedirs(self.root, exist_ok=True)
+        path = self._path(ticker)
+        row = pd.DataFrame([[bar[f] for f in PRICE_FIELDS]], columns=PRICE_FIELDS,
+                           index=pd.DatetimeIndex([pd.Timestamp(date)], name='date'))
+        row.to_csv(path, mode='a', header=not os.path.exists(path))
+
+# Shared price store instance
+price_store = PriceStore()
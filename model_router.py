@@ -0,0 +1,258 @@
+import atexit
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from config import (
+    MODEL_REGISTRY,
+    MODEL_ROUTES,
+    MODEL_ROUTING_OBJECTIVE,
+    MODEL_CONFIG_FILE,
+    MODEL_PROFILE_FILE
+)
+
+# Typical prompt/completion sizes of one agent step, used to compare models
+TYPICAL_INPUT_TOKENS = 3000
+TYPICAL_OUTPUT_TOKENS = 500
+
+# Weight of the newest measurement in the running latency/throughput averages
+MEASUREMENT_WEIGHT = 0.2
+
+# Measurements are written to the profile file at most this often (and at exit)
+PROFILE_SAVE_INTERVAL_SECONDS = 30
+
+class ModelRouter:
+    """
+    Chooses a model per task from the registry and routing table
+
+    The registry starts from config.MODEL_REGISTRY, is overridden by the
+    optional model config file and then by latency/throughput measured on
+    real calls, so operators can retune routing by editing JSON only.
+    """
+
+    def __init__(self, config_file: str = MODEL_CONFIG_FILE, profile_file: str = MODEL_PROFILE_FILE):
+        self.config_file = config_file
+        self.profile_file = profile_file
+        self._lock = threading.Lock()
+        self._measured: Optional[Dict[str, Dict[str, float]]] = None
+        self._started: Dict[str, Dict[str, Optional[float]]] = {}
+        self._dirty = False
+        self._last_saved = time.monotonic()
+
+    def _overrides(self) -> Dict[str, Any]:
+        if not os.path.exists(self.config_file):
+            return {}
+        try:
+            with open(self.config_file) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Warning: could not read model config {self.config_file}: {str(e)}")
+            return {}
+
+    def _load_measured(self) -> Dict[str, Dict[str, float]]:
+        if self._measured is None:
+            try:
+                with open(self.profile_file) as f:
+                    self._measured = json.load(f)
+            except (OSError, ValueError):
+                self._measured = {}
+        return self._measured
+
+    def registry(self) -> Dict[str, Dict[str, Any]]:
+        """Effective per-model profiles: defaults, then config file, then measurements"""
+        overrides = self._overrides().get('registry', {})
+        with self._lock:
+            measured = dict(self._load_measured())
+        profiles = {}
+        for name in list(MODEL_REGISTRY) + [m for m in overrides if m not in MODEL_REGISTRY]:
+            profile = {**MODEL_REGISTRY.get(name, {}), **overrides.get(name, {})}
+            for field in ('latency_ms', 'tokens_per_second'):
+                if field in measured.get(name, {}):
+                    profile[field] = measured[name][field]
+            profile['measured_calls'] = int(measured.get(name, {}).get('calls', 0))
+            profiles[name] = profile
+        return profiles
+
+    def routes(self) -> Dict[str, str]:
+        return {**MODEL_ROUTES, **self._overrides().get('routes', {})}
+
+    def objective(self) -> str:
+        return self._overrides().get('objective', MODEL_ROUTING_OBJECTIVE)
+
+    def estimate(self, profile: Dict[str, Any]) -> Dict[str, float]:
+        """Estimated seconds and USD for one typical agent step on a model"""
+        seconds = (profile.get('latency_ms', 1000) / 1000.0
+                   + TYPICAL_OUTPUT_TOKENS / max(profile.get('tokens_per_second', 1), 1))
+        cost = (TYPICAL_INPUT_TOKENS * profile.get('input_cost', 0)
+                + TYPICAL_OUTPUT_TOKENS * profile.get('output_cost', 0)) / 1e6
+        return {'seconds': seconds, 'cost': cost}
+
+    def choose(self, route: str) -> str:
+        """
+        Model for a route (task name, 'manager' or 'delegate')
+
+        A route maps to a model name or a tier; within a tier the model is
+        picked by the routing objective. Unknown names fall back to the
+        cheapest 'fast' model with a warning.
+        """
+        registry = self.registry()
+        target = self.routes().get(route, 'fast')
+        if target in registry:
+            return target
+
+        candidates = {name: p for name, p in registry.items() if p.get('tier') == target}
+        if not candidates:
+            print(f"Warning: no model for route '{route}' ({target}). Using the cheapest fast model.")
+            candidates = {name: p for name, p in registry.items() if p.get('tier') == 'fast'} or registry
+
+        objective = self.objective()
+        if objective == 'latency':
+            return min(candidates, key=lambda n: self.estimate(candidates[n])['seconds'])
+        if objective == 'quality':
+            return max(candidates, key=lambda n: candidates[n].get('quality', 0))
+        return min(candidates, key=lambda n: self.estimate(candidates[n])['cost'])
+
+    def call_started(self, call_id: str, at: Optional[float] = None):
+        """
+        Start timing an LLM call
+
+        call_id must be unique per call: one LLM object serves concurrent
+        calls in a fan-out or sweep. at is the event time, as the event bus
+        may deliver events late and out of order.
+        """
+        if not call_id:
+            raise ValueError("call_started needs the call's call_id")
+        with self._lock:
+            self._started[call_id] = {'at': time.time() if at is None else at, 'first_token': None}
+
+    def first_token(self, call_id: str, at: Optional[float] = None):
+        """Record when a streamed call produced its first chunk"""
+        with self._lock:
+            call = self._started.get(call_id)
+            if call is not None and call['first_token'] is None:
+                call['first_token'] = time.time() if at is None else at
+
+    def call_failed(self, call_id: str):
+        with self._lock:
+            self._started.pop(call_id, None)
+
+    def call_completed(self, call_id: str, model: str, output_tokens: int = 0, at: Optional[float] = None):
+        """Fold one call's measured latency and throughput into the model's running profile"""
+        with self._lock:
+            call = self._started.pop(call_id, None)
+        if call is None or not model:
+            return
+        elapsed = max((time.time() if at is None else at) - call['at'], 0.001)
+        model = model.split('/')[-1]
+        profile = self.registry().get(model, {})
+        with self._lock:
+            measured = self._load_measured()
+            running = measured.setdefault(model, {'calls': 0})
+            running['calls'] = running.get('calls', 0) + 1
+            if call['first_token'] is not None:
+                # Streamed: time to first token is the latency, the rest is generation
+                latency = min(max(call['first_token'] - call['at'], 0.0), elapsed)
+            else:
+                # Only the total is known: split it using the current throughput estimate
+                expected_generation = output_tokens / max(profile.get('tokens_per_second', 1), 1)
+                latency = max(elapsed - expected_generation, 0.1 * elapsed)
+            running['latency_ms'] = _blend(running.get('latency_ms'), latency * 1000)
+            if output_tokens > 0:
+                generation = max(elapsed - latency, 0.1 * elapsed)
+                running['tokens_per_second'] = _blend(running.get('tokens_per_second'), output_tokens / generation)
+            self._dirty = True
+            if time.monotonic() - self._last_saved >= PROFILE_SAVE_INTERVAL_SECONDS:
+                self._save_measured()
+
+    def flush(self):
+        """Write pending measurements to the profile file"""
+        with self._lock:
+            if self._dirty:
+                self._save_measured()
+
+    def _save_measured(self):
+        # Called with the lock held
+        self._dirty = False
+        self._last_saved = time.monotonic()
+        try:
+            os.makedirs(os.path.dirname(self.profile_file) or '.', exist_ok=True)
+            tmp_path = f"{self.profile_file}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self._measured, f, indent=2)
+            os.replace(tmp_path, self.profile_file)
+        except OSError as e:
+            print(f"Warning: could not save model profiles to {self.profile_file}: {str(e)}")
+
+    def format_table(self) -> str:
+        """Registry and routes as a text table for operators"""
+        lines = ["Model | Tier | Latency ms | Tokens/s | $/M in | $/M out | Quality | Measured calls"]
+        for name, p in self.registry().items():
+            lines.append(f"{name} | {p.get('tier', '-')} | {p.get('latency_ms', 0):.0f} | "
+                         f"{p.get('tokens_per_second', 0):.0f} | {p.get('input_cost', 0):.2f} | "
+                         f"{p.get('output_cost', 0):.2f} | {p.get('quality', '-')} | {p['measured_calls']}")
+        lines += ["", f"Routing objective: {self.objective()}", "Route | Target | Model"]
+        for route, target in self.routes().items():
+            lines.append(f"{route} | {target} | {self.choose(route)}")
+        return "\n".join(lines)
+
+def _blend(previous: Optional[float], value: float) -> float:
+    if previous is None:
+        return value
+    return (1 - MEASUREMENT_WEIGHT) * previous + MEASUREMENT_WEIGHT * value
+
+# Shared model router instance
+model_router = ModelRouter()
+atexit.register(model_router.flush)
+
+_listeners_registered = False
+
+def register_latency_listeners(router: ModelRouter = model_router) -> bool:
+    """
+    Measure every LLM call through the crewai event bus
+
+    Returns False when the installed crewai has no event bus.
+    """
+    global _listeners_registered
+    if _listeners_registered:
+        return True
+    try:
+        from crewai.events import crewai_event_bus, LLMCallStartedEvent, LLMCallCompletedEvent
+    except ImportError:
+        try:
+            from crewai.utilities.events import crewai_event_bus, LLMCallStartedEvent, LLMCallCompletedEvent
+        except ImportError:
+            return False
+
+    # Events without a call_id cannot be told apart from concurrent calls on the same LLM
+    @crewai_event_bus.on(LLMCallStartedEvent)
+    def on_started(source, event):
+        if getattr(event, 'call_id', None):
+            router.call_started(event.call_id, event.timestamp.timestamp())
+
+    @crewai_event_bus.on(LLMCallCompletedEvent)
+    def on_completed(source, event):
+        usage = event.usage or {}
+        if getattr(event, 'call_id', None):
+            router.call_completed(event.call_id, event.model or '',
+                                  int(usage.get('completion_tokens') or 0), event.timestamp.timestamp())
+
+    try:
+        from crewai.events import LLMCallFailedEvent, LLMStreamChunkEvent
+    except ImportError:
+        LLMCallFailedEvent = LLMStreamChunkEvent = None
+
+    if LLMStreamChunkEvent is not None:
+        @crewai_event_bus.on(LLMStreamChunkEvent)
+        def on_chunk(source, event):
+            if getattr(event, 'call_id', None):
+                router.first_token(event.call_id, event.timestamp.timestamp())
+
+        @crewai_event_bus.on(LLMCallFailedEvent)
+        def on_failed(source, event):
+            if getattr(event, 'call_id', None):
+                router.call_failed(event.call_id)
+
+    _listeners_registered = True
+    return True
@@ -0,0 +1,278 @@
+import datetime
+import hashlib
+import os
+import re
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from cancellation import AnalysisCancelled, check_cancelled, submit_in_context
+from config import NEWS_DB_PATH, NEWS_PARAMS
+from serper import serper_request
+
+# Number of 16-bit bands a simhash is split into for near-duplicate lookup.
+# Two fingerprints within 3 bits of each other always share at least one band.
+SIMHASH_BANDS = 4
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_RELATIVE_RE = re.compile(r"(\d+)\s+(minute|hour|day|week|month)s?\s+ago")
+
+def news_enabled(inputs: Dict[str, Any]) -> bool:
+    """Interpret the news_impact_consideration flag from the CLI, UI or defaults"""
+    value = inputs.get('news_impact_consideration', False)
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    return bool(value)
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    """64-bit simhash over word shingles of the text"""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < shingle_size:
+        shingles = [" ".join(words)]
+    else:
+        shingles = [" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)]
+
+    hashes = np.array([int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), 'little')
+                       for s in shingles], dtype=np.uint64)
+    bits = (hashes[:, None] >> np.arange(64, dtype=np.uint64)) & np.uint64(1)
+    votes = (2 * bits.astype(np.int64) - 1).sum(axis=0)
+    return int(sum(1 << i for i in np.nonzero(votes > 0)[0]))
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+def _bands(fingerprint: int) -> List[int]:
+    return [(fingerprint >> (16 * i)) & 0xFFFF for i in range(SIMHASH_BANDS)]
+
+def _to_signed(value: int) -> int:
+    """SQLite integers are signed 64-bit"""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+def _parse_published(text: Optional[str], now: datetime.datetime) -> datetime.datetime:
+    """Parse Serper dates such as '3 hours ago' or 'Mar 3, 2024'"""
+    if text:
+        match = _RELATIVE_RE.search(text.lower())
+        if match:
+            amount, unit = int(match.group(1)), match.group(2)
+            days = {'minute': 1 / 1440, 'hour': 1 / 24, 'day': 1, 'week': 7, 'month': 30}[unit]
+            return now - datetime.timedelta(days=amount * days)
+        for fmt in ("%b %d, %Y", "%d %b %Y", "%Y-%m-%d"):
+            try:
+                return datetime.datetime.strptime(text.strip(), fmt)
+            except ValueError:
+                continue
+    return now
+
+class NewsStore:
+    """SQLite store of deduplicated news articles indexed by topic and time"""
+
+    def __init__(self, path: str = NEWS_DB_PATH):
+        self.path = path
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS articles (
+                    id INTEGER PRIMARY KEY,
+                    url TEXT UNIQUE NOT NULL,
+                    title TEXT,
+                    snippet TEXT,
+                    source TEXT,
+                    published_at TEXT NOT NULL,
+                    fetched_at TEXT NOT NULL,
+                    simhash INTEGER NOT NULL,
+                    band0 INTEGER, band1 INTEGER, band2 INTEGER, band3 INTEGER,
+                    sentiment REAL
+                );
+                CREATE TABLE IF NOT EXISTS article_topics (
+                    article_id INTEGER NOT NULL,
+                    topic TEXT NOT NULL,
+                    published_at TEXT NOT NULL,
+                    PRIMARY KEY (topic, article_id)
+                );
+                CREATE TABLE IF NOT EXISTS fetch_log (
+                    topic TEXT PRIMARY KEY,
+                    last_fetched TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_topics_time ON article_topics (topic, published_at);
+                CREATE INDEX IF NOT EXISTS idx_articles_time ON articles (published_at);
+                CREATE INDEX IF NOT EXISTS idx_band0 ON articles (band0);
+                CREATE INDEX IF NOT EXISTS idx_band1 ON articles (band1);
+                CREATE INDEX IF NOT EXISTS idx_band2 ON articles (band2);
+                CREATE INDEX IF NOT EXISTS idx_band3 ON articles (band3);
+            """)
+            # Stores created before sentiment scoring lack the column
+            columns = [row['name'] for row in conn.execute("PRAGMA table_info(articles)")]
+            if 'sentiment' not in columns:
+                conn.execute("ALTER TABLE articles ADD COLUMN sentiment REAL")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_articles_unscored ON articles (sentiment) WHERE sentiment IS NULL")
+            self._initialized = True
+        return conn
+
+    @contextmanager
+    def session(self):
+        """Connection that commits on success and is always closed"""
+        conn = self._connect()
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def last_fetched(self, topic: str) -> Optional[datetime.datetime]:
+        with self.session() as conn:
+            row = conn.execute("SELECT last_fetched FROM fetch_log WHERE topic = ?", (topic,)).fetchone()
+        return datetime.datetime.fromisoformat(row['last_fetched']) if row else None
+
+    def mark_fetched(self, topic: str, when: datetime.datetime):
+        with self.session() as conn:
+            conn.execute("INSERT OR REPLACE INTO fetch_log (topic, last_fetched) VALUES (?, ?)",
+                         (topic, when.isoformat()))
+
+    def _find_near_duplicate(self, conn, fingerprint: int, max_distance: int) -> Optional[int]:
+        bands = _bands(fingerprint)
+        rows = conn.execute(
+            "SELECT id, simhash FROM articles WHERE band0 = ? OR band1 = ? OR band2 = ? OR band3 = ?",
+            bands
+        ).fetchall()
+        for row in rows:
+            if hamming_distance(fingerprint, row['simhash'] & ((1 << 64) - 1)) <= max_distance:
+                return row['id']
+        return None
+
+    def add_articles(self, topic: str, articles: Iterable[Dict[str, Any]],
+                     max_distance: int = NEWS_PARAMS['simhash_distance']) -> int:
+        """
+        Store articles under a topic, folding near-duplicates into existing rows
+
+        Returns:
+            Number of new articles stored
+        """
+        added = 0
+        with self.session() as conn:
+            for article in articles:
+                fingerprint = simhash(f"{article['title']} {article.get('snippet', '')}")
+                existing = conn.execute("SELECT id FROM articles WHERE url = ?", (article['url'],)).fetchone()
+                article_id = existing['id'] if existing else self._find_near_duplicate(conn, fingerprint, max_distance)
+
+                if article_id is None:
+                    cursor = conn.execute(
+                        "INSERT INTO articles (url, title, snippet, source, published_at, fetched_at, simhash, "
+                        "band0, band1, band2, band3) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (article['url'], article['title'], article.get('snippet', ''), article.get('source', ''),
+                         article['published_at'], article['fetched_at'], _to_signed(fingerprint),
+                         *_bands(fingerprint))
+                    )
+                    article_id = cursor.lastrowid
+                    added += 1
+
+                published = conn.execute("SELECT published_at FROM articles WHERE id = ?", (article_id,)).fetchone()
+                conn.execute("INSERT OR IGNORE INTO article_topics (article_id, topic, published_at) VALUES (?, ?, ?)",
+                             (article_id, topic, published['published_at']))
+        return added
+
+    def query(self, topics: Iterable[str], days: int = NEWS_PARAMS['lookback_days'],
+              limit: int = 20) -> List[Dict[str, Any]]:
+        """Most recent stored articles for any of the topics"""
+        topics = [normalize_topic(t) for t in topics]
+        if not topics:
+            return []
+        since = (datetime.datetime.now() - datetime.timedelta(days=days)).isoformat()
+        placeholders = ",".join("?" for _ in topics)
+        with self.session() as conn:
+            rows = conn.execute(
+                f"SELECT DISTINCT a.id, a.title, a.snippet, a.source, a.url, a.published_at "
+                f"FROM article_topics t JOIN articles a ON a.id = t.article_id "
+                f"WHERE t.topic IN ({placeholders}) AND t.published_at >= ? "
+                f"ORDER BY a.published_at DESC LIMIT ?",
+                (*topics, since, limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+# Shared news store instance
+news_store = NewsStore()
+
+def normalize_topic(topic: str) -> str:
+    return " ".join(topic.strip().lower().split())
+
+def news_topics(inputs: Dict[str, Any], tickers: Iterable[str] = ()) -> List[str]:
+    """Sectors and tickers whose news matters for this analysis"""
+    if inputs.get('stock_selection'):
+        return [normalize_topic(inputs['stock_selection'])]
+    sectors = [s for s in str(inputs.get('sector_preferences', '')).split(',') if s.strip()]
+    topics = [normalize_topic(s) for s in sectors]
+    topics += [normalize_topic(t) for t in list(tickers)[:NEWS_PARAMS['max_tickers']]]
+    return list(dict.fromkeys(topics))
+
+def _time_filter(last: Optional[datetime.datetime], now: datetime.datetime) -> str:
+    """Narrowest Serper time filter that covers the gap since the last fetch"""
+    if last is None:
+        return 'qdr:w'
+    gap = now - last
+    if gap <= datetime.timedelta(hours=1):
+        return 'qdr:h'
+    if gap <= datetime.timedelta(days=1):
+        return 'qdr:d'
+    return 'qdr:w'
+
+def fetch_topic_news(topic: str, store: NewsStore = news_store,
+                     params: Optional[Dict] = None) -> int:
+    """Fetch news for one topic if its last fetch is stale, returning articles added"""
+    p = {**NEWS_PARAMS, **(params or {})}
+    now = datetime.datetime.now()
+    last = store.last_fetched(topic)
+    if last and now - last < datetime.timedelta(hours=p['refresh_hours']):
+        return 0
+
+    response = serper_request(f"{topic} stock market news", 'news', num=p['results_per_query'],
+                              tbs=_time_filter(last, now), timeout=p['request_timeout'])
+    articles = [{
+        'url': item['link'],
+        'title': item.get('title', ''),
+        'snippet': item.get('snippet', ''),
+        'source': item.get('source', ''),
+        'published_at': _parse_published(item.get('date'), now).isoformat(),
+        'fetched_at': now.isoformat()
+    } for item in response.get('news', []) if item.get('link')]
+
+    added = store.add_articles(topic, articles, p['simhash_distance'])
+    store.mark_fetched(topic, now)
+    return added
+
+def ingest_news(topics: Iterable[str], store: NewsStore = news_store,
+                params: Optional[Dict] = None) -> Dict[str, int]:
+    """
+    Incrementally pull news for several topics concurrently
+
+    Returns:
+        Mapping of topic to number of new articles (-1 if the fetch failed)
+    """
+    p = {**NEWS_PARAMS, **(params or {})}
+    topics = list(topics)
+
+    def fetch(topic):
+        check_cancelled()
+        try:
+            return fetch_topic_news(topic, store, p)
+        except AnalysisCancelled:
+            raise
+        except Exception as e:
+            print(f"News fetch failed for {topic}: {str(e)}")
+            return -1
+
+    # Fetches run in the caller's context, so they stop when its analysis is cancelled
+    executor = ThreadPoolExecutor(max_workers=p['max_workers'])
+    futures = [submit_in_context(executor, fetch, topic) for topic in topics]
+    try:
+        return {topic: future.result() for topic, future in zip(topics, futures)}
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
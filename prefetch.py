@@ -0,0 +1,157 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from cancellation import AnalysisCancelled, check_cancelled, submit_in_context
+from config import PREFETCH_PARAMS
+from news import ingest_news
+from run_stats import count_for_run
+from screener import parse_sector_list
+
+class ToolResultCache:
+    """
+    Thread-safe TTL cache of tool results
+
+    Entries hold futures, so a tool call for a query that is still being
+    prefetched waits for the in-flight request instead of issuing a second one.
+    """
+
+    def __init__(self, ttl_seconds: float = PREFETCH_PARAMS['cache_ttl_minutes'] * 60,
+                 max_entries: int = PREFETCH_PARAMS['max_entries']):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Any, Tuple[float, Future]]" = OrderedDict()
+        self.poll_interval = 0.1
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: Any, compute: Callable[[], Any]) -> Any:
+        """
+        Cached (or in-flight) result for key, computing it on a miss
+
+        A run waiting on another run's in-flight request keeps checking its
+        own cancellation token. If the run computing the result is cancelled,
+        its entry is dropped and a waiting run computes the result itself.
+        """
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry and entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    count_for_run('search_cache', hits=1)
+                    future, owner = entry[1], False
+                else:
+                    self.misses += 1
+                    count_for_run('search_cache', misses=1)
+                    future, owner = Future(), True
+                    self._entries[key] = (time.monotonic() + self.ttl_seconds, future)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+
+            if not owner:
+                while not future.done():
+                    check_cancelled()
+                    wait((future,), timeout=self.poll_interval)
+                if future.cancelled():
+                    # The computing run was cancelled; retry
+                    continue
+                return future.result()
+            try:
+                future.set_result(compute())
+            except AnalysisCancelled:
+                # Only the computing run was cancelled, not the ones waiting on it
+                self._discard(key, future)
+                future.cancel()
+                raise
+            except Exception as e:
+                future.set_exception(e)
+                # Failures are not cached
+                self._discard(key, future)
+            return future.result()
+
+    def _discard(self, key: Any, future: Future):
+        with self._lock:
+            if self._entries.get(key, (None, None))[1] is future:
+                del self._entries[key]
+
+# Shared cache for web search results
+search_cache = ToolResultCache()
+
+def search_key(query: str, search_type: str = 'search') -> Tuple[str, str]:
+    """Cache key that ignores case and whitespace differences"""
+    return (search_type, " ".join(str(query).lower().split()))
+
+def predict_queries(inputs: Dict[str, Any], tickers: Iterable[str] = (),
+                    params: Optional[Dict] = None) -> List[str]:
+    """
+    Web searches the agents are likely to run for these inputs
+
+    Args:
+        inputs (dict): Analysis inputs (stock_selection, sector_preferences, exclude_sectors)
+        tickers (Iterable[str]): Screened candidates, best first
+        params (dict): Overrides for PREFETCH_PARAMS
+    """
+    p = {**PREFETCH_PARAMS, **(params or {})}
+    stock = str(inputs.get('stock_selection') or '').strip()
+    if stock:
+        return [f"{stock} stock news", f"{stock} stock analysis",
+                f"{stock} earnings results", f"{stock} analyst price target"]
+
+    excluded = set(parse_sector_list(inputs.get('exclude_sectors')))
+    sectors = [s.strip() for s in str(inputs.get('sector_preferences') or '').split(',')
+               if s.strip() and s.strip().lower() not in excluded]
+    queries = []
+    for sector in sectors:
+        queries += [f"{sector} sector outlook", f"best {sector} stocks to buy"]
+    queries += [f"{ticker} stock analysis" for ticker in list(tickers)[:p['max_tickers']]]
+    return list(dict.fromkeys(queries))
+
+class Prefetch:
+    """Handle on the searches and news ingestion started by start_prefetch"""
+
+    def __init__(self, searches: Dict[str, Future], news: Optional[Future]):
+        self.searches = searches
+        self.news = news
+
+    def news_result(self) -> Dict[str, int]:
+        """Wait for the news ingestion and return its per-topic counts"""
+        return self.news.result() if self.news else {}
+
+    def completed_searches(self) -> int:
+        return sum(1 for f in self.searches.values() if f.done() and not f.exception())
+
+def start_prefetch(queries: Iterable[str], search: Callable[[str], Any],
+                   news_topics: Optional[List[str]] = None,
+                   params: Optional[Dict] = None) -> Prefetch:
+    """
+    Start the likely searches and news fetches in the background
+
+    Searches go through search(query), which is expected to populate
+    search_cache, so the agents' first matching tool calls are cache hits.
+    Nothing here blocks; failures are printed and otherwise ignored.
+
+    Args:
+        queries (Iterable[str]): Searches to run, see predict_queries
+        search (Callable): Function running one search through the search tool
+        news_topics (list): Topics to ingest news for, or None to skip news
+        params (dict): Overrides for PREFETCH_PARAMS
+    """
+    p = {**PREFETCH_PARAMS, **(params or {})}
+
+    def run_search(query):
+        try:
+            return search(query)
+        except Exception as e:
+            print(f"Prefetch search failed for '{query}': {str(e)}")
+            raise
+
+    executor = ThreadPoolExecutor(max_workers=p['max_workers'])
+    news = submit_in_context(executor, ingest_news, news_topics) if news_topics else None
+    searches = {query: submit_in_context(executor, run_search, query) for query in queries}
+    # Let the work finish in the background
+    executor.shutdown(wait=False)
+    return Prefetch(searches, news)
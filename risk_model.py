@@ -0,0 +1,223 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import RISK_MODEL_DIR, RISK_MODEL_PARAMS
+from market_data import PriceStore, price_store
+
+# Trading days used to annualize daily risk figures
+TRADING_DAYS = 252
+
+class RiskModel:
+    """
+    Covariance estimates for a universe over a rolling window of daily returns
+
+    Only the returns window (T x N) and the factor loadings (N x k) are kept,
+    never a dense N x N matrix. Covariance sub-matrices are built on demand
+    for the tickers a caller asks about.
+    """
+
+    def __init__(self, tickers: List[str], dates: pd.DatetimeIndex, returns: np.ndarray,
+                 last_close: np.ndarray, window: int, params: Optional[Dict] = None):
+        self.params = {**RISK_MODEL_PARAMS, **(params or {})}
+        self.tickers = list(tickers)
+        self.dates = pd.DatetimeIndex(dates)
+        self.returns = returns.astype(np.float32)
+        self.last_close = last_close.astype(np.float64)
+        self.window = window
+        self._positions = {t: i for i, t in enumerate(self.tickers)}
+        self._fit()
+
+    @property
+    def last_date(self) -> pd.Timestamp:
+        return self.dates[-1]
+
+    def _fit(self):
+        """Estimate shrinkage intensity and factor loadings chunk by chunk"""
+        X = np.nan_to_num(self.returns - np.nanmean(self.returns, axis=0), nan=0.0).astype(np.float64)
+        T, N = X.shape
+        self._centered = X.astype(np.float32)
+        self.variance = (X ** 2).sum(axis=0) / T
+
+        # Ledoit-Wolf intensity towards the diagonal target:
+        # delta = sum_{i!=j} Var(s_ij) / sum_{i!=j} s_ij^2, accumulated over
+        # column blocks so only chunk_size^2 entries exist at any time
+        chunk = self.params['chunk_size']
+        X2 = X ** 2
+        sum_s2 = 0.0
+        sum_pi = 0.0
+        for i0 in range(0, N, chunk):
+            Xi, X2i = X[:, i0:i0 + chunk], X2[:, i0:i0 + chunk]
+            for j0 in range(i0, N, chunk):
+                S = Xi.T @ X[:, j0:j0 + chunk] / T
+                P = X2i.T @ X2[:, j0:j0 + chunk] / T - S ** 2
+                if i0 == j0:
+                    sum_s2 += (S ** 2).sum() - (np.diag(S) ** 2).sum()
+                    sum_pi += P.sum() - np.diag(P).sum()
+                else:
+                    # Off-diagonal blocks appear twice in the full matrix
+                    sum_s2 += 2 * (S ** 2).sum()
+                    sum_pi += 2 * P.sum()
+        self.shrinkage = float(np.clip(sum_pi / T / sum_s2, 0.0, 1.0)) if sum_s2 > 0 else 1.0
+
+        # Statistical factor model from the leading singular vectors of the returns
+        k = min(self.params['n_factors'], T - 1, N)
+        _, s, vt = np.linalg.svd(X / np.sqrt(T), full_matrices=False)
+        self.loadings = (vt[:k].T * s[:k]).astype(np.float32)
+        self.specific_variance = np.maximum(self.variance - (self.loadings.astype(np.float64) ** 2).sum(axis=1),
+                                            1e-4 * self.variance)
+
+    def covariance(self, tickers: Optional[Iterable[str]] = None, method: str = 'shrinkage') -> pd.DataFrame:
+        """
+        Daily covariance matrix for a subset of the universe
+
+        Args:
+            tickers (list): Tickers to include. Defaults to the whole universe.
+            method (str): 'shrinkage', 'factor' or 'sample'
+
+        Returns:
+            DataFrame covariance matrix indexed by ticker
+        """
+        names = [t.upper() for t in tickers] if tickers is not None else self.tickers
+        names = [t for t in names if t in self._positions]
+        idx = [self._positions[t] for t in names]
+
+        if method == 'factor':
+            B = self.loadings[idx].astype(np.float64)
+            cov = B @ B.T + np.diag(self.specific_variance[idx])
+        else:
+            X = self._centered[:, idx].astype(np.float64)
+            cov = X.T @ X / X.shape[0]
+            if method == 'shrinkage':
+                cov = (1 - self.shrinkage) * cov + self.shrinkage * np.diag(np.diag(cov))
+            elif method != 'sample':
+                raise ValueError(f"Unknown covariance method: {method}")
+        return pd.DataFrame(cov, index=names, columns=names)
+
+    def portfolio_risk(self, weights: Dict[str, float], method: str = 'shrinkage') -> Dict:
+        """Annualized volatility and per-holding risk contributions of a portfolio"""
+        weights = {t.upper(): w for t, w in weights.items()}
+        known = [t for t in weights if t in self._positions]
+        missing = [t for t in weights if t not in self._positions]
+        cov = self.covariance(known, method) * TRADING_DAYS
+        w = np.array([weights[t] for t in known], dtype=float)
+        if w.sum() > 0:
+            w = w / w.sum()
+
+        variance = float(w @ cov.values @ w) if len(w) else 0.0
+        volatility = np.sqrt(variance)
+        marginal = cov.values @ w
+        contributions = w * marginal / variance if variance > 0 else np.zeros_like(w)
+        standalone = np.sqrt(np.diag(cov.values))
+
+        return {
+            'volatility': volatility,
+            'diversification_ratio': float(w @ standalone / volatility) if volatility > 0 else 1.0,
+            'contributions': dict(zip(known, contributions)),
+            'standalone_volatility': dict(zip(known, standalone)),
+            'correlation': cov.values / np.outer(standalone, standalone) if len(w) else np.empty((0, 0)),
+            'tickers': known,
+            'missing': missing
+        }
+
+    def roll(self, closes: pd.DataFrame) -> 'RiskModel':
+        """
+        Model with new daily closes (date x ticker) appended and returns outside the window dropped
+
+        A new model is returned so callers still holding this one are unaffected.
+        """
+        closes = closes.reindex(columns=self.tickers)
+        prices = np.vstack([self.last_close, closes.to_numpy(dtype=np.float64)])
+        new_returns = np.log(prices[1:] / prices[:-1])
+
+        returns = np.vstack([self.returns, new_returns.astype(np.float32)])[-self.window:]
+        dates = self.dates.append(closes.index)[-self.window:]
+        latest = closes.ffill().iloc[-1].to_numpy(dtype=np.float64)
+        last_close = np.where(np.isnan(latest), self.last_close, latest)
+        return RiskModel(self.tickers, dates, returns, last_close, self.window, self.params)
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename so a concurrent reader never loads a partial file
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            np.savez_compressed(f, tickers=np.array(self.tickers), dates=self.dates.values.astype('datetime64[ns]'),
+                                returns=self.returns, last_close=self.last_close, window=self.window)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, params: Optional[Dict] = None) -> 'RiskModel':
+        data = np.load(path, allow_pickle=False)
+        return cls(list(data['tickers']), pd.DatetimeIndex(data['dates']), data['returns'],
+                   data['last_close'], int(data['window']), params)
+
+def fit_risk_model(closes: pd.DataFrame, window: int = RISK_MODEL_PARAMS['window'],
+                   params: Optional[Dict] = None) -> RiskModel:
+    """Build a risk model from wide daily closes (date x ticker)"""
+    p = {**RISK_MODEL_PARAMS, **(params or {})}
+    closes = closes.iloc[-(window + 1):]
+    returns = np.log(closes / closes.shift(1)).iloc[1:]
+    returns = returns.loc[:, returns.notna().mean() >= p['min_coverage']]
+    last_close = closes[returns.columns].ffill().iloc[-1]
+    return RiskModel(list(returns.columns), returns.index, returns.to_numpy(dtype=np.float32),
+                     last_close.to_numpy(dtype=np.float64), window, p)
+
+def _cache_key(tickers: List[str], window: int) -> str:
+    digest = hashlib.sha1(",".join(sorted(tickers)).encode()).hexdigest()[:16]
+    return f"{digest}_{window}"
+
+# Recently used models, bounded by memory_cache_size
+_model_cache: "OrderedDict[str, RiskModel]" = OrderedDict()
+# Guards _model_cache and the model files; fan-out candidates and API jobs share them
+_model_lock = threading.Lock()
+
+def get_risk_model(tickers: Optional[Iterable[str]] = None,
+                   window: int = RISK_MODEL_PARAMS['window'],
+                   store: PriceStore = price_store) -> Optional[RiskModel]:
+    """
+    Return the risk model for a universe and window, updating it incrementally
+
+    Models are cached in memory and on disk under a key built from the
+    universe and window. When the price store has bars newer than a cached
+    model, only those bars are loaded and rolled into the model.
+
+    Args:
+        tickers (list): Universe tickers. Defaults to every ticker in the store.
+        window (int): Number of daily returns in the estimation window
+        store (PriceStore): Source of daily bars
+
+    Returns:
+        RiskModel, or None if there is not enough price history
+    """
+    universe = sorted({t.upper() for t in (tickers if tickers is not None else store.tickers())})
+    if not universe:
+        return None
+
+    key = _cache_key(universe, window)
+    path = os.path.join(RISK_MODEL_DIR, f"{key}.npz")
+    with _model_lock:
+        model = _model_cache.pop(key, None)
+        if model is None and os.path.exists(path):
+            model = RiskModel.load(path)
+
+        if model is None:
+            closes = store.load_panel(universe, lookback=window + 1)['close']
+            if len(closes) < 3:
+                return None
+            model = fit_risk_model(closes, window)
+            model.save(path)
+        else:
+            new_closes = store.load_panel(model.tickers, since=model.last_date)['close']
+            if not new_closes.empty:
+                model = model.roll(new_closes)
+                model.save(path)
+
+        _model_cache[key] = model
+        while len(_model_cache) > RISK_MODEL_PARAMS['memory_cache_size']:
+            _model_cache.popitem(last=False)
+    return model
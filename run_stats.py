@@ -0,0 +1,67 @@
+import contextvars
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+class RunStats:
+    """
+    Counters and records of one analysis run
+
+    Components keep process-wide totals (response cache hits, prompt cache
+    usage, compaction, ...), which mix concurrent runs in a server or farm
+    worker. Each counting site also adds to the RunStats of the run it works
+    for, found through a context variable like the cancellation token, so a
+    run's summary only reports its own activity.
+    """
+
+    def __init__(self):
+        self._counts: Dict[str, Dict[str, float]] = {}
+        self._records: Dict[str, List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, group: str, counts: Dict[str, float]):
+        with self._lock:
+            totals = self._counts.setdefault(group, {})
+            for key, value in counts.items():
+                totals[key] = totals.get(key, 0) + value
+
+    def append(self, group: str, item: Any):
+        with self._lock:
+            self._records.setdefault(group, []).append(item)
+
+    def counts(self, group: str) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._counts.get(group, {}))
+
+    def records(self, group: str) -> List[Any]:
+        with self._lock:
+            return list(self._records.get(group, []))
+
+# Stats of the analysis the current thread is working on. Event bus handlers
+# and threads started through submit_in_context run in a copy of the context.
+_current: contextvars.ContextVar = contextvars.ContextVar('run_stats', default=None)
+
+def current_run_stats() -> Optional[RunStats]:
+    return _current.get()
+
+def count_for_run(group: str, **counts: float):
+    """Add counts to the current run's stats; a no-op outside a run"""
+    stats = _current.get()
+    if stats is not None:
+        stats.add(group, counts)
+
+def record_for_run(group: str, item: Any):
+    """Append an item (e.g. a delegation edge) to the current run's stats"""
+    stats = _current.get()
+    if stats is not None:
+        stats.append(group, item)
+
+@contextmanager
+def run_stats_scope(stats: Optional[RunStats] = None):
+    """Collect the stats of everything run in this context"""
+    stats = stats or RunStats()
+    reset = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(reset)
@@ -0,0 +1,108 @@
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+# Structured outputs of the final-stage tasks. Each renders itself as the
+# markdown report text, so stage outputs stay readable while the UI reads
+# the typed fields directly.
+
+def _money(value: Optional[float]) -> str:
+    return f"${value:,.2f}" if value is not None else "n/a"
+
+def _pct(value: Optional[float]) -> str:
+    return f"{value:.1f}%" if value is not None else "n/a"
+
+class StockPick(BaseModel):
+    ticker: str = Field(..., description="Ticker symbol, e.g. 'AAPL'")
+    company: str = Field("", description="Company name")
+    allocation_pct: float = Field(..., description="Share of the capital allocated to this stock, 0-100")
+    entry_price_low: Optional[float] = Field(None, description="Lower end of the suggested entry price range")
+    entry_price_high: Optional[float] = Field(None, description="Upper end of the suggested entry price range")
+    target_price: Optional[float] = Field(None, description="Price target for the holding period")
+    expected_return_pct: Optional[float] = Field(None, description="Projected return over the holding period, in percent")
+    rationale: str = Field(..., description="Why this stock fits the investor's time horizon and risk profile")
+    key_risks: List[str] = Field(default_factory=list, description="Risks specific to this pick")
+
+class StockSelection(BaseModel):
+    picks: List[StockPick] = Field(..., description="The 3-5 recommended stocks; allocations sum to 100")
+    expected_return_pct: Optional[float] = Field(None, description="Projected portfolio return over the time horizon, in percent")
+    expected_volatility_pct: Optional[float] = Field(None, description="Projected annualized portfolio volatility, in percent")
+    entry_strategy: str = Field("", description="Entry timing and price considerations")
+    holding_timeline: str = Field("", description="Holding timeline with milestone evaluation points")
+    summary: str = Field("", description="Short overview of the portfolio")
+
+    def to_markdown(self) -> str:
+        lines = ["## Portfolio Recommendation", "", self.summary, "",
+                 "| Ticker | Company | Allocation | Entry range | Target | Expected return |",
+                 "|---|---|---|---|---|---|"]
+        for p in self.picks:
+            lines.append(f"| {p.ticker} | {p.company} | {_pct(p.allocation_pct)} | "
+                         f"{_money(p.entry_price_low)} - {_money(p.entry_price_high)} | "
+                         f"{_money(p.target_price)} | {_pct(p.expected_return_pct)} |")
+        lines += ["", f"Expected portfolio return: {_pct(self.expected_return_pct)}, "
+                      f"volatility: {_pct(self.expected_volatility_pct)}"]
+        for p in self.picks:
+            lines += ["", f"### {p.ticker}", p.rationale]
+            lines += [f"- Risk: {risk}" for risk in p.key_risks]
+        if self.entry_strategy:
+            lines += ["", "### Entry Strategy", self.entry_strategy]
+        if self.holding_timeline:
+            lines += ["", "### Holding Timeline", self.holding_timeline]
+        return "\n".join(lines)
+
+class TradeOrder(BaseModel):
+    ticker: str = Field(..., description="Ticker symbol")
+    action: str = Field(..., description="BUY, SELL or HOLD")
+    order_type: str = Field("limit", description="Order type, e.g. market, limit, stop-limit")
+    entry_price: Optional[float] = Field(None, description="Entry (limit) price")
+    stop_loss: Optional[float] = Field(None, description="Stop-loss price")
+    target_price: Optional[float] = Field(None, description="Take-profit price")
+    quantity: Optional[int] = Field(None, description="Number of shares")
+    schedule: str = Field("", description="Execution schedule chosen with the Execution Cost Simulator")
+    estimated_cost_bps: Optional[float] = Field(None, description="Estimated slippage plus market impact, in basis points")
+
+class ExecutionPlan(BaseModel):
+    orders: List[TradeOrder] = Field(..., description="One order per ticker to trade")
+    timing: str = Field("", description="When to execute given current market conditions")
+    summary: str = Field("", description="Short overview of the plan")
+
+    def to_markdown(self) -> str:
+        lines = ["## Execution Plan", "", self.summary, "",
+                 "| Ticker | Action | Type | Quantity | Entry | Stop | Target | Schedule | Est. cost (bps) |",
+                 "|---|---|---|---|---|---|---|---|---|"]
+        for o in self.orders:
+            cost = f"{o.estimated_cost_bps:.1f}" if o.estimated_cost_bps is not None else "n/a"
+            lines.append(f"| {o.ticker} | {o.action} | {o.order_type} | {o.quantity if o.quantity is not None else 'n/a'} | "
+                         f"{_money(o.entry_price)} | {_money(o.stop_loss)} | {_money(o.target_price)} | "
+                         f"{o.schedule} | {cost} |")
+        if self.timing:
+            lines += ["", "### Timing", self.timing]
+        return "\n".join(lines)
+
+class RiskFactor(BaseModel):
+    name: str = Field(..., description="Short name of the risk")
+    severity: int = Field(..., ge=1, le=10, description="Severity from 1 (minor) to 10 (severe)")
+    description: str = Field("", description="How the risk could affect the position or portfolio")
+    mitigation: str = Field("", description="Suggested mitigation")
+
+class RiskAssessment(BaseModel):
+    overall_risk_score: float = Field(..., ge=1, le=10, description="Overall risk from 1 (low) to 10 (high)")
+    risk_level: str = Field(..., description="Low, Medium or High")
+    recommendation: str = Field("", description="Overall recommendation, e.g. BUY, HOLD, SELL or PROCEED WITH CAUTION")
+    expected_volatility_pct: Optional[float] = Field(None, description="Annualized volatility from the Portfolio Risk Model, in percent")
+    max_drawdown_pct: Optional[float] = Field(None, description="Plausible maximum drawdown, in percent")
+    factors: List[RiskFactor] = Field(default_factory=list, description="Main risks with severity and mitigation")
+    summary: str = Field("", description="Short overview of the risk analysis")
+
+    def to_markdown(self) -> str:
+        lines = ["## Risk Assessment", "", self.summary, "",
+                 f"Overall risk: {self.risk_level} ({self.overall_risk_score:.1f}/10)",
+                 f"Expected volatility: {_pct(self.expected_volatility_pct)}, "
+                 f"maximum drawdown: {_pct(self.max_drawdown_pct)}"]
+        if self.recommendation:
+            lines.append(f"Recommendation: {self.recommendation}")
+        for factor in self.factors:
+            lines += ["", f"### {factor.name} (severity {factor.severity}/10)", factor.description]
+            if factor.mitigation:
+                lines.append(f"- Mitigation: {factor.mitigation}")
+        return "\n".join(lines)
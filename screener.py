@@ -0,0 +1,104 @@
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from config import (
+    SCREENER_THRESHOLDS,
+    SCREENER_MIN_LIQUIDITY_MULTIPLE,
+    SCREENER_MIN_PRICE,
+    SCREENER_SHORTLIST_SIZE
+)
+from market_data import load_universe
+
+# Text handed to the agents when no local universe is available
+NO_SHORTLIST_TEXT = "No local screen available. Identify candidates through your own research."
+
+def parse_sector_list(value: Any) -> List[str]:
+    """Turn a comma separated sector string (or list) into normalized sector keys"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(',')
+    return [str(s).strip().lower() for s in value if str(s).strip()]
+
+def parse_capital(value: Any) -> float:
+    """Parse a capital amount such as '100000' or '$250,000'"""
+    try:
+        return float(str(value).replace('$', '').replace(',', '').strip())
+    except ValueError:
+        raise ValueError(f"Invalid initial capital: {value}")
+
+def screen_universe(inputs: Dict[str, Any],
+                    universe: Optional[pd.DataFrame] = None,
+                    thresholds: Optional[Dict[str, float]] = None,
+                    limit: int = SCREENER_SHORTLIST_SIZE) -> pd.DataFrame:
+    """
+    Filter the local universe down to a ranked candidate shortlist
+
+    All filters are evaluated as boolean masks over whole columns, so a
+    universe of thousands of tickers is screened in a single pass.
+
+    Args:
+        inputs (dict): Analysis inputs (sector_preferences, exclude_sectors,
+            initial_capital, risk_tolerance)
+        universe (DataFrame): Universe table. Defaults to load_universe().
+        thresholds (dict): Overrides for max_pe, min_momentum and max_volatility
+        limit (int): Maximum number of candidates to return
+
+    Returns:
+        DataFrame of candidates ordered by descending screen score
+    """
+    if universe is None:
+        universe = load_universe()
+    if universe is None or universe.empty:
+        return pd.DataFrame()
+
+    risk = inputs.get('risk_tolerance', 'Medium')
+    limits = dict(SCREENER_THRESHOLDS.get(risk, SCREENER_THRESHOLDS['Medium']))
+    limits.update(thresholds or {})
+
+    preferred = parse_sector_list(inputs.get('sector_preferences'))
+    excluded = parse_sector_list(inputs.get('exclude_sectors'))
+    capital = parse_capital(inputs.get('initial_capital', 0))
+
+    sectors = universe['sector_key']
+    mask = pd.Series(True, index=universe.index)
+    if preferred:
+        mask &= sectors.isin(preferred)
+    if excluded:
+        mask &= ~sectors.isin(excluded)
+
+    # Liquidity: the position must be small relative to daily traded value
+    mask &= universe['avg_dollar_volume'] >= capital * SCREENER_MIN_LIQUIDITY_MULTIPLE
+    mask &= universe['price'] >= SCREENER_MIN_PRICE
+
+    # Valuation and momentum thresholds scale with risk tolerance
+    mask &= universe['pe_ratio'].between(0, limits['max_pe'], inclusive='neither')
+    mask &= universe['momentum_3m'] >= limits['min_momentum']
+    mask &= universe['volatility'] <= limits['max_volatility']
+
+    candidates = universe.loc[mask.fillna(False)].copy()
+    if candidates.empty:
+        return candidates
+
+    # Blend momentum and earnings yield ranks into a single score
+    earnings_yield = 1.0 / candidates['pe_ratio']
+    candidates['score'] = (
+        candidates['momentum_3m'].rank(pct=True) +
+        earnings_yield.rank(pct=True)
+    ) / 2
+
+    return candidates.nlargest(limit, 'score')
+
+def format_shortlist(candidates: pd.DataFrame) -> str:
+    """Render a shortlist as compact text for the agents' prompts"""
+    if candidates is None or candidates.empty:
+        return NO_SHORTLIST_TEXT
+
+    lines = ["Ticker | Sector | Price | P/E | 3M Momentum | Volatility"]
+    for row in candidates.itertuples(index=False):
+        lines.append(
+            f"{row.ticker} | {row.sector} | {row.price:.2f} | {row.pe_ratio:.1f} | "
+            f"{row.momentum_3m:+.1%} | {row.volatility:.1%}"
+        )
+    return "\n".join(lines)
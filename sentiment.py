@@ -0,0 +1,124 @@
+from typing import Iterable, List
+
+import numpy as np
+import pandas as pd
+
+from news import NewsStore, news_store, normalize_topic
+
+# Compact finance lexicon in the spirit of Loughran-McDonald
+POSITIVE_WORDS = {
+    'beat', 'beats', 'surge', 'surges', 'surged', 'soar', 'soars', 'soared', 'jump', 'jumps', 'jumped',
+    'rally', 'rallies', 'rallied', 'gain', 'gains', 'gained', 'rise', 'rises', 'rose', 'record', 'strong',
+    'stronger', 'growth', 'grow', 'grows', 'profit', 'profitable', 'upgrade', 'upgraded', 'upgrades',
+    'outperform', 'outperforms', 'bullish', 'optimistic', 'boost', 'boosts', 'boosted', 'exceed', 'exceeds',
+    'exceeded', 'expand', 'expands', 'expansion', 'approval', 'approved', 'win', 'wins', 'breakthrough',
+    'dividend', 'buyback', 'raise', 'raises', 'raised', 'improve', 'improves', 'improved', 'recovery',
+    'rebound', 'rebounds', 'momentum', 'robust', 'accelerate', 'accelerates', 'partnership'
+}
+NEGATIVE_WORDS = {
+    'miss', 'misses', 'missed', 'plunge', 'plunges', 'plunged', 'drop', 'drops', 'dropped', 'fall', 'falls',
+    'fell', 'slump', 'slumps', 'slumped', 'decline', 'declines', 'declined', 'loss', 'losses', 'weak',
+    'weaker', 'weakness', 'downgrade', 'downgraded', 'downgrades', 'underperform', 'bearish', 'pessimistic',
+    'cut', 'cuts', 'lawsuit', 'lawsuits', 'probe', 'investigation', 'fraud', 'recall', 'recalls', 'layoff',
+    'layoffs', 'bankruptcy', 'default', 'debt', 'warning', 'warns', 'warned', 'slowdown', 'slows', 'slowed',
+    'risk', 'risks', 'volatile', 'volatility', 'fine', 'fined', 'penalty', 'delay', 'delays', 'delayed',
+    'halt', 'halted', 'crash', 'crashes', 'selloff', 'sell-off', 'concern', 'concerns', 'uncertainty',
+    'shortfall', 'lower', 'lowered', 'tariff', 'tariffs', 'recession', 'inflation', 'sinks', 'sank', 'tumble',
+    'tumbles', 'tumbled'
+}
+# Contractions such as "didn't" or "won't" also negate (matched on their n't suffix)
+NEGATORS = {'not', 'no', 'never', 'without', 'fails', 'failed'}
+
+_LEXICON = pd.Series({**{w: 1.0 for w in POSITIVE_WORDS}, **{w: -1.0 for w in NEGATIVE_WORDS}})
+
+def score_texts(texts: Iterable[str]) -> np.ndarray:
+    """
+    Score a batch of headlines/snippets in [-1, 1]
+
+    Texts are tokenized together into one long token series, so scoring
+    thousands of headlines is a handful of vectorized pandas operations.
+    A lexicon hit directly after a negator has its polarity flipped.
+    """
+    texts = pd.Series(list(texts), dtype=object).fillna('')
+    if texts.empty:
+        return np.array([])
+
+    # Contractions stay whole tokens ("didn't"), with typographic apostrophes normalized
+    tokens = (texts.str.lower().str.replace("\u2019", "'", regex=False)
+              .str.findall(r"[a-z]+n't|[a-z]+(?:-[a-z]+)?").explode().dropna())
+    if tokens.empty:
+        return np.zeros(len(texts))
+
+    doc = tokens.index.to_numpy()
+    values = tokens.map(_LEXICON).fillna(0.0).to_numpy()
+    negated = (tokens.isin(NEGATORS) | tokens.str.endswith("n't")).to_numpy()
+    follows_negator = np.concatenate([[False], negated[:-1] & (doc[1:] == doc[:-1])])
+    values = np.where(follows_negator, -values, values)
+
+    frame = pd.DataFrame({'doc': doc, 'value': values, 'hit': values != 0})
+    totals = frame.groupby('doc').agg(score=('value', 'sum'), hits=('hit', 'sum'))
+    totals = totals.reindex(range(len(texts)), fill_value=0)
+    # Normalize by the number of opinion words, damped so one word is not +/-1
+    return (totals['score'] / (totals['hits'] + 1.0)).to_numpy()
+
+def score_unscored(store: NewsStore = news_store, batch_size: int = 5000) -> int:
+    """Score every stored article without a sentiment value, returning how many were scored"""
+    scored = 0
+    with store.session() as conn:
+        while True:
+            rows = conn.execute(
+                "SELECT id, title, snippet FROM articles WHERE sentiment IS NULL LIMIT ?", (batch_size,)
+            ).fetchall()
+            if not rows:
+                break
+            scores = score_texts(f"{r['title']}. {r['snippet']}" for r in rows)
+            conn.executemany("UPDATE articles SET sentiment = ? WHERE id = ?",
+                             [(float(s), r['id']) for s, r in zip(scores, rows)])
+            scored += len(rows)
+    return scored
+
+def daily_sentiment(topics: Iterable[str], days: int = 14,
+                    store: NewsStore = news_store) -> pd.DataFrame:
+    """
+    Per-topic, per-day sentiment series from the stored articles
+
+    Returns:
+        DataFrame with topic, date, articles, mean_sentiment, positive and negative counts
+    """
+    score_unscored(store)
+    topics = [normalize_topic(t) for t in topics]
+    if not topics:
+        return pd.DataFrame()
+
+    since = (pd.Timestamp.now() - pd.Timedelta(days=days)).isoformat()
+    placeholders = ",".join("?" for _ in topics)
+    with store.session() as conn:
+        rows = conn.execute(
+            f"SELECT t.topic, a.published_at, a.sentiment FROM article_topics t "
+            f"JOIN articles a ON a.id = t.article_id "
+            f"WHERE t.topic IN ({placeholders}) AND t.published_at >= ?",
+            (*topics, since)
+        ).fetchall()
+    if not rows:
+        return pd.DataFrame()
+
+    frame = pd.DataFrame([dict(r) for r in rows])
+    frame['date'] = pd.to_datetime(frame['published_at']).dt.date
+    return frame.groupby(['topic', 'date']).agg(
+        articles=('sentiment', 'size'),
+        mean_sentiment=('sentiment', 'mean'),
+        positive=('sentiment', lambda s: int((s > 0.1).sum())),
+        negative=('sentiment', lambda s: int((s < -0.1).sum()))
+    ).reset_index()
+
+def summarize_sentiment(series: pd.DataFrame) -> List[str]:
+    """Compact text lines describing a daily sentiment series"""
+    lines = []
+    for name, group in series.groupby('topic'):
+        overall = (group['mean_sentiment'] * group['articles']).sum() / group['articles'].sum()
+        lines.append(f"{name.upper()}: {int(group['articles'].sum())} articles, "
+                     f"average sentiment {overall:+.2f}")
+        for row in group.sort_values('date').itertuples(index=False):
+            lines.append(f"  {row.date}: {row.mean_sentiment:+.2f} "
+                         f"({row.articles} articles, {row.positive} positive, {row.negative} negative)")
+    return lines
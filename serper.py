@@ -0,0 +1,47 @@
+import os
+from typing import Any, Callable, Dict, Optional
+
+import requests
+
+from cancellation import call_cancellable
+
+# Serper API endpoints
+SERPER_BASE_URL = "https://google.serper.dev"
+
+# Replaces the API when set, e.g. by stub mode (see set_serper_backend)
+_backend: Optional[Callable[..., Dict[str, Any]]] = None
+
+def set_serper_backend(backend: Optional[Callable[..., Dict[str, Any]]] = None):
+    """Answer serper_request calls with backend(query, search_type, num, tbs, timeout, **params); None restores the API"""
+    global _backend
+    _backend = backend
+
+def serper_request(query: str, search_type: str = 'search', num: int = 10,
+                   tbs: Optional[str] = None, timeout: float = 10, **params: Any) -> Dict[str, Any]:
+    """
+    Run a Serper search and return the raw JSON response
+
+    Args:
+        query (str): Search query
+        search_type (str): 'search' or 'news'
+        num (int): Number of results to request
+        tbs (str): Time filter such as 'qdr:d' (past day) or 'qdr:w' (past week)
+        timeout (float): Request timeout in seconds
+        params: Further API parameters such as gl (country) or hl (language)
+
+    The request is skipped, or abandoned while in flight, if the current
+    analysis is cancelled.
+    """
+    if _backend is not None:
+        return _backend(query, search_type, num, tbs, timeout, **params)
+    payload = {"q": query, "num": num, **params}
+    if tbs:
+        payload["tbs"] = tbs
+    headers = {
+        "X-API-KEY": os.environ["SERPER_API_KEY"],
+        "Content-Type": "application/json"
+    }
+    response = call_cancellable(requests.post, f"{SERPER_BASE_URL}/{search_type}", json=payload,
+                                headers=headers, timeout=timeout)
+    response.raise_for_status()
+    return response.json()
@@ -0,0 +1,87 @@
+import datetime
+import glob
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Dict, Optional
+
+from config import SNAPSHOT_DIR
+from news import news_enabled
+from screener import parse_sector_list
+
+def sector_set(inputs: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalized description of the sector preferences a snapshot covers"""
+    return {
+        'preferred': sorted(set(parse_sector_list(inputs.get('sector_preferences')))),
+        'excluded': sorted(set(parse_sector_list(inputs.get('exclude_sectors')))),
+        'news': news_enabled(inputs)
+    }
+
+def sector_set_key(inputs: Dict[str, Any]) -> str:
+    """Short key shared by every profile with the same sector preferences"""
+    return hashlib.sha1(json.dumps(sector_set(inputs), sort_keys=True).encode()).hexdigest()[:16]
+
+class SnapshotStore:
+    """
+    Versioned daily market-research snapshots, one directory per day
+
+    Each warm-up writes a new version ({key}.v{n}.json) rather than
+    overwriting, concurrent warm-ups included, and readers take the highest
+    version for the day.
+    """
+
+    def __init__(self, root: str = SNAPSHOT_DIR):
+        self.root = root
+
+    def _day_dir(self, day: datetime.date) -> str:
+        return os.path.join(self.root, day.isoformat())
+
+    def _versions(self, key: str, day: datetime.date):
+        paths = glob.glob(os.path.join(self._day_dir(day), f"{key}.v*.json"))
+        return sorted((int(p.rsplit('.v', 1)[1][:-5]), p) for p in paths)
+
+    def latest(self, inputs: Dict[str, Any], day: Optional[datetime.date] = None) -> Optional[Dict[str, Any]]:
+        """Newest snapshot for the inputs' sector set on a day (today by default)"""
+        versions = self._versions(sector_set_key(inputs), day or datetime.date.today())
+        if not versions:
+            return None
+        with open(versions[-1][1]) as f:
+            return json.load(f)
+
+    def save(self, inputs: Dict[str, Any], briefing: str, model_name: str = '',
+             day: Optional[datetime.date] = None) -> Dict[str, Any]:
+        """Store a new version of the day's snapshot for the inputs' sector set"""
+        day = day or datetime.date.today()
+        key = sector_set_key(inputs)
+        versions = self._versions(key, day)
+        version = versions[-1][0] + 1 if versions else 1
+        snapshot = {
+            'key': key,
+            'date': day.isoformat(),
+            'version': version,
+            'sectors': sector_set(inputs),
+            'model': model_name,
+            'created_at': datetime.datetime.now().isoformat(),
+            'briefing': briefing
+        }
+        os.makedirs(self._day_dir(day), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self._day_dir(day), prefix=f"{key}.", suffix='.tmp')
+        os.close(fd)
+        try:
+            while True:
+                # Write the complete file first, so a concurrent reader never sees a partial one
+                with open(tmp, 'w') as f:
+                    json.dump(snapshot, f)
+                # Linking fails if a concurrent save already took this version
+                try:
+                    os.link(tmp, os.path.join(self._day_dir(day), f"{key}.v{version}.json"))
+                    return snapshot
+                except FileExistsError:
+                    version += 1
+                    snapshot['version'] = version
+        finally:
+            os.remove(tmp)
+
+# Shared snapshot store instance
+snapshot_store = SnapshotStore()
@@ -0,0 +1,218 @@
+import datetime
+import hashlib
+import json
+import os
+import re
+import threading
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, List, Optional
+
+from config import STAGE_CACHE_DIR, STAGE_CACHE_PARAMS
+
+_PLACEHOLDER_RE = re.compile(r"\{(\w+)\}")
+
+# Placeholder through which downstream tasks receive the earlier stage outputs
+PRIOR_FINDINGS_VAR = 'prior_stage_findings'
+
+def template_variables(task) -> List[str]:
+    """Input variables referenced by a task's description and expected output templates"""
+    templates = task_templates(task)
+    return sorted(set(_PLACEHOLDER_RE.findall(templates[0] + templates[1])))
+
+def task_templates(task):
+    """Uninterpolated description and expected output (crewai keeps them once a task has run)"""
+    description = getattr(task, '_original_description', None) or task.description
+    expected = getattr(task, '_original_expected_output', None) or task.expected_output
+    return description, expected
+
+def stage_key(task, inputs: Dict[str, Any], model_name: str = '') -> str:
+    """
+    Cache key for a task's output
+
+    Built only from the task's own templates and agent, the model and the
+    values of the variables its templates use. Upstream outputs enter
+    through the prior_stage_findings variable, so a change upstream
+    invalidates every stage that reads it.
+    """
+    description, expected = task_templates(task)
+    payload = {
+        'agent': getattr(task.agent, 'role', ''),
+        'description': description,
+        'expected_output': expected,
+        'model': model_name,
+        'schema': getattr(getattr(task, 'output_pydantic', None), '__name__', ''),
+        'inputs': {name: str(inputs.get(name, '')) for name in template_variables(task)}
+    }
+    return hashlib.sha1(json.dumps(payload, sort_keys=True).encode()).hexdigest()[:20]
+
+def format_prior_findings(outputs: List['StageOutput'],
+                          compact: Optional[Callable[[str], str]] = None) -> str:
+    """
+    Text handed to a stage describing what earlier stages concluded
+
+    With compact, each output is replaced by its digest so prompts stay
+    bounded however verbose the earlier stages were.
+    """
+    if not outputs:
+        return "No earlier stages."
+    return "\n\n".join(f"### {o.name}\n{compact(o.raw) if compact else o.raw}" for o in outputs)
+
+class StageOutput:
+    """
+    Output of one stage, freshly computed or reused from the cache
+
+    data holds the task's structured output (a dict) when the task declares
+    an output schema, and task the name of the task that produced it.
+    """
+
+    def __init__(self, name: str, raw: str, key: str, cached: bool,
+                 data: Optional[Dict[str, Any]] = None, task: str = ''):
+        self.name = name
+        self.raw = raw
+        self.key = key
+        self.cached = cached
+        self.data = data
+        self.task = task
+
+    def __str__(self):
+        return self.raw
+
+class StagedResult:
+    """Result of a staged run; raw is the final stage's output, as with a crew result"""
+
+    def __init__(self, stages: List[StageOutput]):
+        self.tasks_output = stages
+        self.raw = stages[-1].raw if stages else ''
+
+    @property
+    def reused(self) -> int:
+        return sum(1 for s in self.tasks_output if s.cached)
+
+    def structured(self, task_name: str, schema=None):
+        """
+        Structured output of the named task, or None when it did not run or
+        produced none; with a Pydantic schema the data is validated into it
+        """
+        for stage in reversed(self.tasks_output):
+            if stage.task == task_name and stage.data is not None:
+                return schema.model_validate(stage.data) if schema else stage.data
+        return None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable form: the final report and every stage's output"""
+        return {
+            'raw': self.raw,
+            'stages': [{'name': s.name, 'task': s.task, 'cached': s.cached, 'raw': s.raw, 'data': s.data}
+                       for s in self.tasks_output]
+        }
+
+    def __str__(self):
+        return self.raw
+
+class StageCache:
+    """Directory of stage outputs stored as one JSON file per key"""
+
+    def __init__(self, root: str = STAGE_CACHE_DIR):
+        self.root = root
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    def key_lock(self, key: str) -> threading.Lock:
+        """
+        Lock held while a stage is computed, so concurrent runs needing the
+        same stage (e.g. sweep branches) wait for one computation and reuse it
+        """
+        with self._guard:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.json")
+
+    def get(self, key: str, max_age_hours: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Cached entry (raw text and structured data) for a key, if present and fresh enough"""
+        try:
+            with open(self._path(key)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if max_age_hours is not None:
+            age = datetime.datetime.now() - datetime.datetime.fromisoformat(entry['created_at'])
+            if age > datetime.timedelta(hours=max_age_hours):
+                return None
+        return entry
+
+    def put(self, key: str, stage: str, raw: str, data: Optional[Dict[str, Any]] = None):
+        os.makedirs(self.root, exist_ok=True)
+        # Write then rename so a concurrent reader never sees a partial file
+        tmp_path = f"{self._path(key)}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'stage': stage, 'raw': raw, 'data': data,
+                       'created_at': datetime.datetime.now().isoformat()}, f)
+        os.replace(tmp_path, self._path(key))
+
+def stage_payload(result: Any):
+    """
+    Raw text and structured data of a stage result
+
+    A result with a Pydantic output (e.g. a crew output of a task with
+    output_pydantic) is rendered with the model's to_markdown when it has
+    one, so the text passed on and reported stays readable.
+    """
+    if isinstance(result, str):
+        return result, None
+    model = getattr(result, 'pydantic', None)
+    if model is None:
+        return str(getattr(result, 'raw', result)), None
+    raw = model.to_markdown() if hasattr(model, 'to_markdown') else result.raw
+    return raw, model.model_dump()
+
+# Shared stage cache instance
+stage_cache = StageCache()
+
+def run_stages(tasks: List[Any], inputs: Dict[str, Any],
+               run_stage: Callable[[Any, Dict[str, Any]], str],
+               cache: Optional[StageCache] = stage_cache,
+               model_for: Optional[Callable[[Any], str]] = None,
+               on_stage: Optional[Callable[[StageOutput], None]] = None,
+               prior: Optional[List[StageOutput]] = None,
+               compact: Optional[Callable[[str], str]] = None) -> StagedResult:
+    """
+    Run tasks one stage at a time, reusing cached stage outputs
+
+    Args:
+        tasks (list): Tasks in execution order
+        inputs (dict): Template inputs shared by all stages
+        run_stage (Callable): Runs one task with its inputs and returns the raw
+            output or a result with raw and pydantic (see stage_payload)
+        cache (StageCache): Where outputs are kept, or None to always recompute
+        model_for (Callable): Model a task runs on, part of its key
+        on_stage (Callable): Called with each StageOutput as it becomes available
+        prior (list): Outputs produced elsewhere (e.g. a shared snapshot) that
+            stand in for stages before the first task
+        compact (Callable): Digests each earlier output before it is passed on;
+            stage outputs themselves are kept in full
+
+    Returns:
+        StagedResult with the prior outputs followed by one StageOutput per task
+    """
+    outputs: List[StageOutput] = list(prior or [])
+    for task in tasks:
+        stage_inputs = {**inputs, PRIOR_FINDINGS_VAR: format_prior_findings(outputs, compact)}
+        key = stage_key(task, stage_inputs, model_for(task) if model_for else '')
+        name = getattr(task.agent, 'role', 'Stage')
+
+        with cache.key_lock(key) if cache else nullcontext():
+            entry = cache.get(key, STAGE_CACHE_PARAMS['ttl_hours']) if cache else None
+            cached = entry is not None
+            if cached:
+                raw, data = entry['raw'], entry.get('data')
+            else:
+                raw, data = stage_payload(run_stage(task, stage_inputs))
+                if cache:
+                    cache.put(key, name, raw, data)
+
+        output = StageOutput(name, raw, key, cached, data, getattr(task, 'name', None) or '')
+        outputs.append(output)
+        if on_stage:
+            on_stage(output)
+    return StagedResult(outputs)
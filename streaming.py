@@ -0,0 +1,135 @@
+import contextvars
+import sys
+import threading
+from typing import Any, Callable, Dict, List, Optional, TextIO
+
+# Run whose LLM output is produced in the current context. Event bus handlers
+# run in a copy of the emitting context, so chunks are tagged with it
+_stream_run: contextvars.ContextVar = contextvars.ContextVar('stream_run', default=None)
+
+def run_streamed(run_id: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Call fn with the chunks it streams tagged with run_id, e.g. in a worker thread"""
+    token = _stream_run.set(run_id)
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        _stream_run.reset(token)
+
+class TokenStream:
+    """Fans LLM output chunks out to callbacks as they arrive"""
+
+    def __init__(self):
+        self._callbacks: List[Callable[[Dict[str, Any]], None]] = []
+        self._lock = threading.Lock()
+
+    def register_callback(self, callback: Callable[[Dict[str, Any]], None]):
+        with self._lock:
+            if callback not in self._callbacks:
+                self._callbacks.append(callback)
+
+    def unregister_callback(self, callback: Callable[[Dict[str, Any]], None]):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def emit(self, chunk: Dict[str, Any]):
+        with self._lock:
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            try:
+                callback(chunk)
+            except Exception as e:
+                print(f"Warning: stream callback failed: {str(e)}")
+
+# Shared token stream instance
+token_stream = TokenStream()
+
+_listeners_registered = False
+
+def register_stream_listeners(stream: TokenStream = token_stream) -> bool:
+    """
+    Forward every streamed LLM chunk from the crewai event bus to the stream
+
+    Returns False when the installed crewai has no event bus.
+    """
+    global _listeners_registered
+    if _listeners_registered:
+        return True
+    try:
+        from crewai.events import crewai_event_bus, LLMStreamChunkEvent
+    except ImportError:
+        try:
+            from crewai.utilities.events import crewai_event_bus, LLMStreamChunkEvent
+        except ImportError:
+            return False
+
+    @crewai_event_bus.on(LLMStreamChunkEvent)
+    def on_chunk(source, event):
+        # Chunks that only carry a tool call have no text to show
+        if event.chunk:
+            stream.emit({
+                'call_id': getattr(event, 'call_id', None) or id(source),
+                'run_id': _stream_run.get(),
+                'model': getattr(event, 'model', None) or '',
+                'agent_role': getattr(event, 'agent_role', None) or '',
+                'task_name': getattr(event, 'task_name', None) or '',
+                'chunk': event.chunk
+            })
+
+    _listeners_registered = True
+    return True
+
+def _heading(chunk: Dict[str, Any]) -> str:
+    label = chunk['agent_role'] or chunk['model'] or "LLM"
+    return f"{label} ({chunk['task_name']})" if chunk['task_name'] else label
+
+class StreamPrinter:
+    """Callback that writes chunks to a terminal, with a heading whenever a new call starts"""
+
+    def __init__(self, out: TextIO = sys.stdout):
+        self.out = out
+        self._call_id = None
+        self._lock = threading.Lock()
+
+    def __call__(self, chunk: Dict[str, Any]):
+        with self._lock:
+            if chunk['call_id'] != self._call_id:
+                self._call_id = chunk['call_id']
+                self.out.write(f"\n\n--- {_heading(chunk)} ---\n")
+            self.out.write(chunk['chunk'])
+            self.out.flush()
+
+class StreamBuffer:
+    """
+    Callback that keeps the text of the call currently streaming
+
+    For interfaces that redraw periodically from another thread: snapshot()
+    returns the latest call's heading and text so far, plus a version that
+    changes whenever new text arrives. With a run_id it only keeps chunks
+    of that run (see run_streamed), as the stream is shared by the process.
+    """
+
+    def __init__(self, max_chars: int = 20000, run_id: Optional[str] = None):
+        self.max_chars = max_chars
+        self.run_id = run_id
+        self._call_id = None
+        self._heading = ''
+        self._parts: List[str] = []
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, chunk: Dict[str, Any]):
+        if self.run_id is not None and chunk.get('run_id') != self.run_id:
+            return
+        with self._lock:
+            if chunk['call_id'] != self._call_id:
+                self._call_id = chunk['call_id']
+                self._heading = _heading(chunk)
+                self._parts = []
+            self._parts.append(chunk['chunk'])
+            self._version += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            text = "".join(self._parts)
+            return {'heading': self._heading, 'text': text[-self.max_chars:], 'version': self._version}
@@ -7,12 +7,23 @@ import plotly.graph_objects as go
 from PIL import Image
 import warnings
 import threading
+import uuid
 import queue
+from concurrent.futures import ThreadPoolExecutor
 warnings.filterwarnings('ignore')
 
 # Import from project modules
 from config import load_environment, DEFAULT_INPUTS
-from crew import run_financial_analysis, register_log_callback, get_agent_logs
+from crew import (
+    run_financial_analysis,
+    register_log_callback,
+    get_agent_logs,
+    register_stream_callback,
+    unregister_stream_callback
+)
+from streaming import StreamBuffer, run_streamed
+from cancellation import AnalysisCancelled, CancellationToken
+from schemas import ExecutionPlan, RiskAssessment, StockSelection
 
 # Initialize session state for logs if not exists
 if 'agent_logs' not in st.session_state:
@@ -948,6 +959,10 @@ with col2:
     
     run_button = st.button("🚀 Run Analysis", type="primary", use_container_width=True)
 
+# Tell the user when the previous run was stopped with the Cancel button
+if st.session_state.pop('analysis_cancelled', False):
+    st.warning("The previous analysis was cancelled.")
+
 # Prepare inputs for analysis
 if run_button:
     inputs = {
@@ -1043,9 +1058,51 @@ if run_button:
         st.markdown("<div class='sub-header'>Real-time Agent Activity</div>", unsafe_allow_html=True)
         live_log_container = st.empty()
         
+        # Live view of the LLM output being generated, so the report starts
+        # appearing at the first token instead of when the run finishes
+        st.markdown("<div class='sub-header'>Live Output</div>", unsafe_allow_html=True)
+        live_output_container = st.empty()
+        # The token stream is shared by every browser session; keep only this run's chunks
+        run_id = uuid.uuid4().hex
+        stream_buffer = StreamBuffer(run_id=run_id)
+        register_stream_callback(stream_buffer)
+        
+        # Clicking Cancel (or closing the tab) stops this script run, and the
+        # finally block below then cancels the analysis so it stops using API quota
+        st.button("⏹ Cancel Analysis", key="cancel_analysis")
+        elapsed_container = st.empty()
+        cancel_token = CancellationToken()
+        
         with st.spinner("Analyzing... (this may take several minutes)"):
-            # Run the actual analysis
-            result = run_financial_analysis(inputs)
+            # Run the analysis in a worker thread; placeholders are only
+            # redrawn from this script thread as streamed text arrives
+            executor = ThreadPoolExecutor(max_workers=1)
+            # cancel_token goes by keyword so handle_rate_limits can also stop its backoff
+            future = executor.submit(run_streamed, run_id, run_financial_analysis, inputs,
+                                     cancel_token=cancel_token)
+            try:
+                shown_version = 0
+                started = time.monotonic()
+                while not future.done():
+                    snapshot = stream_buffer.snapshot()
+                    if snapshot['version'] != shown_version:
+                        shown_version = snapshot['version']
+                        live_output_container.markdown(f"**{snapshot['heading']}**\n\n{snapshot['text']}")
+                    # Streamlit only stops a script run (Cancel click, closed tab)
+                    # at an st call, so touch one on every pass even while no
+                    # text streams, e.g. during tool calls or cached responses
+                    elapsed_container.caption(f"Elapsed: {int(time.monotonic() - started)}s")
+                    time.sleep(0.2)
+                result = future.result()
+            finally:
+                unregister_stream_callback(stream_buffer)
+                if not future.done():
+                    cancel_token.cancel("Analysis cancelled from the web interface")
+                    st.session_state.analysis_cancelled = True
+                # Do not wait for a cancelled run to reach its next checkpoint
+                executor.shutdown(wait=False)
+            live_output_container.empty()
+            elapsed_container.empty()
             
             # Show logs directly from get_agent_logs
             direct_logs = get_agent_logs()
@@ -1086,40 +1143,74 @@ if run_button:
         # Create tabs for different sections of the results
         result_tabs = st.tabs(["Summary", "Detailed Analysis", "Charts", "Raw Output"])
         
+        # Typed outputs of the final-stage tasks; None when a stage produced no structured data
+        selection = result.structured('stock_selection', StockSelection) if hasattr(result, 'structured') else None
+        execution = result.structured('execution_planning', ExecutionPlan) if hasattr(result, 'structured') else None
+        risk = result.structured('risk_assessment', RiskAssessment) if hasattr(result, 'structured') else None
+        
         with result_tabs[0]:
             st.markdown("<div class='card'>", unsafe_allow_html=True)
-            
-            # This is a placeholder - in a real implementation, you would parse the result
-            # from the AI and extract key information for a more structured display
             st.markdown("### Investment Recommendations Summary")
             
-            # Example visualization of recommendations
             if 'stock_selection' in inputs and inputs['stock_selection']:
                 st.markdown(f"**Single Stock Analysis for {inputs['stock_selection']}**")
                 
-                # Example metrics for single stock
+                order = execution.orders[0] if execution and execution.orders else None
+                upside = None
+                if order and order.entry_price and order.target_price:
+                    upside = (order.target_price / order.entry_price - 1) * 100
+                
                 col1, col2, col3 = st.columns(3)
                 with col1:
-                    st.metric("Risk Level", "Medium", help="Assessed risk level for this stock")
+                    st.metric("Risk Level", risk.risk_level if risk else "n/a",
+                              delta=f"{risk.overall_risk_score:.1f}/10" if risk else None, delta_color="off",
+                              help="Assessed risk level for this stock")
                 with col2:
-                    st.metric("Growth Potential", "+8.4%", help="Estimated growth potential")
+                    st.metric("Growth Potential", f"{upside:+.1f}%" if upside is not None else "n/a",
+                              help="Upside from the planned entry to the target price")
                 with col3:
-                    st.metric("Recommendation", "BUY", delta="Strong", help="Overall recommendation")
+                    st.metric("Recommendation", (risk.recommendation if risk and risk.recommendation
+                                                 else order.action if order else "n/a"),
+                              help="Overall recommendation")
+                
+                if execution and execution.orders:
+                    st.markdown("**Execution Plan**")
+                    st.dataframe(pd.DataFrame([o.model_dump() for o in execution.orders]), use_container_width=True)
             else:
                 st.markdown("**Portfolio Recommendations**")
                 
-                # Create example portfolio allocation chart
-                example_stocks = ["AAPL", "MSFT", "JNJ", "V", "AMZN"]
-                example_allocations = [30, 25, 20, 15, 10]
-                
-                fig = px.pie(
-                    values=example_allocations,
-                    names=example_stocks,
-                    title="Recommended Portfolio Allocation",
-                    color_discrete_sequence=px.colors.qualitative.Plotly
-                )
-                fig.update_traces(textposition='inside', textinfo='percent+label')
-                st.plotly_chart(fig, use_container_width=True)
+                if selection and selection.picks:
+                    fig = px.pie(
+                        values=[p.allocation_pct for p in selection.picks],
+                        names=[p.ticker for p in selection.picks],
+                        title="Recommended Portfolio Allocation",
+                        color_discrete_sequence=px.colors.qualitative.Plotly
+                    )
+                    fig.update_traces(textposition='inside', textinfo='percent+label')
+                    st.plotly_chart(fig, use_container_width=True)
+                    
+                    col1, col2, col3 = st.columns(3)
+                    with col1:
+                        st.metric("Expected Return", f"{selection.expected_return_pct:+.1f}%"
+                                  if selection.expected_return_pct is not None else "n/a")
+                    with col2:
+                        st.metric("Expected Volatility", f"{selection.expected_volatility_pct:.1f}%"
+                                  if selection.expected_volatility_pct is not None else "n/a")
+                    with col3:
+                        st.metric("Risk Level", risk.risk_level if risk else "n/a",
+                                  delta=f"{risk.overall_risk_score:.1f}/10" if risk else None, delta_color="off")
+                    
+                    st.dataframe(pd.DataFrame([{
+                        'Ticker': p.ticker,
+                        'Company': p.company,
+                        'Allocation %': p.allocation_pct,
+                        'Entry Low': p.entry_price_low,
+                        'Entry High': p.entry_price_high,
+                        'Target': p.target_price,
+                        'Expected Return %': p.expected_return_pct
+                    } for p in selection.picks]), use_container_width=True)
+                else:
+                    st.info("No structured recommendations were returned; see the Detailed Analysis tab.")
             
             st.markdown("</div>", unsafe_allow_html=True)
         
@@ -1136,39 +1227,41 @@ if run_button:
             st.markdown("<div class='card'>", unsafe_allow_html=True)
             st.markdown("### Performance Projections")
             
-            # Example chart for projected performance
-            time_periods = ["3 Months", "6 Months", "1 Year", "2 Years", "5 Years"]
+            if selection and selection.picks:
+                # Projected return per pick
+                picks = [p for p in selection.picks if p.expected_return_pct is not None]
+                if picks:
+                    fig = px.bar(
+                        x=[p.ticker for p in picks],
+                        y=[p.expected_return_pct for p in picks],
+                        title="Projected Return by Recommendation",
+                        labels={"x": "Ticker", "y": "Projected Return (%)"}
+                    )
+                    st.plotly_chart(fig, use_container_width=True)
             
-            if 'stock_selection' in inputs and inputs['stock_selection']:
-                # For single stock
-                projected_returns = [2.1, 5.4, 11.2, 18.7, 42.3]
-                
-                fig = px.line(
-                    x=time_periods, 
-                    y=projected_returns,
-                    markers=True,
-                    title=f"Projected Returns for {inputs['stock_selection']}",
-                    labels={"x": "Time Period", "y": "Projected Return (%)"}
-                )
-                st.plotly_chart(fig, use_container_width=True)
-            else:
-                # For portfolio
-                low_risk = [1.5, 3.2, 6.8, 14.1, 32.5]
-                medium_risk = [2.1, 5.4, 11.2, 24.7, 52.3]
-                high_risk = [3.2, 7.8, 15.6, 32.1, 68.2]
-                
+            if execution and execution.orders:
+                # Entry, stop and target levels per order
                 fig = go.Figure()
-                fig.add_trace(go.Scatter(x=time_periods, y=low_risk, mode='lines+markers', name='Low Risk'))
-                fig.add_trace(go.Scatter(x=time_periods, y=medium_risk, mode='lines+markers', name='Medium Risk (Selected)'))
-                fig.add_trace(go.Scatter(x=time_periods, y=high_risk, mode='lines+markers', name='High Risk'))
-                
-                fig.update_layout(
-                    title="Projected Portfolio Performance by Risk Level",
-                    xaxis_title="Time Period",
-                    yaxis_title="Projected Return (%)"
+                tickers = [o.ticker for o in execution.orders]
+                for label, field in [("Stop Loss", 'stop_loss'), ("Entry", 'entry_price'), ("Target", 'target_price')]:
+                    fig.add_trace(go.Scatter(x=tickers, y=[getattr(o, field) for o in execution.orders],
+                                             mode='markers', marker=dict(size=12), name=label))
+                fig.update_layout(title="Planned Price Levels", xaxis_title="Ticker", yaxis_title="Price ($)")
+                st.plotly_chart(fig, use_container_width=True)
+            
+            if risk and risk.factors:
+                fig = px.bar(
+                    x=[f.severity for f in risk.factors],
+                    y=[f.name for f in risk.factors],
+                    orientation='h',
+                    title=f"Risk Factors (overall {risk.overall_risk_score:.1f}/10)",
+                    labels={"x": "Severity (1-10)", "y": ""}
                 )
                 st.plotly_chart(fig, use_container_width=True)
             
+            if not (selection or execution or risk):
+                st.info("No structured projections were returned for this analysis.")
+            
             st.markdown("</div>", unsafe_allow_html=True)
                 
         with result_tabs[3]:
@@ -1272,6 +1365,8 @@ if run_button:
                 )
             
             st.markdown("</div>", unsafe_allow_html=True)
+    except AnalysisCancelled:
+        st.warning("The analysis was cancelled.")
     except ValueError as e:
         st.error(f"Analysis Error: {str(e)}")
         st.markdown(
@@ -0,0 +1,112 @@
+import os
+import time
+from typing import Any, Dict, Optional
+
+from crewai.events.types.llm_events import LLMCallType
+from crewai.llms.base_llm import BaseLLM, llm_call_context
+from pydantic import BaseModel
+
+from cancellation import check_cancelled
+from schemas import (
+    ExecutionPlan,
+    RiskAssessment,
+    RiskFactor,
+    StockPick,
+    StockSelection,
+    TradeOrder
+)
+
+# Set by install_stub_backends so spawned worker processes install them too
+STUB_ENV = 'STOCKSAGE_STUB_BACKENDS'
+
+# Canned structured outputs, one per output schema of the tasks
+STUB_OUTPUTS: Dict[type, BaseModel] = {
+    StockSelection: StockSelection(
+        picks=[StockPick(ticker='MSFT', company='Microsoft', allocation_pct=60, expected_return_pct=9.0,
+                         rationale='Stub pick for local testing'),
+               StockPick(ticker='JNJ', company='Johnson & Johnson', allocation_pct=40, expected_return_pct=6.0,
+                         rationale='Stub pick for local testing')],
+        expected_return_pct=7.8, expected_volatility_pct=14.0, summary='Stub portfolio'),
+    RiskAssessment: RiskAssessment(
+        overall_risk_score=4, risk_level='Medium', recommendation='HOLD', expected_volatility_pct=14.0,
+        factors=[RiskFactor(name='Stub risk', severity=3, description='Canned risk factor')],
+        summary='Stub risk assessment'),
+    ExecutionPlan: ExecutionPlan(
+        orders=[TradeOrder(ticker='MSFT', action='BUY', quantity=10, entry_price=400.0)],
+        summary='Stub execution plan')
+}
+
+def stub_answer(task: Any = None, response_model: Optional[type] = None) -> str:
+    """Canned reply: JSON for a structured output, otherwise a short final answer naming the task"""
+    schema = response_model or getattr(task, 'output_pydantic', None)
+    if schema in STUB_OUTPUTS:
+        body = STUB_OUTPUTS[schema].model_dump_json()
+    else:
+        body = f"Stub findings for {getattr(task, 'name', None) or 'this task'}: MSFT and JNJ look stable."
+    if response_model is not None:
+        return body
+    return f"Thought: I now know the final answer\nFinal Answer: {body}"
+
+class StubLLM(BaseLLM):
+    """
+    LLM answering every call with a canned reply, for local testing
+
+    Emits the same call and stream events as a provider, so streaming,
+    usage metrics and latency measurement all run. delay is spent per call,
+    in steps that check for cancellation, to simulate slow models.
+    """
+
+    delay: float = 0.0
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None):
+        with llm_call_context():
+            self._emit_call_started_event(messages=messages, tools=tools, callbacks=callbacks,
+                                          available_functions=available_functions,
+                                          from_task=from_task, from_agent=from_agent)
+            text = stub_answer(from_task, response_model)
+            words = text.split(' ')
+            for i, word in enumerate(words):
+                check_cancelled()
+                if self.delay:
+                    time.sleep(self.delay / len(words))
+                if self.stream:
+                    self._emit_stream_chunk_event(word + (' ' if i < len(words) - 1 else ''),
+                                                  from_task=from_task, from_agent=from_agent)
+            usage = {'prompt_tokens': len(str(messages)) // 4, 'completion_tokens': len(text) // 4}
+            self._emit_call_completed_event(response=text, call_type=LLMCallType.LLM_CALL, from_task=from_task,
+                                            from_agent=from_agent, messages=messages, usage=usage)
+            if response_model is not None:
+                return response_model.model_validate_json(text)
+            return text
+
+    def supports_function_calling(self) -> bool:
+        return False
+
+def stub_serper_request(query: str, search_type: str = 'search', num: int = 10,
+                        tbs: Optional[str] = None, timeout: float = 10, **params: Any) -> Dict[str, Any]:
+    """Canned Serper response in the API's JSON shape"""
+    check_cancelled()
+    items = [{'title': f"{query} result {i + 1}", 'link': f"https://example.com/{search_type}/{i + 1}",
+              'snippet': f"Stub {search_type} result about {query}.", 'position': i + 1}
+             for i in range(min(num, 3))]
+    if search_type == 'news':
+        return {'news': [{**item, 'source': 'Stub News', 'date': '1 hour ago'} for item in items]}
+    return {'organic': items}
+
+def install_stub_backends(delay: float = 0.0):
+    """Answer every LLM call and Serper search of this process (and spawned workers) with canned data"""
+    from crew import set_llm_factory
+    from serper import set_serper_backend
+
+    os.environ[STUB_ENV] = str(delay)
+    set_llm_factory(lambda **kwargs: StubLLM(delay=delay, **kwargs))
+    set_serper_backend(stub_serper_request)
+
+def uninstall_stub_backends():
+    from crew import set_llm_factory
+    from serper import set_serper_backend
+
+    os.environ.pop(STUB_ENV, None)
+    set_llm_factory(None)
+    set_serper_backend(None)
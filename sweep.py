@@ -0,0 +1,170 @@
+import datetime
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List
+
+from pydantic import ValidationError
+
+from cancellation import AnalysisCancelled, submit_in_context
+from config import SWEEP_PARAMS
+from crew import run_financial_analysis
+from schemas import RiskAssessment, StockSelection
+
+# Sweep axis names accepted on the command line and the inputs they set
+SWEEP_AXES = {
+    'risk': 'risk_tolerance',
+    'timeframe': 'investment_timeframe',
+    'capital': 'initial_capital',
+    'strategy': 'trading_strategy_preference'
+}
+
+def parse_sweep_spec(specs: Iterable[str]) -> Dict[str, List[str]]:
+    """
+    Parse axis specifications such as 'risk=Low,Medium,High' or
+    'timeframe=1-2 years,3-5 years' into an input name -> values grid
+    """
+    grid = {}
+    for spec in specs:
+        axis, sep, values = spec.partition('=')
+        axis = axis.strip().lower()
+        if not sep or axis not in SWEEP_AXES and axis not in SWEEP_AXES.values():
+            raise ValueError(f"Invalid sweep axis '{spec}'. Use one of: {', '.join(SWEEP_AXES)}")
+        parsed = [v.strip() for v in values.split(',') if v.strip()]
+        if not parsed:
+            raise ValueError(f"Sweep axis '{axis}' has no values")
+        grid[SWEEP_AXES.get(axis, axis)] = list(dict.fromkeys(parsed))
+    return grid
+
+def sweep_scenarios(base_inputs: Dict[str, Any], grid: Dict[str, List[str]]) -> List[Dict[str, Any]]:
+    """Every combination of the grid values applied on top of the base inputs"""
+    names = list(grid)
+    scenarios = []
+    for values in itertools.product(*(grid[name] for name in names)):
+        scenarios.append({**base_inputs, **dict(zip(names, values))})
+    return scenarios
+
+def scenario_label(scenario: Dict[str, Any], grid: Dict[str, List[str]]) -> str:
+    return ", ".join(f"{name.replace('_', ' ')}: {scenario[name]}" for name in grid)
+
+def run_sweep(base_inputs: Dict[str, Any], grid: Dict[str, List[str]],
+              run: Callable[[Dict[str, Any]], Any] = run_financial_analysis,
+              max_workers: int = SWEEP_PARAMS['max_workers']) -> List[Dict[str, Any]]:
+    """
+    Run one analysis per grid combination, sharing common stages
+
+    Scenarios run concurrently. Stages whose inputs do not differ between
+    scenarios (e.g. data analysis when only risk tolerance varies) have the
+    same stage key, so the first scenario to reach one computes it while the
+    others wait and reuse it; the remaining branches run in parallel.
+
+    Args:
+        base_inputs (dict): Inputs shared by every scenario
+        grid (dict): Input name -> values to sweep, see parse_sweep_spec
+        run (Callable): Runs one analysis
+        max_workers (int): Scenarios running at once
+
+    Returns:
+        One dict per scenario with label, inputs, result and error
+    """
+    scenarios = sweep_scenarios(base_inputs, grid)
+    if len(scenarios) > SWEEP_PARAMS['max_scenarios']:
+        raise ValueError(f"Sweep has {len(scenarios)} scenarios; the limit is {SWEEP_PARAMS['max_scenarios']}")
+
+    def run_scenario(scenario):
+        # Sharing upstream stages relies on the stage cache
+        scenario = {**scenario, 'reuse_stage_outputs': True}
+        entry = {'label': scenario_label(scenario, grid), 'inputs': scenario, 'result': None, 'error': None}
+        try:
+            entry['result'] = run(scenario)
+        except AnalysisCancelled:
+            raise
+        except Exception as e:
+            entry['error'] = str(e)
+        return entry
+
+    # Workers inherit the caller's cancellation token
+    with ThreadPoolExecutor(max_workers=max(max_workers, 1)) as executor:
+        futures = [submit_in_context(executor, run_scenario, s) for s in scenarios]
+        return [f.result() for f in futures]
+
+def _pct(value) -> str:
+    return f"{value:.1f}%" if value is not None else "n/a"
+
+def scenario_outcome(result) -> Dict[str, Any]:
+    """The typed stock selection and risk assessment of a scenario's result, when it produced them"""
+    outcome = {'selection': None, 'risk': None}
+    if not hasattr(result, 'structured'):
+        return outcome
+    for key, task_name, schema in (('selection', 'stock_selection', StockSelection),
+                                   ('risk', 'risk_assessment', RiskAssessment)):
+        try:
+            outcome[key] = result.structured(task_name, schema)
+        except ValidationError as e:
+            print(f"Warning: could not read the {task_name} output of a sweep scenario: {str(e)}")
+    return outcome
+
+def format_sweep_report(entries: List[Dict[str, Any]], grid: Dict[str, List[str]]) -> str:
+    """
+    Combined markdown report comparing every scenario of a sweep
+
+    Outcomes are compared from the structured stock selection and risk
+    assessment: picks, expected return and volatility, and risk score per
+    scenario, then the allocation of every picked ticker across scenarios.
+    Each scenario's full report follows as an appendix.
+    """
+    outcomes = [scenario_outcome(entry['result']) for entry in entries]
+    has_selection = any(o['selection'] is not None for o in outcomes)
+    columns = [name.replace('_', ' ').title() for name in grid]
+    if has_selection:
+        columns += ["Picks", "Expected return", "Volatility"]
+    columns += ["Risk score", "Recommendation", "Stages reused", "Status"]
+    lines = [
+        "# Scenario Sweep Report",
+        f"Generated {datetime.datetime.now().strftime('%Y-%m-%d %H:%M')}",
+        "",
+        "## Outcomes",
+        "",
+        "| " + " | ".join(columns) + " |",
+        "|" + "---|" * len(columns)
+    ]
+    for entry, outcome in zip(entries, outcomes):
+        result, selection, risk = entry['result'], outcome['selection'], outcome['risk']
+        stages = getattr(result, 'tasks_output', None) or []
+        row = [str(entry['inputs'][name]) for name in grid]
+        if has_selection:
+            if selection is None:
+                row += ["-", "-", "-"]
+            else:
+                # The risk model's volatility is measured; the selection's is projected
+                volatility = risk.expected_volatility_pct if risk and risk.expected_volatility_pct is not None \
+                    else selection.expected_volatility_pct
+                row += [", ".join(p.ticker for p in selection.picks),
+                        _pct(selection.expected_return_pct), _pct(volatility)]
+        row += [f"{risk.overall_risk_score:.1f}/10 ({risk.risk_level})" if risk else "-",
+                (risk.recommendation or "-") if risk else "-",
+                f"{getattr(result, 'reused', 0)}/{len(stages)}" if stages else "-",
+                "failed" if entry['error'] else "ok"]
+        lines.append("| " + " | ".join(row) + " |")
+
+    if has_selection:
+        # One row per ticker picked in any scenario, one column per scenario
+        tickers = list(dict.fromkeys(p.ticker for o in outcomes if o['selection'] for p in o['selection'].picks))
+        lines += ["", "## Allocations", "",
+                  "| Ticker | " + " | ".join(entry['label'] for entry in entries) + " |",
+                  "|" + "---|" * (len(entries) + 1)]
+        for ticker in tickers:
+            cells = []
+            for outcome in outcomes:
+                allocation = {p.ticker: p.allocation_pct for p in outcome['selection'].picks} \
+                    if outcome['selection'] else {}
+                cells.append(_pct(allocation[ticker]) if ticker in allocation else "-")
+            lines.append(f"| {ticker} | " + " | ".join(cells) + " |")
+
+    lines += ["", "## Scenario Reports"]
+    for entry in entries:
+        lines += ["", f"### {entry['label']}", ""]
+        if entry['error']:
+            lines.append(f"Analysis failed: {entry['error']}")
+        else:
+            lines.append(entry['result'].raw)
+    return "\n".join(lines)
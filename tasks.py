@@ -7,32 +7,44 @@ from agents import (
     stock_selection_specialist,
     market_research_specialist
 )
+from schemas import ExecutionPlan, RiskAssessment, StockSelection
+
+# Prompt caching note: providers cache the longest identical prompt prefix, and
+# crewai places the agent's role/backstory and then the task description first.
+# Descriptions therefore keep all static instructions up front and every
+# per-run variable in a trailing parameter block.
 
 # Task for Data Analyst Agent: Analyze Market Data
 data_analysis_task = Task(
+    name="data_analysis",
     description=(
-        "Continuously monitor and analyze market data for "
-        "{analysis_target}. "
+        "Continuously monitor and analyze market data for the analysis target given below. "
         "Use statistical modeling and machine learning to "
-        "identify trends and predict market movements."
+        "identify trends and predict market movements.\n\n"
+        "Analysis target: {analysis_target}\n"
+        "News: {news_instructions}"
     ),
     expected_output=(
         "Insights and alerts about significant market "
-        "opportunities or threats for {analysis_target}."
+        "opportunities or threats for the analysis target."
     ),
     agent=data_analyst_agent,
 )
 
 # Task for Trading Strategy Agent: Develop Trading Strategies
 strategy_development_task = Task(
+    name="strategy_development",
     description=(
         "Develop and refine trading strategies based on "
-        "the insights from the Data Analyst and "
-        "user-defined risk tolerance ({risk_tolerance}). "
-        "Consider trading preferences ({trading_strategy_preference})."
+        "the insights from the earlier stages, the "
+        "user-defined risk tolerance and the trading preferences given below.\n\n"
+        "Analysis target: {analysis_target}\n"
+        "Risk tolerance: {risk_tolerance}\n"
+        "Trading preference: {trading_strategy_preference}\n\n"
+        "Findings from the earlier stages of this analysis:\n{prior_stage_findings}"
     ),
     expected_output=(
-        "A set of potential trading strategies for {analysis_target} "
+        "A set of potential trading strategies for the analysis target "
         "that align with the user's risk tolerance."
     ),
     agent=trading_strategy_agent,
@@ -40,86 +52,171 @@ strategy_development_task = Task(
 
 # Task for Trade Advisor Agent: Plan Trade Execution
 execution_planning_task = Task(
+    name="execution_planning",
     description=(
         "Analyze approved trading strategies to determine the "
-        "best execution methods for {analysis_target}, "
-        "considering current market conditions and optimal pricing."
+        "best execution methods for the analysis target, "
+        "considering current market conditions and optimal pricing. "
+        "Base entry, stop and target price levels on the Technical Indicators tool "
+        "(RSI, MACD, Bollinger bands, ATR, VWAP, moving averages). "
+        "Size each order from the investor's capital and the proposed allocations, "
+        "and choose the execution schedule with the Execution Cost Simulator for "
+        "the investor's risk tolerance.\n\n"
+        "Analysis target: {analysis_target}\n"
+        "Capital: {initial_capital}\n"
+        "Risk tolerance: {risk_tolerance}\n\n"
+        "Findings from the earlier stages of this analysis:\n{prior_stage_findings}"
     ),
     expected_output=(
         "Detailed execution plans suggesting how and when to "
-        "execute trades for {analysis_target}."
+        "execute trades for the analysis target, including the chosen "
+        "schedule and its estimated slippage and market impact."
     ),
     agent=execution_agent,
+    output_pydantic=ExecutionPlan,
 )
 
 # Task for Risk Advisor Agent: Assess Trading Risks
 risk_assessment_task = Task(
+    name="risk_assessment",
     description=(
         "Evaluate the risks associated with the proposed trading "
-        "strategies and execution plans for {analysis_target}. "
+        "strategies and execution plans for the analysis target. "
         "Provide a detailed analysis of potential risks "
-        "and suggest mitigation strategies."
+        "and suggest mitigation strategies. Quantify portfolio volatility, "
+        "concentration and correlation with the Portfolio Risk Model tool.\n\n"
+        "Analysis target: {analysis_target}\n\n"
+        "Findings from the earlier stages of this analysis:\n{prior_stage_findings}"
     ),
     expected_output=(
         "A comprehensive risk analysis report detailing potential "
-        "risks and mitigation recommendations for {analysis_target}."
+        "risks and mitigation recommendations for the analysis target."
     ),
     agent=risk_management_agent,
+    output_pydantic=RiskAssessment,
 )
 
 # Market Research Task
 market_research_task = Task(
+    name="market_research",
     description=(
         "Conduct an exhaustive market analysis to identify compelling investment opportunities "
-        "across all sectors that align with the investor's parameters ({initial_capital} capital, "
-        "{investment_timeframe} time horizon, {risk_tolerance} risk tolerance). Your research should:\n\n"
+        "in the sectors given below. Your research should:\n\n"
         "1. Evaluate current market conditions and sector performance trends\n"
         "2. Identify sectors positioned for outperformance given the current economic cycle\n"
         "3. Uncover potential catalysts that could drive exceptional stock performance\n"
         "4. Detect emerging trends before they're fully reflected in market prices\n"
         "5. Analyze institutional money flows and smart money positioning\n"
-        "6. Identify stocks with favorable risk/reward profiles matching investor parameters\n"
+        "6. Identify stocks with favorable risk/reward profiles across a range of risk levels\n"
         "7. Evaluate potential market headwinds and tailwinds affecting different sectors\n"
-        "8. Consider global macroeconomic factors that could influence investment performance"
+        "8. Consider global macroeconomic factors that could influence investment performance\n\n"
+        "Do not tailor the research to any particular capital amount, time horizon or risk tolerance; "
+        "later stages adapt it to the investor together with a quantitative candidate shortlist.\n\n"
+        "Date: {research_date}\n"
+        "Sectors: {sector_preferences}\n"
+        "Excluded sectors: {exclude_sectors}\n"
+        "News: {research_news_instructions}"
     ),
     expected_output=(
         "A comprehensive market intelligence briefing containing:\n\n"
         "1. Detailed analysis of current market conditions and sector positioning\n"
-        "2. Identification of high-potential sectors given the investor's time horizon\n"
+        "2. Ranking of the sectors by near- and long-term potential\n"
         "3. List of 10-15 preliminary stock candidates with exceptional potential\n"
         "4. Analysis of key performance drivers for each candidate\n"
-        "5. Assessment of each candidate's alignment with investor parameters\n"
+        "5. Whether each candidate suits lower or higher risk profiles\n"
         "6. Risk factors and market conditions that could impact performance\n"
         "7. Identification of optimal entry timing based on technical and fundamental factors"
     ),
     agent=market_research_specialist,
 )
 
+# Shared Market Snapshot Task (profile independent, produced once per day per sector set)
+market_snapshot_task = Task(
+    name="market_snapshot",
+    description=(
+        "Prepare today's market research briefing that every investor focused on the sectors "
+        "given below will start from. Your research should:\n\n"
+        "1. Evaluate current market conditions and the performance trends of these sectors\n"
+        "2. Identify which of them are positioned for outperformance in the current economic cycle\n"
+        "3. Uncover catalysts, emerging trends and institutional money flows in each sector\n"
+        "4. Evaluate headwinds, tailwinds and global macroeconomic factors affecting them\n"
+        "5. Name preliminary stock candidates in each sector across a range of risk levels\n\n"
+        "Do not tailor the briefing to any particular capital amount, time horizon or risk tolerance; "
+        "later stages adapt it to each investor.\n\n"
+        "Date: {snapshot_date}\n"
+        "Sectors: {sector_preferences}\n"
+        "Excluded sectors: {exclude_sectors}\n"
+        "News: {news_instructions}"
+    ),
+    expected_output=(
+        "A market intelligence briefing containing:\n\n"
+        "1. Analysis of current market conditions and sector positioning\n"
+        "2. Ranking of the sectors by near- and long-term potential\n"
+        "3. 10-20 preliminary stock candidates with their sector, key performance drivers "
+        "and whether they suit lower or higher risk profiles\n"
+        "4. Risk factors and market conditions that could impact performance"
+    ),
+    agent=market_research_specialist,
+)
+
+# Per-candidate evaluation, fanned out over the market research candidates
+candidate_analysis_task = Task(
+    name="candidate_analysis",
+    description=(
+        "Evaluate the candidate stock given below as a potential holding for the investor "
+        "described below. Cover:\n\n"
+        "1. Fundamentals: financial health, valuation relative to growth, competitive position\n"
+        "2. Technicals: trend, momentum and key levels from the Technical Indicators tool\n"
+        "3. News: recent developments and their tone\n\n"
+        "Candidate: {candidate}\n"
+        "Capital: {initial_capital}\n"
+        "Time horizon: {investment_timeframe}\n"
+        "Risk tolerance: {risk_tolerance}\n"
+        "News: {news_instructions}\n\n"
+        "What the market research said about the candidate:\n{candidate_notes}"
+    ),
+    expected_output=(
+        "A verdict on the candidate of at most 200 words: a fit score from 1 to 10 for this investor, "
+        "the strongest fundamental, technical and news points for and against, and a suggested "
+        "entry price range."
+    ),
+    agent=stock_selection_specialist,
+)
+
 # Task for Stock Selection
 stock_selection_task = Task(
+    name="stock_selection",
     description=(
         "Conduct a comprehensive analysis of the global market to identify the ideal 3-5 stock recommendations "
-        "perfectly calibrated to the investor's profile ({initial_capital} capital, {investment_timeframe} time horizon, "
-        "{risk_tolerance} risk tolerance) and current market conditions. Your selection should consider:\n\n"
+        "perfectly calibrated to the investor's profile (given below) and current market conditions. "
+        "Your selection should consider:\n\n"
         "1. Fundamental strength and financial health metrics\n"
-        "2. Technical indicators and price momentum patterns\n"
+        "2. Technical indicators and price momentum patterns (use the Technical Indicators tool)\n"
         "3. Industry position and competitive advantage sustainability\n"
         "4. Alignment with macroeconomic trends and sector rotations\n"
         "5. Valuation metrics relative to growth potential\n"
         "6. Liquidity considerations based on investment capital\n"
         "7. Historical performance through similar market conditions\n"
         "8. Management quality and capital allocation effectiveness\n\n"
-        "Each recommendation must be justified with compelling evidence and tailored precisely to the investor's requirements."
+        "Each recommendation must be justified with compelling evidence and tailored precisely to the investor's requirements. "
+        "Where the earlier findings include per-candidate evaluations, choose among those candidates using their "
+        "verdicts rather than re-analyzing each one.\n\n"
+        "Capital: {initial_capital}\n"
+        "Time horizon: {investment_timeframe}\n"
+        "Risk tolerance: {risk_tolerance}\n"
+        "News: {news_instructions}\n\n"
+        "Findings from the earlier stages of this analysis:\n{prior_stage_findings}"
     ),
     expected_output=(
         "A meticulously crafted investment portfolio recommendation containing:\n\n"
         "1. The optimal selection of 3-5 stocks with detailed rationale for each selection\n"
         "2. Comprehensive analysis of why each selection aligns with the investor's time horizon and risk profile\n"
-        "3. Specific allocation percentages for optimal portfolio construction\n"
+        "3. Specific allocation percentages for optimal portfolio construction, checked with the Portfolio Risk Model tool\n"
         "4. Entry strategy with ideal price points and timing considerations\n"
         "5. Expected performance metrics including projected returns and volatility measures\n"
         "6. Key risk factors specific to each recommendation and mitigation strategies\n"
         "7. Strategic holding timeline with milestone evaluation points"
     ),
     agent=stock_selection_specialist,
-) 
\ No newline at end of file
+    output_pydantic=StockSelection,
+)
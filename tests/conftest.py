@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# Modules are flat at the repository root; config reads these at import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("STOCKSAGE_DATA_DIR", tempfile.mkdtemp(prefix="stocksage-test-"))
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("SERPER_API_KEY", "test-key")
@@ -0,0 +1,170 @@
+import http.client
+import json
+import threading
+import time
+
+import pytest
+
+from api_server import CANCELLED, COMPLETED, RUNNING, AnalysisServer, AnalysisService
+from stub_backends import StubLLM, install_stub_backends, uninstall_stub_backends
+
+
+def single_inputs(stock, **extra):
+    return {'stock_selection': stock, 'reuse_stage_outputs': False, 'news_impact_consideration': True, **extra}
+
+
+def wait_until(predicate, timeout=60):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.05)
+
+
+@pytest.fixture
+def stubbed():
+    install_stub_backends()
+    yield
+    uninstall_stub_backends()
+
+
+@pytest.fixture
+def slow_stubbed():
+    install_stub_backends(delay=0.5)
+    yield
+    uninstall_stub_backends()
+
+
+@pytest.fixture
+def service():
+    service = AnalysisService(workers=2)
+    yield service
+    service.shutdown()
+
+
+@pytest.fixture
+def server(service):
+    server = AnalysisServer(('127.0.0.1', 0), service)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def request(server, method, path, body=None):
+    conn = http.client.HTTPConnection('127.0.0.1', server.server_port, timeout=60)
+    conn.request(method, path, body=json.dumps(body) if body is not None else None)
+    response = conn.getresponse()
+    data = response.read().decode()
+    conn.close()
+    return response.status, data
+
+
+def read_events(server, job_id):
+    status, data = request(server, 'GET', f'/analyses/{job_id}/events')
+    assert status == 200
+    events = []
+    for block in data.strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines() if not line.startswith(':'))
+        if 'event' in fields:
+            events.append((int(fields['id']), fields['event'], json.loads(fields['data'])))
+    return events
+
+
+def test_stub_llm_answers_structured_outputs():
+    from schemas import RiskAssessment
+    llm = StubLLM(model='gpt-4o-mini')
+    assert isinstance(llm.call("Assess the risk", response_model=RiskAssessment), RiskAssessment)
+    assert "Final Answer:" in llm.call("Analyze MSFT")
+
+
+def test_submit_runs_the_crew_to_a_result(stubbed, service):
+    job = service.submit(single_inputs('MSFT'))
+    wait_until(lambda: job.finished)
+    assert job.status == COMPLETED, job.error
+    assert [s['task'] for s in job.result['stages']] == [
+        'data_analysis', 'strategy_development', 'execution_planning', 'risk_assessment']
+    assert job.result['stages'][-1]['data']['risk_level'] == 'Medium'
+
+
+def test_http_submit_status_result_and_events(stubbed, server):
+    status, body = request(server, 'POST', '/analyses', single_inputs('AAPL'))
+    assert status == 202
+    job_id = json.loads(body)['id']
+
+    events = read_events(server, job_id)
+    statuses = [data['status'] for _, event, data in events if event == 'status']
+    assert statuses[0] == 'queued' and RUNNING in statuses and statuses[-1] == COMPLETED
+    assert any(event == 'token' for _, event, _ in events)
+    assert any(event == 'log' and data['action'] == 'Analysis complete' for _, event, data in events)
+
+    status, body = request(server, 'GET', f'/analyses/{job_id}')
+    assert status == 200 and json.loads(body)['status'] == COMPLETED
+    status, body = request(server, 'GET', f'/analyses/{job_id}/result')
+    assert status == 200 and json.loads(body)['result']['raw']
+
+
+def test_http_cancel_stops_a_running_analysis(slow_stubbed, server, service):
+    status, body = request(server, 'POST', '/analyses', single_inputs('NVDA'))
+    job = service.get(json.loads(body)['id'])
+    wait_until(lambda: job.status == RUNNING)
+
+    status, _ = request(server, 'POST', f'/analyses/{job.id}/cancel')
+    assert status == 202
+    wait_until(lambda: job.finished, timeout=30)
+    assert job.status == CANCELLED
+    status, _ = request(server, 'GET', f'/analyses/{job.id}/result')
+    assert status == 409
+
+
+def test_concurrent_jobs_report_their_own_counts(slow_stubbed, service):
+    jobs = [service.submit(single_inputs(stock)) for stock in ('AMD', 'INTC')]
+    wait_until(lambda: all(job.finished for job in jobs))
+    # Both ran at the same time on the service's two workers
+    assert max(job.started_at for job in jobs) < min(job.finished_at for job in jobs)
+    for job in jobs:
+        assert job.status == COMPLETED, job.error
+        logs = [data for _, event, data in job.events_after(0, timeout=0) if event == 'log']
+        calls = sum(1 for entry in logs if entry['action'] == 'LLM call')
+        summary = next(entry for entry in logs if entry['action'] == 'Prompt cache summary')
+        assert summary['details'].startswith(f"{calls} LLM calls")
+
+
+def test_eviction_drops_the_jobs_that_finished_first():
+    release = {name: threading.Event() for name in ('first', 'second', 'third')}
+
+    def runner(inputs, cancel_token):
+        release[inputs['name']].wait(10)
+        return inputs['name']
+
+    service = AnalysisService(runner=runner, workers=2, max_finished_jobs=1)
+    try:
+        first, second = service.submit({'name': 'first'}), service.submit({'name': 'second'})
+        release['second'].set()
+        wait_until(lambda: second.finished)
+        time.sleep(1.1)
+        release['first'].set()
+        wait_until(lambda: first.finished)
+
+        release['third'].set()
+        service.submit({'name': 'third'})
+        assert service.get(second.id) is None
+        assert service.get(first.id) is first
+    finally:
+        service.shutdown()
+
+
+def test_final_status_event_is_recorded_with_the_status():
+    service = AnalysisService(runner=lambda inputs, cancel_token: 'done', workers=1)
+    try:
+        job = service.submit({'name': 'job'})
+        # Whenever the job is seen finished under its lock, its final event is already recorded
+        while True:
+            with job._changed:
+                if job.finished:
+                    last = job._events[-1]
+                    break
+                job._changed.wait(0.05)
+        assert last[1] == 'status' and last[2]['status'] == COMPLETED
+    finally:
+        service.shutdown()
@@ -0,0 +1,103 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from cancellation import (
+    AnalysisCancelled,
+    CancellationToken,
+    call_cancellable,
+    cancellable,
+    cancellation_scope,
+    check_cancelled,
+    closing_on_cancel,
+    submit_in_context
+)
+from fanout import fan_out
+
+
+def test_checkpoint_raises_once_cancelled():
+    token = CancellationToken()
+    with cancellation_scope(token):
+        check_cancelled()
+        token.cancel("Stopped by the user")
+        with pytest.raises(AnalysisCancelled, match="Stopped by the user"):
+            check_cancelled()
+    # Outside the scope there is no token to check
+    check_cancelled()
+
+
+def test_token_propagates_through_submit_in_context():
+    token = CancellationToken()
+    started = threading.Event()
+
+    def work():
+        started.set()
+        while True:
+            check_cancelled()
+            time.sleep(0.01)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        with cancellation_scope(token):
+            future = submit_in_context(executor, work)
+        started.wait(5)
+        token.cancel()
+        with pytest.raises(AnalysisCancelled):
+            future.result(5)
+        # A plain submit does not carry the token
+        assert executor.submit(check_cancelled).result(5) is None
+
+
+def test_cancelled_fan_out_stops_instead_of_dropping_candidates():
+    token = CancellationToken()
+
+    def analyze(candidate):
+        if candidate == 'AMD':
+            token.cancel()
+        check_cancelled()
+        return candidate
+
+    with cancellation_scope(token), pytest.raises(AnalysisCancelled):
+        fan_out(['AMD', 'NVDA'], analyze, max_workers=1)
+
+
+def test_blocking_call_returns_as_soon_as_cancelled():
+    token = CancellationToken()
+    threading.Timer(0.1, token.cancel).start()
+    started = time.monotonic()
+    with cancellation_scope(token), pytest.raises(AnalysisCancelled):
+        call_cancellable(time.sleep, 5, poll_interval=0.02)
+    assert time.monotonic() - started < 2
+
+
+class Session:
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_resources_are_closed_on_cancel():
+    token = CancellationToken()
+    resource = Session()
+    with cancellation_scope(token), closing_on_cancel(resource):
+        token.cancel()
+    assert resource.closed
+    # Callbacks registered after cancellation run at once
+    late = []
+    token.on_cancel(lambda: late.append(True))
+    assert late == [True]
+
+
+def test_cancellable_llm_checks_around_calls():
+    class FakeLLM:
+        def call(self, messages):
+            token.cancel()
+            return "answer"
+
+    token = CancellationToken()
+    llm = cancellable(FakeLLM())
+    with cancellation_scope(token), pytest.raises(AnalysisCancelled):
+        llm.call("hi")
+    assert cancellable(llm) is llm
@@ -0,0 +1,42 @@
+import threading
+
+from delegation import DelegationTrace, may_delegate, policy_for, summarize_edges
+from run_stats import run_stats_scope
+
+
+def edge(frm, to, seconds=1.0, status='ok'):
+    return {'stage': 'analysis', 'from': frm, 'to': to, 'kind': 'delegate', 'depth': 1,
+            'seconds': seconds, 'status': status, 'reason': '', 'at': '2024-01-01T00:00:00'}
+
+
+def test_edges_are_kept_per_run_not_in_the_trace(tmp_path):
+    trace = DelegationTrace(str(tmp_path / 'trace.jsonl'))
+    results = {}
+
+    def run(name, count):
+        with run_stats_scope() as stats:
+            for _ in range(count):
+                trace.record(edge("Crew Manager", name))
+            results[name] = stats.records('delegation')
+
+    threads = [threading.Thread(target=run, args=(name, n)) for name, n in (('Data Analyst', 2), ('Risk Advisor', 3))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [e['to'] for e in results['Data Analyst']] == ['Data Analyst'] * 2
+    assert [e['to'] for e in results['Risk Advisor']] == ['Risk Advisor'] * 3
+    assert len((tmp_path / 'trace.jsonl').read_text().splitlines()) == 5
+
+
+def test_policies_fall_back_to_the_default():
+    assert policy_for('Data Analyst')['max_delegations'] == 0
+    assert not may_delegate('Data Analyst')
+    assert may_delegate('"Crew  Manager"')
+    assert policy_for('Unknown Role') == policy_for('default')
+
+
+def test_summary_groups_edges_by_pair():
+    groups = summarize_edges([edge("A", "B", 1.0), edge("A", "B", 2.0, 'blocked'), edge("A", "C", 5.0)])
+    assert [(g['to'], g['count'], g['blocked']) for g in groups] == [('C', 1, 0), ('B', 2, 1)]
@@ -0,0 +1,47 @@
+import pytest
+
+from doc_index import DocumentIndex, chunk_text, index_search_results
+
+
+@pytest.fixture
+def index(tmp_path):
+    return DocumentIndex(str(tmp_path / 'documents.db'))
+
+
+def test_chunks_overlap():
+    words = [f"w{i}" for i in range(10)]
+    chunks = chunk_text(" ".join(words), chunk_words=4, overlap_words=2)
+    assert chunks == ["w0 w1 w2 w3", "w2 w3 w4 w5", "w4 w5 w6 w7", "w6 w7 w8 w9"]
+    assert chunk_text("   ") == []
+
+
+def test_bm25_ranks_the_most_relevant_chunk_first(index):
+    index.add_document('https://a.example', "Nvidia reported record data center revenue. "
+                                            "Data center demand for Nvidia GPUs keeps growing.")
+    index.add_document('https://b.example', "Nvidia is mentioned once among many semiconductor "
+                                            "companies in this long market overview about interest "
+                                            "rates, inflation, bonds and the consumer.")
+    index.add_document('https://c.example', "Oil prices fell as OPEC raised output.")
+
+    results = index.search("Nvidia data center revenue")
+    assert [r['url'] for r in results] == ['https://a.example', 'https://b.example']
+    assert results[0]['score'] < results[1]['score']
+    # Porter stemming matches other word forms
+    assert index.search("reports")[0]['url'] == 'https://a.example'
+    assert index.search("?!") == []
+
+
+def test_reindexing_replaces_chunks(index):
+    index.add_document('https://a.example', "Apple launches a new iPhone")
+    index.add_document('https://a.example', "Apple raises its dividend")
+    assert index.search("iphone") == []
+    assert index.search("dividend")[0]['url'] == 'https://a.example'
+    assert index.get_document('https://a.example') == "Apple raises its dividend"
+    assert index.get_document('https://a.example', max_age_hours=0) is None
+
+
+def test_search_results_are_indexed_as_small_documents(index):
+    results = {'organic': [{'title': 'AMD earnings', 'link': 'https://amd.example', 'snippet': 'AMD beat estimates'}],
+               'news': [{'title': 'Intel outlook', 'link': 'https://intc.example', 'snippet': 'Guidance cut'}]}
+    assert index_search_results("chip stocks", results, index) == 2
+    assert index.search("guidance")[0]['url'] == 'search:https://intc.example'
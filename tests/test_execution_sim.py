@@ -0,0 +1,26 @@
+import pytest
+
+from execution_sim import simulate_schedules
+
+STATS = {'price': 100.0, 'adv': 1_000_000.0, 'daily_vol': 0.02}
+
+def test_simulate_schedules_ranks_finite_costs():
+    results = simulate_schedules(1_000_000, STATS, 'Medium')
+    assert results['expected_cost_bps'].notna().all()
+
+@pytest.mark.parametrize('order_value, stats', [
+    (0, STATS),
+    (-5_000, STATS),
+    (10_000, {**STATS, 'adv': 0.0}),
+    (10_000, {**STATS, 'price': 0.0}),
+    (10_000, {**STATS, 'daily_vol': float('nan')}),
+])
+def test_simulate_schedules_rejects_missing_liquidity(order_value, stats):
+    with pytest.raises(ValueError):
+        simulate_schedules(order_value, stats, 'Medium')
+
+def test_execution_cost_tool_reports_illiquid_ticker(monkeypatch):
+    import analysis_tools
+    monkeypatch.setattr(analysis_tools, 'market_stats', lambda ticker: {**STATS, 'adv': 0.0})
+    message = analysis_tools.ExecutionCostTool()._run('XYZ', 10_000)
+    assert 'Insufficient liquidity data' in message
@@ -0,0 +1,35 @@
+from fanout import extract_candidates
+
+UNIVERSE = {'A', 'ALL', 'ON', 'NOW', 'IT', 'KEY', 'AAPL', 'MSFT', 'NVDA', 'AMD', 'UNH'}
+
+BRIEFING = """
+IT spending is ON the rise and NOW is A KEY moment for ALL chip makers.
+MSFT and NVDA lead the sector; Advanced Micro Devices (AMD) is catching up.
+Watch $UNH as well. GDP growth slows.
+"""
+
+
+def test_plain_words_in_universe_are_not_candidates():
+    assert extract_candidates(BRIEFING, ['MSFT', 'NVDA'], UNIVERSE) == ['MSFT', 'NVDA', 'AMD', 'UNH']
+
+
+def test_shortlist_mentions_come_first():
+    text = "Consider (AMD) alongside NVDA."
+    assert extract_candidates(text, ['NVDA'], UNIVERSE) == ['NVDA', 'AMD']
+
+
+def test_explicit_tickers_outside_universe_are_ignored():
+    assert extract_candidates("Read (CEO) comments on $AAPL.", [], UNIVERSE) == ['AAPL']
+
+
+def test_without_universe_only_explicit_tickers_count():
+    assert extract_candidates("GDP and CPI moved; NASDAQ: NVDA rallied.", []) == ['NVDA']
+
+
+def test_without_universe_parenthesized_acronyms_are_ignored():
+    text = "The (CEO) said (GDP) data hurt (AMD); $UNH and NYSE: JNJ held up, as did MSFT."
+    assert extract_candidates(text, ['MSFT']) == ['MSFT', 'UNH', 'JNJ']
+
+
+def test_limit():
+    assert extract_candidates(BRIEFING, ['MSFT', 'NVDA'], UNIVERSE, limit=2) == ['MSFT', 'NVDA']
@@ -0,0 +1,81 @@
+import pytest
+
+from html_extract import MainContentParser, fetch_and_extract
+
+ARTICLE = "".join(f"<p>Sentence {i} about quarterly revenue and margins.</p>" for i in range(20))
+
+def extract(html):
+    parser = MainContentParser()
+    parser.feed(html)
+    parser.close()
+    return parser
+
+@pytest.mark.parametrize('wrapper', [
+    '<body class="page no-sidebar">',
+    '<body class="header-fixed nav-open">',
+    '<body id="comments">',
+])
+def test_labelled_page_wrappers_keep_their_content(wrapper):
+    parser = extract(f"<html>{wrapper}<main class='menu'><article class='ad'>{ARTICLE}</article></main></body></html>")
+    assert parser.kept_chars > 0
+    assert "Sentence 19" in parser.text()
+
+def test_boilerplate_containers_are_dropped_on_whole_tokens_only():
+    parser = extract(
+        "<body>"
+        "<div class='site menu'>Home About Contact</div>"
+        "<section id='related'>Other stories</section>"
+        "<div role='navigation'>Markets Tech</div>"
+        "<div class='has-header no-sidebar'>Kept paragraph text.</div>"
+        "<span class='ad'>Inline text stays.</span>"
+        "</body>"
+    )
+    text = parser.text()
+    assert "Home About" not in text
+    assert "Other stories" not in text
+    assert "Markets Tech" not in text
+    assert "Kept paragraph text." in text
+    assert "Inline text stays." in text
+
+class FakeResponse:
+    def __init__(self, body, content_type):
+        self.body = body
+        self.headers = {'Content-Type': content_type}
+        # What requests reports for text/* without a charset
+        self.encoding = 'ISO-8859-1' if 'charset' not in content_type else content_type.split('charset=')[1]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.body), chunk_size):
+            yield self.body[i:i + chunk_size]
+
+    def close(self):
+        pass
+
+class FakeSession:
+    def __init__(self, response):
+        self.response = response
+
+    def get(self, url, **kwargs):
+        return self.response
+
+@pytest.mark.parametrize('body, content_type', [
+    ("<html><body><p>Café résumé — 5% growth in Zürich</p></body></html>".encode('utf-8'), 'text/html'),
+    ("<html><head><meta charset='utf-8'></head><body><p>Café résumé — 5% growth in Zürich</p></body></html>"
+     .encode('utf-8'), 'text/html'),
+    ("<html><head><meta http-equiv='Content-Type' content='text/html; charset=windows-1252'></head>"
+     "<body><p>Café résumé — 5% growth in Zürich</p></body></html>".encode('cp1252'), 'text/html'),
+    ("<html><body><p>Café résumé — 5% growth in Zürich</p></body></html>".encode('utf-8'),
+     'text/html; charset=utf-8'),
+])
+def test_charset_without_header_is_not_read_as_latin1(body, content_type):
+    stats = fetch_and_extract('http://example.test/', session=FakeSession(FakeResponse(body, content_type)))
+    assert "Café résumé — 5% growth in Zürich" in stats['text']
@@ -0,0 +1,88 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicators import IndicatorEngine, compute_indicators, macd, rsi
+
+TICKERS = ['AAA', 'BBB', 'CCC']
+
+
+def panel(days=260, seed=1):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range('2023-01-02', periods=days)
+    close = pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0, 0.02, (days, len(TICKERS))), axis=0)),
+                         index=index, columns=TICKERS)
+    spread = close * rng.uniform(0.005, 0.02, close.shape)
+    volume = pd.DataFrame(rng.uniform(1e5, 1e6, close.shape), index=index, columns=TICKERS)
+    return {'open': close.shift(1).fillna(close), 'high': close + spread, 'low': close - spread,
+            'close': close, 'volume': volume}
+
+
+def naive_ema(values, alpha):
+    out, state = [], None
+    for value in values:
+        state = value if state is None else alpha * value + (1 - alpha) * state
+        out.append(state)
+    return np.array(out)
+
+
+def naive_rsi(prices, window=14):
+    deltas = np.diff(prices)
+    gain = naive_ema(np.clip(deltas, 0, None), 1 / window)
+    loss = naive_ema(np.clip(-deltas, 0, None), 1 / window)
+    return 100 - 100 / (1 + gain[-1] / loss[-1])
+
+
+def naive_macd(prices, fast=12, slow=26, signal=9):
+    line = naive_ema(prices, 2 / (fast + 1)) - naive_ema(prices, 2 / (slow + 1))
+    return line[-1], naive_ema(line, 2 / (signal + 1))[-1]
+
+
+def test_vectorized_rsi_and_macd_match_a_per_ticker_loop():
+    close = panel()['close']
+    vector_rsi = rsi(close).iloc[-1]
+    vector_macd = macd(close)
+    for ticker in TICKERS:
+        prices = close[ticker].to_numpy()
+        assert vector_rsi[ticker] == pytest.approx(naive_rsi(prices))
+        line, signal = naive_macd(prices)
+        assert vector_macd['macd'][ticker].iloc[-1] == pytest.approx(line)
+        assert vector_macd['macd_signal'][ticker].iloc[-1] == pytest.approx(signal)
+
+
+def test_incremental_updates_match_a_full_recompute():
+    full = panel()
+    engine = IndicatorEngine()
+    engine.fit({field: frame.iloc[:-5] for field, frame in full.items()})
+    for date in full['close'].index[-5:]:
+        latest = engine.update(pd.DataFrame({field: frame.loc[date] for field, frame in full.items()}), date)
+
+    expected = pd.DataFrame({name: frame.iloc[-1] for name, frame in compute_indicators(full).items()})
+    pd.testing.assert_frame_equal(latest[expected.columns], expected, check_dtype=False, atol=1e-8)
+
+
+class FakeStore:
+    def __init__(self, bars):
+        self.bars = bars
+
+    def load_panel(self, tickers=None, lookback=None, since=None):
+        if since is None:
+            return self.bars
+        return {field: frame[frame.index > since] for field, frame in self.bars.items()}
+
+
+def test_concurrent_refreshes_apply_each_bar_once():
+    full = panel()
+    store = FakeStore({field: frame.iloc[:-5] for field, frame in full.items()})
+    engine = IndicatorEngine()
+    engine.refresh(store)
+    store.bars = full
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(lambda _: engine.refresh(store), range(8)))
+
+    expected = pd.DataFrame({name: frame.iloc[-1] for name, frame in compute_indicators(full).items()})
+    assert engine.last_date == full['close'].index[-1]
+    for latest in results:
+        pd.testing.assert_frame_equal(latest[expected.columns], expected, check_dtype=False, atol=1e-8)
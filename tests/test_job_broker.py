@@ -0,0 +1,30 @@
+import pytest
+
+from api_server import COMPLETED, QUEUED
+from job_broker import LEASED, JobBroker, SQLiteBroker
+
+
+def test_incomplete_broker_cannot_be_created():
+    class QueueOnlyBroker(JobBroker):
+        def enqueue(self, inputs, batch=None, max_attempts=None):
+            return "job"
+
+    with pytest.raises(TypeError):
+        QueueOnlyBroker()
+
+
+def test_sqlite_broker_lease_lifecycle(tmp_path):
+    broker = SQLiteBroker(path=str(tmp_path / "broker.db"), retry_delay=0)
+    batch = broker.enqueue_batch([{'stock_selection': 'MSFT'}, {'stock_selection': 'JNJ'}])
+    assert broker.counts(batch) == {QUEUED: 2}
+
+    job = broker.lease("node-1", lease_seconds=60)
+    assert broker.get(job['id'])['status'] == LEASED
+    assert broker.heartbeat(job['id'], job['lease_id'], 60)
+    assert not broker.complete(job['id'], "stale-lease", {'raw': 'x'})
+    assert broker.complete(job['id'], job['lease_id'], {'raw': 'report'})
+    assert broker.counts(batch) == {QUEUED: 1, COMPLETED: 1}
+
+    other = broker.lease("node-2", lease_seconds=60)
+    assert broker.release(other['id'], other['lease_id'])
+    assert broker.get(other['id'])['status'] == QUEUED
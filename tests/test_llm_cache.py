@@ -0,0 +1,87 @@
+import datetime
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+import llm_cache
+from llm_cache import ResponseCache, with_response_cache
+
+
+def test_memory_entries_expire_with_the_ttl(tmp_path):
+    cache = ResponseCache(path=str(tmp_path / "llm.db"), ttl_hours=1)
+    cache.put("k", "gpt-4o-mini", "answer")
+    assert cache.get("k") == "answer"
+    assert cache.stats['memory_hits'] == 1
+
+    # Age the entry in both tiers past the TTL
+    old = datetime.datetime.now() - datetime.timedelta(hours=2)
+    cache._memory["k"] = ("answer", old)
+    conn = sqlite3.connect(cache.path)
+    with conn:
+        conn.execute("UPDATE responses SET created_at = ?", (old.isoformat(),))
+    conn.close()
+    assert cache.get("k") is None
+    assert "k" not in cache._memory
+
+
+def test_disk_hits_keep_their_original_age(tmp_path):
+    path = str(tmp_path / "llm.db")
+    ResponseCache(path=path, ttl_hours=1).put("k", "gpt-4o-mini", "answer")
+    cache = ResponseCache(path=path, ttl_hours=1)
+    assert cache.get("k") == "answer"
+    assert cache.stats['disk_hits'] == 1
+    cache.ttl_hours = 0
+    assert cache.get("k") is None
+
+
+def test_memory_only_cache(tmp_path):
+    cache = ResponseCache(path=None, ttl_hours=1)
+    cache.put("k", "gpt-4o-mini", "answer")
+    assert cache.get("k") == "answer"
+    cache.ttl_hours = 0
+    assert cache.get("k") is None
+
+
+def test_connections_are_closed(tmp_path, monkeypatch):
+    cache = ResponseCache(path=str(tmp_path / "llm.db"), ttl_hours=1)
+    opened = []
+    connect = cache._connect
+
+    def tracking_connect():
+        conn = connect()
+        opened.append(conn)
+        return conn
+
+    monkeypatch.setattr(cache, '_connect', tracking_connect)
+    cache.put("k", "gpt-4o-mini", "answer")
+    cache._memory.clear()
+    assert cache.get("k") == "answer"
+    assert len(opened) == 2
+    for conn in opened:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+
+
+class CountingLLM:
+    model = 'gpt-4o-mini'
+
+    def __init__(self):
+        self.calls = 0
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None):
+        self.calls += 1
+        return f"answer {self.calls}"
+
+
+def test_only_opted_in_agents_are_cached(monkeypatch):
+    monkeypatch.setattr(llm_cache, 'response_cache', ResponseCache(path=None))
+    monkeypatch.setitem(llm_cache.LLM_CACHE_PARAMS, 'agents', ['Data Analyst'])
+    llm = with_response_cache(CountingLLM())
+    analyst, advisor = SimpleNamespace(role='Data Analyst'), SimpleNamespace(role='Risk Advisor')
+
+    assert llm.call("Summarize the page", from_agent=analyst) == "answer 1"
+    assert llm.call("Summarize  the page", from_agent=analyst) == "answer 1"
+    assert llm.call("Summarize the page", from_agent=advisor) == "answer 2"
+    assert llm.calls == 2
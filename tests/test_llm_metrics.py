@@ -0,0 +1,41 @@
+from types import SimpleNamespace
+
+import pytest
+
+import llm_metrics
+from llm_metrics import cache_summary, format_call, parse_usage, record_call, register_usage_callback
+from run_stats import run_stats_scope
+
+
+@pytest.mark.parametrize('usage', [
+    {'prompt_tokens': 1200, 'completion_tokens': 300, 'prompt_tokens_details': {'cached_tokens': 1024}},
+    {'prompt_tokens': 1200, 'completion_tokens': 300, 'cached_prompt_tokens': 1024},
+    SimpleNamespace(prompt_tokens=1200, completion_tokens=300,
+                    prompt_tokens_details=SimpleNamespace(cached_tokens=1024)),
+], ids=['openai-dict', 'flat', 'object'])
+def test_cached_tokens_are_read_from_each_usage_shape(usage):
+    assert parse_usage(usage) == {'prompt_tokens': 1200, 'cached_tokens': 1024, 'completion_tokens': 300}
+
+
+def test_missing_usage_counts_as_zero():
+    assert parse_usage(None) == {'prompt_tokens': 0, 'cached_tokens': 0, 'completion_tokens': 0}
+    assert parse_usage({'prompt_tokens': 10, 'prompt_tokens_details': None})['cached_tokens'] == 0
+
+
+def test_calls_are_reported_and_counted_for_the_run(monkeypatch):
+    monkeypatch.setattr(llm_metrics, '_callbacks', [])
+    reported = []
+    register_usage_callback(reported.append)
+
+    with run_stats_scope() as stats:
+        record_call('openai/gpt-4o-mini', {'prompt_tokens': 2000, 'completion_tokens': 100,
+                                           'prompt_tokens_details': {'cached_tokens': 1536}},
+                    'Data Analyst', 'data_analysis')
+        record_call('gpt-4o', {'prompt_tokens': 1000, 'completion_tokens': 50})
+
+    assert reported[0]['model'] == 'gpt-4o-mini' and reported[0]['agent_role'] == 'Data Analyst'
+    assert format_call(reported[0]) == "gpt-4o-mini: 2,000 prompt tokens (1,536 cached, 464 uncached), 100 completion"
+    summary = cache_summary(stats.counts('prompt_cache'))
+    assert (summary['calls'], summary['prompt_tokens'], summary['cached_tokens']) == (2, 3000, 1536)
+    assert summary['cached_share'] == pytest.approx(0.512)
+    assert cache_summary({})['cached_share'] == 0.0
@@ -0,0 +1,53 @@
+import json
+import os
+
+import pytest
+
+from model_router import ModelRouter
+
+
+@pytest.fixture
+def router(tmp_path):
+    return ModelRouter(config_file=str(tmp_path / "model_config.json"),
+                       profile_file=str(tmp_path / "model_profiles.json"))
+
+
+def test_streamed_call_measures_time_to_first_token(router):
+    router.call_started("c1", at=100.0)
+    router.first_token("c1", at=100.4)
+    router.call_completed("c1", "openai/gpt-4o-mini", output_tokens=100, at=102.4)
+    profile = router.registry()["gpt-4o-mini"]
+    assert profile["latency_ms"] == pytest.approx(400)
+    assert profile["tokens_per_second"] == pytest.approx(50)
+    assert profile["measured_calls"] == 1
+
+
+def test_latency_is_updated_on_calls_with_usage(router):
+    default = router.registry()["gpt-4o-mini"]["latency_ms"]
+    for n in range(5):
+        router.call_started(f"c{n}", at=0.0)
+        router.call_completed(f"c{n}", "gpt-4o-mini", output_tokens=85, at=3.0)
+    assert router.registry()["gpt-4o-mini"]["latency_ms"] > default
+
+
+def test_concurrent_calls_are_timed_separately(router):
+    router.call_started("a", at=0.0)
+    router.call_started("b", at=5.0)
+    router.first_token("a", at=0.2)
+    router.first_token("b", at=6.0)
+    router.call_completed("a", "gpt-4o", output_tokens=0, at=1.0)
+    assert router.registry()["gpt-4o"]["latency_ms"] == pytest.approx(200)
+
+
+def test_call_started_requires_call_id(router):
+    with pytest.raises(ValueError):
+        router.call_started(None)
+
+
+def test_measurements_are_saved_in_batches(router):
+    router.call_started("c1", at=0.0)
+    router.call_completed("c1", "gpt-4o", output_tokens=10, at=1.0)
+    assert not os.path.exists(router.profile_file)
+    router.flush()
+    with open(router.profile_file) as f:
+        assert json.load(f)["gpt-4o"]["calls"] == 1
@@ -0,0 +1,80 @@
+import datetime
+
+import pytest
+
+from cancellation import AnalysisCancelled, CancellationToken, cancellation_scope, current_token
+from news import NewsStore, fetch_topic_news, hamming_distance, ingest_news, simhash
+from serper import set_serper_backend
+
+NOW = datetime.datetime.now().isoformat()
+
+
+def article(url, title, snippet=''):
+    return {'url': url, 'title': title, 'snippet': snippet, 'source': 'Test',
+            'published_at': NOW, 'fetched_at': NOW}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return NewsStore(str(tmp_path / 'news.db'))
+
+
+@pytest.fixture
+def requests_made():
+    calls = []
+
+    def backend(query, search_type, num, tbs, timeout, **params):
+        calls.append({'query': query, 'tbs': tbs, 'token': current_token()})
+        return {'news': [{'link': f"https://example.com/{len(calls)}", 'title': f"{query} story {len(calls)}",
+                          'snippet': 'Shares moved on the report.', 'date': '2 hours ago'}]}
+
+    set_serper_backend(backend)
+    yield calls
+    set_serper_backend(None)
+
+
+def test_simhash_is_close_for_near_duplicates():
+    a = simhash("Apple beats earnings estimates as iPhone sales jump in the March quarter")
+    b = simhash("Apple beats earnings estimates as iPhone sales jump in the March quarter.")
+    c = simhash("Oil prices slide after OPEC signals higher output next month")
+    assert hamming_distance(a, b) <= 3 < hamming_distance(a, c)
+
+
+def test_near_duplicates_are_stored_once(store):
+    title = "Nvidia shares hit a record high after the chip maker raised its revenue outlook"
+    added = store.add_articles('nvda', [
+        article('https://a.example/nvda', title),
+        article('https://b.example/nvda-copy', title + "."),
+        article('https://c.example/oil', "Oil prices slide after OPEC signals higher output next month"),
+    ])
+    assert added == 2
+    # A syndicated copy seen under another topic joins the existing article
+    assert store.add_articles('chips', [article('https://d.example/nvda', title)]) == 0
+    assert [a['url'] for a in store.query(['chips'])] == ['https://a.example/nvda']
+
+
+def test_reingest_only_fetches_stale_topics_since_the_watermark(store, requests_made):
+    assert fetch_topic_news('msft', store) == 1
+    assert requests_made[0]['tbs'] == 'qdr:w'
+    # Within refresh_hours the stored news is used without a request
+    assert fetch_topic_news('msft', store) == 0
+    assert len(requests_made) == 1
+    # Once stale, only the gap since the last fetch is requested
+    assert fetch_topic_news('msft', store, {'refresh_hours': 0}) == 1
+    assert requests_made[1]['tbs'] == 'qdr:h'
+    assert store.last_fetched('msft') > datetime.datetime.now() - datetime.timedelta(minutes=1)
+
+
+def test_ingest_runs_fetches_in_the_callers_context(store, requests_made):
+    token = CancellationToken()
+    with cancellation_scope(token):
+        assert ingest_news(['aapl', 'tech'], store) == {'aapl': 1, 'tech': 1}
+    assert all(call['token'] is token for call in requests_made)
+
+
+def test_ingest_stops_when_cancelled(store, requests_made):
+    token = CancellationToken()
+    token.cancel()
+    with cancellation_scope(token), pytest.raises(AnalysisCancelled):
+        ingest_news(['aapl', 'tech'], store)
+    assert requests_made == []
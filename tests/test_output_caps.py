@@ -0,0 +1,59 @@
+import pytest
+
+from config import TASK_MAX_OUTPUT_TOKENS
+from html_extract import count_tokens
+from schemas import ExecutionPlan, RiskAssessment, RiskFactor, StockPick, StockSelection, TradeOrder
+from stub_backends import stub_answer
+from tasks import execution_planning_task, risk_assessment_task, stock_selection_task
+
+STRUCTURED_TASKS = [stock_selection_task, execution_planning_task, risk_assessment_task]
+
+SENTENCE = ("Revenue growth remains resilient while margins expand on pricing power and "
+            "disciplined cost control, supporting the valuation against sector peers. ")
+
+
+def text(words):
+    base = SENTENCE.split()
+    return " ".join(base[i % len(base)] for i in range(words))
+
+
+# The longest outputs the task descriptions ask for: 5 picks, one order per
+# pick, and a risk factor per pick plus portfolio-level factors
+FULL_OUTPUTS = {
+    'stock_selection': StockSelection(
+        picks=[StockPick(ticker=f"TCK{i}", company=f"Example Holdings {i} Corporation", allocation_pct=20,
+                         entry_price_low=101.25, entry_price_high=108.75, target_price=135.5,
+                         expected_return_pct=18.5, rationale=text(150), key_risks=[text(30) for _ in range(3)])
+               for i in range(5)],
+        expected_return_pct=14.2, expected_volatility_pct=19.8, entry_strategy=text(120),
+        holding_timeline=text(120), summary=text(100)),
+    'execution_planning': ExecutionPlan(
+        orders=[TradeOrder(ticker=f"TCK{i}", action='BUY', order_type='stop-limit', entry_price=104.5,
+                           stop_loss=94.25, target_price=135.5, quantity=190,
+                           schedule=f"VWAP over 3 sessions; {text(40)}", estimated_cost_bps=12.4)
+                for i in range(5)],
+        timing=text(150), summary=text(120)),
+    'risk_assessment': RiskAssessment(
+        overall_risk_score=6.5, risk_level='Medium', recommendation='PROCEED WITH CAUTION',
+        expected_volatility_pct=19.8, max_drawdown_pct=32.0,
+        factors=[RiskFactor(name=f"Risk factor {i}", severity=6, description=text(80), mitigation=text(50))
+                 for i in range(8)],
+        summary=text(150))
+}
+
+
+def final_answer(output):
+    return f"Thought: I now know the final answer\nFinal Answer: {output.model_dump_json(indent=2)}"
+
+
+@pytest.mark.parametrize('task', STRUCTURED_TASKS, ids=lambda task: task.name)
+def test_stub_output_fits_under_the_cap(task):
+    assert count_tokens(stub_answer(task)) < TASK_MAX_OUTPUT_TOKENS[task.name]
+
+
+@pytest.mark.parametrize('task', STRUCTURED_TASKS, ids=lambda task: task.name)
+def test_full_size_structured_output_fits_under_the_cap(task):
+    output = FULL_OUTPUTS[task.name]
+    assert isinstance(output, task.output_pydantic)
+    # Leave room for a longer reasoning preamble than the stub's
+    assert count_tokens(final_answer(output)) + 300 < TASK_MAX_OUTPUT_TOKENS[task.name]
@@ -0,0 +1,70 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from cancellation import AnalysisCancelled, CancellationToken, cancellation_scope, check_cancelled
+from prefetch import ToolResultCache
+
+
+def run_with(token, fn, *args):
+    with cancellation_scope(token):
+        return fn(*args)
+
+
+def test_cancelled_owner_does_not_fail_other_runs():
+    cache = ToolResultCache()
+    owner_token, waiter_token = CancellationToken(), CancellationToken()
+    started = threading.Event()
+
+    def slow_search():
+        started.set()
+        while True:
+            check_cancelled()
+            time.sleep(0.01)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        owner = executor.submit(run_with, owner_token, cache.get_or_compute, 'key', slow_search)
+        started.wait(5)
+        waiter = executor.submit(run_with, waiter_token, cache.get_or_compute, 'key', lambda: 'fresh')
+        time.sleep(0.2)
+        owner_token.cancel()
+        with pytest.raises(AnalysisCancelled):
+            owner.result(5)
+        # The waiting run recomputes instead of inheriting the cancellation
+        assert waiter.result(5) == 'fresh'
+    assert cache.get_or_compute('key', lambda: 'unused') == 'fresh'
+
+
+def test_cancelled_waiter_stops_waiting_on_a_slow_owner():
+    cache = ToolResultCache()
+    release, started = threading.Event(), threading.Event()
+    waiter_token = CancellationToken()
+
+    def slow_search():
+        started.set()
+        release.wait(5)
+        return 'result'
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        owner = executor.submit(cache.get_or_compute, 'key', slow_search)
+        started.wait(5)
+        waiter = executor.submit(run_with, waiter_token, cache.get_or_compute, 'key', slow_search)
+        waiter_token.cancel()
+        with pytest.raises(AnalysisCancelled):
+            waiter.result(2)
+        release.set()
+        assert owner.result(5) == 'result'
+
+
+def test_failures_are_shared_but_not_cached():
+    cache = ToolResultCache()
+
+    def fail():
+        raise RuntimeError("search failed")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute('key', fail)
+    assert cache.get_or_compute('key', lambda: 'ok') == 'ok'
+    assert (cache.hits, cache.misses) == (0, 2)
@@ -0,0 +1,89 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import risk_model
+from risk_model import RiskModel, fit_risk_model, get_risk_model
+
+TICKERS = ['AAA', 'BBB', 'CCC', 'DDD', 'EEE', 'FFF', 'GGG']
+
+
+def closes(days=80, seed=0):
+    rng = np.random.default_rng(seed)
+    market = rng.normal(0, 0.01, size=(days, 1))
+    returns = market + rng.normal(0, 0.015, size=(days, len(TICKERS)))
+    prices = 100 * np.exp(np.cumsum(returns, axis=0))
+    return pd.DataFrame(prices, index=pd.bdate_range('2024-01-01', periods=days), columns=TICKERS)
+
+
+def dense_ledoit_wolf(returns):
+    """One-shot Ledoit-Wolf intensity towards the diagonal target on the full matrix"""
+    X = returns - returns.mean(axis=0)
+    T = X.shape[0]
+    S = X.T @ X / T
+    P = (X ** 2).T @ (X ** 2) / T - S ** 2
+    off = ~np.eye(X.shape[1], dtype=bool)
+    return float(np.clip(P[off].sum() / T / (S[off] ** 2).sum(), 0, 1))
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 500])
+def test_chunked_shrinkage_matches_one_shot_fit(chunk_size):
+    model = fit_risk_model(closes(), window=60, params={'chunk_size': chunk_size})
+    expected = dense_ledoit_wolf(model.returns.astype(np.float64))
+    assert model.shrinkage == pytest.approx(expected, rel=1e-6)
+
+    sample = model.covariance(method='sample').values
+    shrunk = model.covariance(method='shrinkage').values
+    target = np.diag(np.diag(sample))
+    assert np.allclose(shrunk, (1 - expected) * sample + expected * target)
+
+
+def test_roll_matches_a_fresh_fit_and_leaves_the_old_model_alone():
+    prices = closes(90)
+    model = fit_risk_model(prices.iloc[:81], window=60)
+    before = model.returns.copy()
+
+    rolled = model.roll(prices.iloc[81:])
+    fresh = fit_risk_model(prices, window=60)
+    assert rolled.last_date == fresh.last_date
+    assert np.allclose(rolled.returns, fresh.returns, atol=1e-6)
+    assert rolled.shrinkage == pytest.approx(fresh.shrinkage, rel=1e-4)
+    assert np.array_equal(model.returns, before)
+
+
+def test_save_and_load_round_trip(tmp_path):
+    model = fit_risk_model(closes(), window=60)
+    path = str(tmp_path / 'model.npz')
+    model.save(path)
+    loaded = RiskModel.load(path)
+    assert loaded.tickers == model.tickers and loaded.last_date == model.last_date
+    assert loaded.shrinkage == pytest.approx(model.shrinkage)
+    assert not list(tmp_path.glob('*.tmp'))
+
+
+class FakeStore:
+    def __init__(self, prices):
+        self.prices = prices
+
+    def tickers(self):
+        return list(self.prices.columns)
+
+    def load_panel(self, tickers=None, lookback=None, since=None):
+        frame = self.prices
+        if since is not None:
+            frame = frame[frame.index > since]
+        if lookback:
+            frame = frame.iloc[-lookback:]
+        return {'close': frame}
+
+
+def test_concurrent_callers_share_one_model(monkeypatch, tmp_path):
+    monkeypatch.setattr(risk_model, 'RISK_MODEL_DIR', str(tmp_path))
+    monkeypatch.setattr(risk_model, '_model_cache', risk_model.OrderedDict())
+    store = FakeStore(closes())
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        models = list(executor.map(lambda _: get_risk_model(window=60, store=store), range(8)))
+    assert all(model is models[0] for model in models)
+    assert len(list(tmp_path.glob('*.npz'))) == 1
@@ -0,0 +1,63 @@
+from types import SimpleNamespace
+
+import pytest
+from pydantic import ValidationError
+
+from schemas import ExecutionPlan, RiskAssessment, StockSelection
+from stages import StagedResult, StageOutput, stage_payload
+from stub_backends import STUB_OUTPUTS
+
+SELECTION_JSON = """{
+  "picks": [
+    {"ticker": "MSFT", "company": "Microsoft", "allocation_pct": 60, "entry_price_low": 395,
+     "entry_price_high": 410, "target_price": 470, "expected_return_pct": 14.5,
+     "rationale": "Cloud growth", "key_risks": ["AI capex"]},
+    {"ticker": "JNJ", "allocation_pct": 40, "rationale": "Defensive income"}
+  ],
+  "expected_return_pct": 10.2,
+  "expected_volatility_pct": 15.1,
+  "summary": "Balanced tech and healthcare"
+}"""
+
+
+def test_model_json_validates_into_the_schema():
+    selection = StockSelection.model_validate_json(SELECTION_JSON)
+    assert [p.ticker for p in selection.picks] == ['MSFT', 'JNJ']
+    assert selection.picks[1].company == '' and selection.picks[1].key_risks == []
+    markdown = selection.to_markdown()
+    assert "| MSFT | Microsoft | 60.0% | $395.00 - $410.00 | $470.00 | 14.5% |" in markdown
+    assert "| JNJ |  | 40.0% | n/a - n/a | n/a | n/a |" in markdown
+
+
+@pytest.mark.parametrize('schema, data', [
+    (StockSelection, {'summary': 'no picks'}),
+    (StockSelection, {'picks': [{'ticker': 'MSFT', 'allocation_pct': 'most'}]}),
+    (ExecutionPlan, {'orders': [{'action': 'BUY'}]}),
+    (RiskAssessment, {'overall_risk_score': 11, 'risk_level': 'High'}),
+    (RiskAssessment, {'overall_risk_score': 5, 'risk_level': 'Medium',
+                      'factors': [{'name': 'Rates', 'severity': 0}]}),
+], ids=['missing-picks', 'bad-allocation', 'order-without-ticker', 'score-out-of-range', 'severity-out-of-range'])
+def test_invalid_outputs_are_rejected(schema, data):
+    with pytest.raises(ValidationError):
+        schema.model_validate(data)
+
+
+def test_stage_payload_keeps_the_typed_output():
+    risk = STUB_OUTPUTS[RiskAssessment]
+    raw, data = stage_payload(SimpleNamespace(pydantic=risk, raw=risk.model_dump_json()))
+    assert raw == risk.to_markdown() and raw.startswith("## Risk Assessment")
+    assert data == risk.model_dump()
+    assert stage_payload(SimpleNamespace(pydantic=None, raw="plain text")) == ("plain text", None)
+
+
+def test_staged_result_returns_validated_outputs():
+    plan = STUB_OUTPUTS[ExecutionPlan]
+    result = StagedResult([
+        StageOutput("Market Research", "briefing", 'k1', False, task='market_research'),
+        StageOutput("Execution Planning", plan.to_markdown(), 'k2', True, plan.model_dump(), 'execution_planning'),
+    ])
+    assert result.structured('execution_planning', ExecutionPlan) == plan
+    assert result.structured('execution_planning') == plan.model_dump()
+    assert result.structured('market_research') is None
+    assert result.structured('risk_assessment', RiskAssessment) is None
+    assert result.to_dict()['stages'][1]['data']['orders'][0]['ticker'] == 'MSFT'
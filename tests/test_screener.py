@@ -0,0 +1,64 @@
+import pandas as pd
+import pytest
+
+from market_data import load_universe
+from screener import NO_SHORTLIST_TEXT, format_shortlist, parse_capital, screen_universe
+
+ROWS = [
+    # ticker, sector, price, avg_dollar_volume, pe_ratio, momentum_3m, volatility
+    ('GOOD', 'Technology', 120.0, 5e8, 20.0, 0.10, 0.25),
+    ('BEST', 'Technology', 80.0, 5e8, 15.0, 0.20, 0.20),
+    ('HLTH', ' healthcare ', 60.0, 5e8, 18.0, 0.05, 0.22),
+    ('ENRG', 'Energy', 40.0, 5e8, 10.0, 0.15, 0.25),
+    ('THIN', 'Technology', 50.0, 1e5, 20.0, 0.10, 0.25),
+    ('PENY', 'Technology', 2.0, 5e8, 20.0, 0.10, 0.25),
+    ('LOSS', 'Technology', 50.0, 5e8, -5.0, 0.10, 0.25),
+    ('RICH', 'Technology', 50.0, 5e8, 60.0, 0.10, 0.25),
+    ('WILD', 'Technology', 50.0, 5e8, 20.0, 0.10, 0.70),
+]
+
+
+@pytest.fixture
+def universe(tmp_path):
+    path = tmp_path / 'universe.csv'
+    pd.DataFrame(ROWS, columns=['Ticker', 'Sector', 'Price', 'Avg_Dollar_Volume', 'PE_Ratio',
+                                'Momentum_3M', 'Volatility']).to_csv(path, index=False)
+    return load_universe(str(path))
+
+
+def screen(universe, thresholds=None, **inputs):
+    inputs = {'initial_capital': '$100,000', 'risk_tolerance': 'Medium', **inputs}
+    return list(screen_universe(inputs, universe, thresholds)['ticker'])
+
+
+def test_filters_and_ranks_candidates(universe):
+    # THIN fails liquidity, PENY the price floor, LOSS and RICH the P/E range, WILD volatility
+    assert screen(universe) == ['BEST', 'ENRG', 'GOOD', 'HLTH']
+
+
+def test_sector_preferences_and_exclusions(universe):
+    assert screen(universe, sector_preferences='Technology, Healthcare') == ['BEST', 'GOOD', 'HLTH']
+    assert screen(universe, exclude_sectors='energy,technology') == ['HLTH']
+
+
+def test_thresholds_follow_risk_tolerance(universe):
+    assert 'RICH' in screen(universe, risk_tolerance='High')
+    assert 'WILD' in screen(universe, risk_tolerance='High')
+    assert screen(universe, risk_tolerance='Low', thresholds={'max_pe': 16.0}) == ['BEST', 'ENRG']
+
+
+def test_liquidity_scales_with_capital(universe):
+    assert 'THIN' in screen(universe, initial_capital='1000')
+    assert screen(universe, initial_capital='1e8') == []
+
+
+def test_limit_and_shortlist_text(universe):
+    candidates = screen_universe({'initial_capital': '100000'}, universe, limit=2)
+    assert list(candidates['ticker']) == ['BEST', 'ENRG']
+    assert format_shortlist(candidates).splitlines()[1].startswith('BEST | Technology | 80.00 | 15.0 | +20.0%')
+    assert format_shortlist(screen_universe({}, pd.DataFrame())) == NO_SHORTLIST_TEXT
+
+
+def test_invalid_capital():
+    with pytest.raises(ValueError):
+        parse_capital('lots')
@@ -0,0 +1,39 @@
+import pytest
+
+from sentiment import score_texts
+
+def test_positive_and_negative_headlines():
+    positive, negative, neutral = score_texts(["Apple beats estimates", "Apple misses estimates", "Apple holds event"])
+    assert positive > 0
+    assert negative < 0
+    assert neutral == 0
+
+@pytest.mark.parametrize('headline', [
+    "Apple didn't beat estimates",
+    "Apple doesn't beat estimates",
+    "Apple won't raise guidance",
+    "Apple didn’t beat estimates",
+    "Apple did not beat estimates",
+    "Apple failed beat estimates",
+])
+def test_negated_positive_is_negative(headline):
+    assert score_texts([headline])[0] < 0
+
+def test_negated_negative_is_positive():
+    assert score_texts(["Regulators can't fine Apple"])[0] > 0
+
+def test_negation_does_not_cross_headlines():
+    # The last token of one text must not negate the first token of the next
+    scores = score_texts(["Apple won't", "beat expectations"])
+    assert scores[1] > 0
+
+def test_news_tasks_agents_have_the_tools_the_instructions_name():
+    import tasks
+    from crew import news_instructions
+    instructions = news_instructions(['AAPL'])
+    for task in vars(tasks).values():
+        if getattr(task, 'description', None) and '{news_instructions}' in task.description:
+            names = {tool.name for tool in task.agent.tools}
+            for tool_name in ('News Sentiment', 'Stored News'):
+                assert tool_name in instructions
+                assert any(name.startswith(tool_name) for name in names), (task.agent.role, tool_name)
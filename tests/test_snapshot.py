@@ -0,0 +1,37 @@
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from snapshot import SnapshotStore, sector_set_key
+
+CONSERVATIVE = {'sector_preferences': 'Technology, Healthcare', 'exclude_sectors': 'Energy',
+                'risk_tolerance': 'Low', 'initial_capital': '10000', 'news_impact_consideration': True}
+AGGRESSIVE = {'sector_preferences': 'healthcare,technology', 'exclude_sectors': 'energy',
+              'risk_tolerance': 'High', 'initial_capital': '500000', 'news_impact_consideration': True}
+
+
+def test_profiles_with_the_same_sectors_share_a_snapshot(tmp_path):
+    assert sector_set_key(CONSERVATIVE) == sector_set_key(AGGRESSIVE)
+    assert sector_set_key(CONSERVATIVE) != sector_set_key({**CONSERVATIVE, 'exclude_sectors': 'none'})
+
+    store = SnapshotStore(str(tmp_path))
+    store.save(CONSERVATIVE, "Tech and healthcare briefing")
+    assert store.latest(AGGRESSIVE)['briefing'] == "Tech and healthcare briefing"
+    assert store.latest({**AGGRESSIVE, 'sector_preferences': 'Financials'}) is None
+
+
+def test_each_save_adds_a_version_and_readers_take_the_newest(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    assert [store.save(CONSERVATIVE, f"briefing {i}")['version'] for i in range(3)] == [1, 2, 3]
+    assert store.latest(CONSERVATIVE)['briefing'] == "briefing 2"
+    yesterday = datetime.date.today() - datetime.timedelta(days=1)
+    assert store.latest(CONSERVATIVE, yesterday) is None
+
+
+def test_concurrent_saves_get_distinct_versions(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        saved = list(executor.map(lambda i: store.save(CONSERVATIVE, f"briefing {i}"), range(16)))
+    assert sorted(s['version'] for s in saved) == list(range(1, 17))
+    day_dir = tmp_path / datetime.date.today().isoformat()
+    assert len(list(day_dir.glob('*.json'))) == 16
+    assert not list(day_dir.glob('*.tmp'))
@@ -0,0 +1,58 @@
+from stages import stage_key
+from tasks import market_research_task, stock_selection_task
+
+
+def profile_inputs(risk, capital, shortlist):
+    return {
+        'mode': 'portfolio',
+        'sector_preferences': 'Technology, Healthcare',
+        'exclude_sectors': 'Energy',
+        'research_date': '2026-01-05',
+        'research_news_instructions': 'Sector news for Technology, Healthcare.',
+        'risk_tolerance': risk,
+        'investment_capital': capital,
+        'investment_timeframe': 'Long-term',
+        'candidate_shortlist': shortlist,
+        'news_instructions': f'News for {shortlist}.',
+        'prior_stage_findings': '',
+    }
+
+
+def test_research_is_reused_across_risk_levels():
+    conservative = profile_inputs('Low', 10000, 'JNJ, MSFT')
+    aggressive = profile_inputs('High', 10000, 'NVDA, AMD')
+    assert stage_key(market_research_task, conservative) == stage_key(market_research_task, aggressive)
+    assert stage_key(stock_selection_task, conservative) != stage_key(stock_selection_task, aggressive)
+
+
+def test_research_is_reused_across_capital():
+    small = profile_inputs('Medium', 5000, 'MSFT')
+    large = profile_inputs('Medium', 500000, 'MSFT, UNH')
+    assert stage_key(market_research_task, small) == stage_key(market_research_task, large)
+
+
+def test_research_key_follows_sectors_and_date():
+    base = profile_inputs('Medium', 10000, 'MSFT')
+    assert stage_key(market_research_task, base) != stage_key(
+        market_research_task, dict(base, sector_preferences='Financials'))
+    assert stage_key(market_research_task, base) != stage_key(
+        market_research_task, dict(base, research_date='2026-01-06'))
+
+
+def test_portfolio_runs_differing_in_risk_reuse_research():
+    from config import DEFAULT_INPUTS
+    from crew import run_financial_analysis
+    from stub_backends import install_stub_backends, uninstall_stub_backends
+
+    install_stub_backends()
+    try:
+        inputs = {**DEFAULT_INPUTS, 'stock_selection': '', 'sector_preferences': 'Utilities',
+                  'use_market_snapshot': False}
+        first = run_financial_analysis({**inputs, 'risk_tolerance': 'Low'})
+        second = run_financial_analysis({**inputs, 'risk_tolerance': 'High'})
+    finally:
+        uninstall_stub_backends()
+    research = [s for s in second.tasks_output if s.task == 'market_research']
+    assert research and research[0].cached
+    assert research[0].key == next(s.key for s in first.tasks_output if s.task == 'market_research')
+    assert not next(s for s in second.tasks_output if s.task == 'stock_selection').cached
@@ -0,0 +1,45 @@
+import threading
+import time
+
+from crewai.events import crewai_event_bus, LLMStreamChunkEvent
+
+from streaming import StreamBuffer, register_stream_listeners, run_streamed, token_stream
+
+
+def emit_chunk(text):
+    crewai_event_bus.emit(None, LLMStreamChunkEvent(chunk=text, call_id=f"call-{text}"))
+
+
+def wait_for(buffer, version):
+    deadline = time.monotonic() + 5
+    while buffer.snapshot()['version'] < version and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_each_session_sees_only_its_own_run():
+    register_stream_listeners()
+    first, second = StreamBuffer(run_id="run-1"), StreamBuffer(run_id="run-2")
+    token_stream.register_callback(first)
+    token_stream.register_callback(second)
+    try:
+        threads = [threading.Thread(target=run_streamed, args=("run-1", emit_chunk, "alpha")),
+                   threading.Thread(target=run_streamed, args=("run-2", emit_chunk, "beta"))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wait_for(first, 1)
+        wait_for(second, 1)
+        time.sleep(0.1)
+    finally:
+        token_stream.unregister_callback(first)
+        token_stream.unregister_callback(second)
+    assert first.snapshot()['text'] == "alpha"
+    assert second.snapshot()['text'] == "beta"
+
+
+def test_buffer_without_run_id_keeps_every_chunk():
+    buffer = StreamBuffer()
+    for run_id, text in (("a", "one "), (None, "two")):
+        buffer({'call_id': 1, 'run_id': run_id, 'model': '', 'agent_role': 'Analyst', 'task_name': '', 'chunk': text})
+    assert buffer.snapshot()['text'] == "one two"
@@ -0,0 +1,47 @@
+from stages import StagedResult, StageOutput
+from sweep import format_sweep_report, parse_sweep_spec
+
+
+def portfolio_result(picks, expected_return, risk_score, volatility):
+    selection = {
+        'picks': [{'ticker': t, 'allocation_pct': a, 'rationale': 'fits'} for t, a in picks],
+        'expected_return_pct': expected_return,
+        'expected_volatility_pct': volatility + 5,
+    }
+    risk = {'overall_risk_score': risk_score, 'risk_level': 'Medium', 'recommendation': 'PROCEED',
+            'expected_volatility_pct': volatility}
+    return StagedResult([
+        StageOutput("Market Research Specialist", "research", "k1", cached=True, task="market_research"),
+        StageOutput("Stock Selection Specialist", "picks", "k2", cached=False, data=selection,
+                    task="stock_selection"),
+        StageOutput("Risk Analyst", "risk report", "k3", cached=False, data=risk, task="risk_assessment"),
+    ])
+
+
+def test_report_compares_structured_outcomes():
+    grid = parse_sweep_spec(["risk=Low,High"])
+    entries = [
+        {'label': 'risk tolerance: Low', 'inputs': {'risk_tolerance': 'Low'}, 'error': None,
+         'result': portfolio_result([('JNJ', 60), ('MSFT', 40)], 6.5, 3, 12.0)},
+        {'label': 'risk tolerance: High', 'inputs': {'risk_tolerance': 'High'}, 'error': None,
+         'result': portfolio_result([('NVDA', 70), ('MSFT', 30)], 18.0, 7.5, 31.0)},
+    ]
+    report = format_sweep_report(entries, grid)
+    assert "| Low | JNJ, MSFT | 6.5% | 12.0% | 3.0/10 (Medium) | PROCEED | 1/3 | ok |" in report
+    assert "| High | NVDA, MSFT | 18.0% | 31.0% | 7.5/10 (Medium) | PROCEED | 1/3 | ok |" in report
+    assert "| MSFT | 40.0% | 30.0% |" in report
+    assert "| JNJ | 60.0% | - |" in report
+    assert "| NVDA | - | 70.0% |" in report
+
+
+def test_report_handles_failed_and_unstructured_scenarios():
+    grid = parse_sweep_spec(["risk=Low,High"])
+    entries = [
+        {'label': 'risk tolerance: Low', 'inputs': {'risk_tolerance': 'Low'}, 'error': None,
+         'result': portfolio_result([('JNJ', 100)], 5.0, 2, 10.0)},
+        {'label': 'risk tolerance: High', 'inputs': {'risk_tolerance': 'High'}, 'error': 'rate limited',
+         'result': None},
+    ]
+    report = format_sweep_report(entries, grid)
+    assert "| High | - | - | - | - | - | - | failed |" in report
+    assert "Analysis failed: rate limited" in report
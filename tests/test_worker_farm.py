@@ -0,0 +1,34 @@
+import os
+import signal
+import time
+
+from api_server import COMPLETED
+from worker_farm import WorkerFarm
+
+
+def napping_runner(inputs, cancel_token=None):
+    deadline = time.monotonic() + inputs['seconds']
+    while time.monotonic() < deadline:
+        cancel_token.raise_if_cancelled()
+        time.sleep(0.05)
+    return f"slept {inputs['seconds']}s"
+
+
+def test_ctrl_c_does_not_kill_a_running_job():
+    farm = WorkerFarm(processes=1, runner=napping_runner).start()
+    try:
+        job_id = farm.submit({'seconds': 3})
+        worker = farm._workers[0]
+        deadline = time.monotonic() + 120
+        while worker['current_job'].value.decode() != job_id:
+            assert time.monotonic() < deadline, "job never started"
+            time.sleep(0.05)
+
+        # What the terminal sends the whole process group on Ctrl+C
+        os.kill(worker['process'].pid, signal.SIGINT)
+        outcome = farm.wait(job_id, timeout=60)
+    finally:
+        farm.shutdown()
+    assert outcome['status'] == COMPLETED, outcome['error']
+    assert outcome['result']['raw'] == "slept 3s"
+    assert farm.stats['crashes'] == 0
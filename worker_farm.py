@@ -0,0 +1,262 @@
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from config import WORKER_FARM_PARAMS
+from api_server import CANCELLED, COMPLETED, FAILED, FINAL_STATES, result_payload
+from cancellation import AnalysisCancelled, CancellationToken
+
+# Farm event callback: on_event(job_id, event, data) with event one of
+# 'started', 'log', 'token' or 'finished' (data then has status, result, error)
+FarmEventCallback = Callable[[str, str, Dict[str, Any]], None]
+
+# Longest job id a worker can report through its shared current-job buffer
+MAX_JOB_ID_LENGTH = 64
+
+def _worker_main(worker_id: int, tasks, events, control, current_job, runner: Optional[Callable[..., Any]],
+                 max_jobs: int):
+    """
+    Body of a worker process: take analyses from the shared queue one at a time
+
+    Importing crew here gives every process its own agents, tools and caches.
+    A watcher thread cancels the running analysis when the farm asks to.
+    current_job is shared memory naming the job being run: unlike queued
+    events, it is still readable if the process dies abruptly.
+    """
+    from crew import register_log_callback, register_stream_callback
+    from stub_backends import STUB_ENV, install_stub_backends
+    if os.environ.get(STUB_ENV) is not None:
+        # The parent runs in stub mode (main.py --stub)
+        install_stub_backends(float(os.environ[STUB_ENV]))
+    if runner is None:
+        from crew import run_financial_analysis as runner
+
+    # Workers share the terminal's process group, so Ctrl+C reaches them too.
+    # Only the parent reacts to it and cancels through the control queues;
+    # otherwise the interrupt would kill each worker mid-job like a crash.
+    # Set after importing crew, as crewai installs its own SIGINT handler
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    current: Dict[str, Any] = {'job': None, 'token': None}
+
+    def forward(event):
+        def callback(data):
+            job_id = current['job']
+            if job_id is not None:
+                events.put((job_id, event, dict(data)))
+        return callback
+
+    register_log_callback(forward('log'))
+    register_stream_callback(forward('token'))
+
+    def watch_control():
+        while True:
+            job_id = control.get()
+            if job_id is None:
+                return
+            if job_id == current['job'] and current['token'] is not None:
+                current['token'].cancel("Analysis cancelled")
+
+    threading.Thread(target=watch_control, daemon=True).start()
+
+    for _ in range(max_jobs or 10 ** 9):
+        item = tasks.get()
+        if item is None:
+            break
+        job_id, inputs = item
+        token = CancellationToken()
+        current['token'], current['job'] = token, job_id
+        current_job.value = job_id.encode()
+        events.put((job_id, 'started', {'worker': worker_id, 'pid': os.getpid()}))
+        try:
+            result = runner(inputs, cancel_token=token)
+            outcome = {'status': COMPLETED, 'result': result_payload(result), 'error': ''}
+        except AnalysisCancelled as e:
+            outcome = {'status': CANCELLED, 'result': None, 'error': str(e)}
+        except Exception as e:
+            outcome = {'status': FAILED, 'result': None, 'error': str(e)}
+        current['job'], current['token'] = None, None
+        events.put((job_id, 'finished', outcome))
+        current_job.value = b''
+
+class WorkerFarm:
+    """
+    Pool of worker processes taking analyses from one shared local queue
+
+    Each worker runs one analysis at a time with its own agents, so runs do
+    not contend for the GIL or share agent state. A supervisor thread relays
+    worker events to on_event, fails the job of a worker that dies, and
+    starts a replacement; workers are also recycled after max_jobs_per_worker
+    analyses. Processes are spawned rather than forked, since the parent runs
+    threads (HTTP server, crewai event bus) that fork would copy mid-flight.
+
+    Without on_event, outcomes are kept until collected with wait().
+    """
+
+    def __init__(self, processes: int = WORKER_FARM_PARAMS['processes'],
+                 runner: Optional[Callable[..., Any]] = None,
+                 on_event: Optional[FarmEventCallback] = None,
+                 max_jobs_per_worker: int = WORKER_FARM_PARAMS['max_jobs_per_worker'],
+                 restart_delay: float = WORKER_FARM_PARAMS['restart_delay_seconds']):
+        if processes < 1:
+            raise ValueError("A worker farm needs at least one process")
+        self.processes = processes
+        self.runner = runner
+        self.on_event = on_event
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.restart_delay = restart_delay
+        self.stats = {'started': 0, 'completed': 0, 'failed': 0, 'cancelled': 0, 'restarts': 0, 'crashes': 0}
+        self._ctx = multiprocessing.get_context('spawn')
+        self._tasks = self._ctx.Queue()
+        self._events = self._ctx.Queue()
+        self._workers: Dict[int, Dict[str, Any]] = {}
+        self._running: Dict[str, int] = {}
+        self._cancelled: set = set()
+        self._outcomes: Dict[str, Dict[str, Any]] = {}
+        self._changed = threading.Condition()
+        self._stopping = False
+        self._supervisor: Optional[threading.Thread] = None
+
+    def start(self) -> "WorkerFarm":
+        for worker_id in range(self.processes):
+            self._spawn(worker_id)
+        self._supervisor = threading.Thread(target=self._supervise, name='worker-farm', daemon=True)
+        self._supervisor.start()
+        return self
+
+    def submit(self, inputs: Dict[str, Any], job_id: Optional[str] = None) -> str:
+        """Queue an analysis for the next free worker; returns its job id"""
+        job_id = job_id or uuid.uuid4().hex[:12]
+        if len(job_id.encode()) > MAX_JOB_ID_LENGTH:
+            raise ValueError(f"Job ids are limited to {MAX_JOB_ID_LENGTH} bytes")
+        self._tasks.put((job_id, dict(inputs)))
+        return job_id
+
+    def cancel(self, job_id: str):
+        """Cancel a queued or running analysis"""
+        with self._changed:
+            self._cancelled.add(job_id)
+            worker_id = self._running.get(job_id)
+        if worker_id is not None:
+            self._workers[worker_id]['control'].put(job_id)
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Outcome (status, result, error) of a job once it finished, or None on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._changed:
+            while job_id not in self._outcomes:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._changed.wait(remaining)
+            return self._outcomes.pop(job_id)
+
+    def run_batch(self, inputs_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Run analyses across the farm and return their outcomes in input order"""
+        job_ids = [self.submit(inputs) for inputs in inputs_list]
+        return [self.wait(job_id) for job_id in job_ids]
+
+    def shutdown(self, timeout: float = 10.0):
+        """Cancel running analyses and stop every worker"""
+        self._stopping = True
+        for job_id in list(self._running):
+            self.cancel(job_id)
+        for _ in self._workers:
+            self._tasks.put(None)
+        for worker in self._workers.values():
+            worker['process'].join(timeout)
+            if worker['process'].is_alive():
+                worker['process'].terminate()
+            worker['control'].put(None)
+        if self._supervisor is not None:
+            self._supervisor.join(timeout)
+
+    def _spawn(self, worker_id: int):
+        control = self._ctx.Queue()
+        current_job = self._ctx.Array('c', MAX_JOB_ID_LENGTH)
+        process = self._ctx.Process(
+            target=_worker_main, name=f'analysis-worker-{worker_id}', daemon=True,
+            args=(worker_id, self._tasks, self._events, control, current_job, self.runner,
+                  self.max_jobs_per_worker))
+        process.start()
+        self._workers[worker_id] = {'process': process, 'control': control, 'current_job': current_job,
+                                    'last_finished': None}
+
+    def _supervise(self):
+        next_check = 0.0
+        # After shutdown() keep reading until the workers are gone: a worker
+        # cannot exit while its queued events are still waiting to be read
+        while not self._stopping or any(w['process'].is_alive() for w in self._workers.values()):
+            try:
+                self._handle(*self._events.get(timeout=0.5))
+            except queue.Empty:
+                pass
+            if self._stopping or time.monotonic() < next_check:
+                continue
+            next_check = time.monotonic() + 0.5
+            for worker_id, worker in list(self._workers.items()):
+                if not worker['process'].is_alive():
+                    # Events a worker sent before exiting belong before its replacement
+                    self._drain()
+                    self._replace(worker_id)
+        self._drain()
+
+    def _drain(self):
+        while True:
+            try:
+                self._handle(*self._events.get_nowait())
+            except queue.Empty:
+                return
+
+    def _replace(self, worker_id: int):
+        worker = self._workers[worker_id]
+        exitcode = worker['process'].exitcode
+        # A job it took but never reported finished (its events may have died with it)
+        job_id = worker['current_job'].value.decode()
+        if job_id and job_id != worker['last_finished']:
+            self.stats['crashes'] += 1
+            print(f"Warning: analysis worker {worker_id} exited with code {exitcode} during job {job_id}")
+            self._handle(job_id, 'finished', {
+                'status': FAILED, 'result': None,
+                'error': f"Worker process exited unexpectedly (exit code {exitcode})"
+            })
+        elif exitcode:
+            self.stats['crashes'] += 1
+            print(f"Warning: analysis worker {worker_id} exited with code {exitcode}")
+        worker['control'].put(None)
+        if exitcode:
+            # Keep a worker that fails at start-up from restarting in a tight loop
+            time.sleep(self.restart_delay)
+        self.stats['restarts'] += 1
+        self._spawn(worker_id)
+
+    def _handle(self, job_id: str, event: str, data: Dict[str, Any]):
+        if event == 'started':
+            self.stats['started'] += 1
+            with self._changed:
+                self._running[job_id] = data['worker']
+                cancelled = job_id in self._cancelled
+            if cancelled:
+                # Cancelled while queued: stop it at its first checkpoint
+                self._workers[data['worker']]['control'].put(job_id)
+        elif event == 'finished':
+            with self._changed:
+                worker_id = self._running.pop(job_id, None)
+                if worker_id is not None:
+                    self._workers[worker_id]['last_finished'] = job_id
+                self._cancelled.discard(job_id)
+                if data['status'] in FINAL_STATES:
+                    self.stats[data['status']] += 1
+                if self.on_event is None:
+                    self._outcomes[job_id] = data
+                self._changed.notify_all()
+        if self.on_event is not None:
+            try:
+                self.on_event(job_id, event, data)
+            except Exception as e:
+                print(f"Warning: worker farm event callback failed: {str(e)}")